@@ -1,11 +1,14 @@
 from fastapi.params import Depends
-from core.config import Config
-from services.rag_service import RAGService
+from services.ingestion_worker import IngestionWorkerPool, ingestion_workers
+from services.rag_service import RAGService, rag_service
 from services.chat_service import ChatService
 from db.session import get_db
 from services.organization_service import OrganizationService
 from services.auth_service import AuthService
 from services.tender_folder_service import TenderFolderService
+from services.document_service import DocumentService
+from services.folder_export_service import FolderExportService
+from services.resumable_upload_service import ResumableUploadService
 from services.organization_join_service import OrganizationJoinService
 from services.organization_member_service import OrganizationMemberService
 
@@ -23,16 +26,28 @@ async def get_org_member_service(db = Depends(get_db)) -> OrganizationMemberServ
     return OrganizationMemberService(db)
 
 async def get_rag_service() -> RAGService:
-    return RAGService(
-        api_key=Config.OPENROUTER_API_KEY,
-        base_url=Config.OPENROUTER_BASE_URL
-    )
+    return rag_service
+
+async def get_ingestion_workers() -> IngestionWorkerPool:
+    return ingestion_workers
 
 async def get_tf_service(
     db = Depends(get_db),
-    rag_service: RAGService = Depends(get_rag_service)
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
 ) -> TenderFolderService:
-    return TenderFolderService(db, rag_service)
+    return TenderFolderService(db, workers)
+
+async def get_document_service(db = Depends(get_db)) -> DocumentService:
+    return DocumentService(db)
+
+async def get_export_service(db = Depends(get_db)) -> FolderExportService:
+    return FolderExportService(db)
+
+async def get_upload_service(
+    db = Depends(get_db),
+    workers: IngestionWorkerPool = Depends(get_ingestion_workers)
+) -> ResumableUploadService:
+    return ResumableUploadService(db, TenderFolderService(db, workers))
 
 async def get_chat_service(
     db = Depends(get_db),
@@ -1,10 +1,16 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from uuid import UUID
 
+from core.config import Config
 from core.security import get_current_verified_user
 from schemas.chat import ChatRequest, ChatHistoryResponse, ChatMessageResponse
 from services.chat_service import ChatService
-from api.deps import get_chat_service
+from services.model_registry import ModelNotReadyError, model_registry
+from services.rag_service import RAGService
+from api.deps import get_chat_service, get_rag_service
+from db.session import AsyncSessionLocal
 from models.user import User
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -23,7 +29,8 @@ async def send_message(
             user_id=current_user.id,
             folder_id=folder_id,
             message=request.question,
-            use_rag=use_rag
+            use_rag=use_rag,
+            org_id=current_user.organization_id
         )
         
         return ChatMessageResponse(
@@ -41,12 +48,57 @@ async def send_message(
             },
             sources=metadata.get("sources", []),
             mode=metadata.get("mode", "RAG"),
-            conversation_length=metadata.get("conversation_length", 1)
+            conversation_length=metadata.get("conversation_length", 1),
+            cached=metadata.get("cached", False)
         )
         
+    except ModelNotReadyError:
+        # 503 + Retry-After (gestionnaire de main.py)
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors du traitement du message: {str(e)}")
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/{folder_id}/message/stream")
+async def stream_message(
+    folder_id: UUID,
+    request: ChatRequest,
+    current_user: User = Depends(get_current_verified_user),
+    rag_service: RAGService = Depends(get_rag_service)
+):
+    use_rag = request.mode != "llm"
+    # Vérifié avant d'ouvrir le flux : une fois le 200 envoyé, seul un événement d'erreur est possible
+    if use_rag or Config.ANSWER_CACHE_ENABLED:
+        model_registry.require_ready()
+    user_id = current_user.id
+    org_id = current_user.organization_id
+
+    async def events():
+        # Session propre au flux : celle de la requête est fermée avant la fin du streaming
+        async with AsyncSessionLocal() as db:
+            chat_service = ChatService(db, rag_service)
+            try:
+                async for event in chat_service.stream_message(
+                    user_id=user_id,
+                    folder_id=folder_id,
+                    message=request.question,
+                    use_rag=use_rag,
+                    org_id=org_id
+                ):
+                    yield _sse(event["event"], event["data"])
+            except ModelNotReadyError as e:
+                yield _sse("error", {"detail": str(e), "retry_after": Config.MODEL_WARMUP_RETRY_AFTER_SECONDS})
+            except Exception as e:
+                yield _sse("error", {"detail": f"Erreur lors du traitement du message: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{folder_id}/history", response_model=ChatHistoryResponse)
 async def get_chat_history(
     folder_id: UUID,
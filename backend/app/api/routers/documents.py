@@ -0,0 +1,98 @@
+import re
+from typing import Optional, Tuple
+from urllib.parse import quote
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from api.deps import get_document_service
+from core.security import get_current_verified_user
+from models.user import User
+from services.blob_store import guess_mime_type
+from services.document_service import DocumentService
+
+router = APIRouter(prefix="/documents", tags=["documents"])
+
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+def _parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Plage unique `bytes=a-b`, `bytes=a-` ou `bytes=-n` ; None pour servir le fichier entier."""
+    match = _RANGE.match((header or "").strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise HTTPException(
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            "Plage demandée invalide",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return start, end
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/{document_id}/content")
+async def document_content(
+    document_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_verified_user),
+    svc: DocumentService = Depends(get_document_service),
+):
+    doc = await svc.get(document_id, current_user.organization_id)
+    if not doc:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Document introuvable")
+
+    # Tout vient des métadonnées stockées à l'upload : rien n'est recalculé ici
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f"inline; filename*=UTF-8''{quote(doc.filename)}",
+        "Cache-Control": "private, no-cache",
+    }
+    etag = f'"{doc.sha256}"' if doc.sha256 else None
+    if etag:
+        headers["ETag"] = etag
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    media_type = doc.mime_type or guess_mime_type(doc.filename)
+
+    if not doc.blob_key:
+        # Document pas encore migré vers le blob store
+        content = await svc.legacy_content(doc.id)
+        byte_range = _parse_range(request.headers.get("range"), len(content))
+        if byte_range is None:
+            return Response(content, media_type=media_type, headers=headers)
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(content)}"
+        return Response(content[start:end + 1], status_code=status.HTTP_206_PARTIAL_CONTENT,
+                        media_type=media_type, headers=headers)
+
+    size = doc.size or 0
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        byte_range = _parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, status.HTTP_200_OK
+    else:
+        (start, end), status_code = byte_range, status.HTTP_206_PARTIAL_CONTENT
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    return StreamingResponse(
+        svc.iter_content(doc, start, end) if size else iter(()),
+        status_code=status_code,
+        media_type=media_type,
+        headers=headers,
+    )
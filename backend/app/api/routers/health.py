@@ -0,0 +1,29 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from core.config import Config
+from core.metrics import metrics
+from services.model_registry import model_registry
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+@router.get("/live")
+async def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness():
+    if model_registry.ready:
+        return JSONResponse(status_code=200, content=model_registry.status())
+    return JSONResponse(
+        status_code=503,
+        content=model_registry.status(),
+        headers={"Retry-After": str(Config.MODEL_WARMUP_RETRY_AFTER_SECONDS)},
+    )
+
+
+@router.get("/metrics")
+async def runtime_metrics():
+    return metrics.snapshot()
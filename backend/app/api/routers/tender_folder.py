@@ -1,13 +1,20 @@
 from fastapi import APIRouter, Depends, File, UploadFile, HTTPException, status
+from fastapi.responses import StreamingResponse
+from urllib.parse import quote
 from uuid import UUID
 from typing import List
-from api.deps import get_tf_service
+from api.deps import get_export_service, get_tf_service
 from core.security import get_current_verified_user
 from schemas.tender_folder import (
     FolderListResponse, TenderFolderCreate, TenderFolderResponse, UpdateStatusPayload,
 )
 from schemas.document import DocumentResponse
+from schemas.ingestion import FolderIngestionResponse, IngestionJobResponse
+from models.ingestion_job import IngestionStatus
+from services.folder_export_service import FolderExportService
 from services.tender_folder_service import TenderFolderService
+from services.zip_stream import ExportTooLargeError, check_zip32, stream_zip, zip_size
+from services.uploads import UploadTooLargeError
 from models.user import User
 
 router = APIRouter(prefix="/tender-folders", tags=["tender-folders"])
@@ -19,12 +26,26 @@ async def create_folder(
     current_user: User = Depends(get_current_verified_user),
     svc: TenderFolderService = Depends(get_tf_service),
 ):
-    folder = await svc.create_folder(
-        data=data,
-        creator_id=current_user.id,
-        files=files,
-    )
-    return {"message": "Dossier créé avec succès", "id": str(folder.id)}
+    try:
+        folder, jobs, ignored = await svc.create_folder(
+            data=data,
+            creator_id=current_user.id,
+            files=files,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+    except ValueError as ve:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(ve))
+    return {
+        "message": "Dossier créé avec succès",
+        "id": str(folder.id),
+        "ingestion_jobs": [
+            {"id": str(j.id), "document_id": str(j.document_id), "status": j.status}
+            for j in jobs
+        ],
+        # Entrées d'archive non indexées (doublon, format non supporté, chiffré...)
+        "ignored": ignored,
+    }
 
 
 @router.get("/", response_model=FolderListResponse)
@@ -67,7 +88,7 @@ async def folder_detail(
         raise HTTPException(404, "Dossier non trouvé")
 
     docs = [
-        DocumentResponse.from_orm_with_base64(d) for d in folder.documents
+        DocumentResponse.from_document(d) for d in folder.documents
     ]
     return TenderFolderResponse(
         id=folder.id,
@@ -81,7 +102,39 @@ async def folder_detail(
         created_at=folder.created_at,
         document_count=len(docs),
         documents=docs,
+        digest=folder.digest,
+    )
+
+@router.get("/{folder_id}/export.zip")
+async def export_folder(
+    folder_id: UUID,
+    include_text: bool = False,
+    include_chat: bool = False,
+    current_user: User = Depends(get_current_verified_user),
+    svc: FolderExportService = Depends(get_export_service),
+):
+    result = await svc.folder_entries(
+        folder_id, current_user.organization_id, current_user.id,
+        include_text=include_text, include_chat=include_chat,
     )
+    if result is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
+    folder, entries = result
+    try:
+        check_zip32(entries)
+    except ExportTooLargeError as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(folder.name)}.zip",
+        "Cache-Control": "private, no-store",
+    }
+    size = zip_size(entries)
+    if size is not None:
+        # Entrées non compressées : la taille exacte est connue avant le premier octet
+        headers["Content-Length"] = str(size)
+    return StreamingResponse(stream_zip(entries), media_type="application/zip", headers=headers)
+
 
 @router.put("/{folder_id}/status", status_code=status.HTTP_204_NO_CONTENT)
 async def update_folder_status(
@@ -106,7 +159,7 @@ async def delete_folder(
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
     
 
-@router.post("/{folder_id}/documents", status_code=status.HTTP_201_CREATED)
+@router.post("/{folder_id}/documents", status_code=status.HTTP_202_ACCEPTED)
 async def add_documents_to_folder(
     folder_id: UUID,
     files: List[UploadFile] = File(...),
@@ -117,12 +170,14 @@ async def add_documents_to_folder(
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Aucun fichier fourni")
 
     try:
-        created_docs = await svc.add_documents(
+        created, ignored = await svc.add_documents(
             folder_id=folder_id,
             org_id=current_user.organization_id,
             uploader_id=current_user.id,
             files=files,
         )
+    except UploadTooLargeError as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
     except ValueError as ve:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, str(ve))
     except PermissionError:
@@ -131,15 +186,82 @@ async def add_documents_to_folder(
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
 
     return {
-        "message": "Documents ajoutés avec succès",
-        "count": len(created_docs),
+        "message": "Documents ajoutés, indexation en cours",
+        "count": len(created),
         "documents": [
             {
                 "id": str(d.id),
                 "filename": d.filename,
                 "file_type": d.file_type,
                 "created_at": d.created_at,
+                "job_id": str(job.id),
             }
-            for d in created_docs
+            for d, job in created
         ],
-    }
\ No newline at end of file
+        "ignored": ignored,
+    }
+
+
+@router.delete("/{folder_id}/documents/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_document_from_folder(
+    folder_id: UUID,
+    document_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: TenderFolderService = Depends(get_tf_service),
+):
+    try:
+        removed = await svc.remove_document(
+            folder_id=folder_id,
+            org_id=current_user.organization_id,
+            document_id=document_id,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
+    if not removed:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Document introuvable")
+
+
+@router.get("/{folder_id}/ingestion", response_model=FolderIngestionResponse)
+async def folder_ingestion_status(
+    folder_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: TenderFolderService = Depends(get_tf_service),
+):
+    rows = await svc.ingestion_status(folder_id, current_user.organization_id)
+    if rows is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
+
+    jobs = [
+        IngestionJobResponse(
+            id=job.id,
+            document_id=job.document_id,
+            filename=filename,
+            status=job.status,
+            stage=job.stage,
+            attempts=job.attempts,
+            max_attempts=job.max_attempts,
+            pages_total=job.pages_total,
+            pages_done=job.pages_done,
+            chunks_total=job.chunks_total,
+            chunks_done=job.chunks_done,
+            stage_timings=job.stage_timings or {},
+            page_report=job.page_report,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at,
+        )
+        for job, filename in rows
+    ]
+    return FolderIngestionResponse(
+        folder_id=folder_id,
+        total=len(jobs),
+        done=sum(1 for j in jobs if j.status == IngestionStatus.TERMINE.value),
+        failed=sum(1 for j in jobs if j.status == IngestionStatus.ECHEC.value),
+        pending=sum(1 for j in jobs if j.status in (IngestionStatus.EN_ATTENTE.value, IngestionStatus.EN_COURS.value)),
+        pages_done=sum(j.pages_done for j in jobs),
+        pages_total=sum(j.pages_total or 0 for j in jobs),
+        chunks_done=sum(j.chunks_done for j in jobs),
+        chunks_total=sum(j.chunks_total or 0 for j in jobs),
+        jobs=jobs,
+    )
\ No newline at end of file
@@ -0,0 +1,153 @@
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from starlette.requests import ClientDisconnect
+
+from api.deps import get_upload_service
+from core.security import get_current_verified_user
+from models.user import User
+from schemas.upload import UploadCreate, UploadSessionResponse
+from services.resumable_upload_service import ResumableUploadService
+from services.uploads import UploadConflictError, UploadLockedError, UploadTooLargeError
+
+router = APIRouter(prefix="/uploads", tags=["uploads"])
+
+# Protocole inspiré de tus 1.0 : POST crée l'envoi, HEAD donne le décalage,
+# PATCH ajoute des octets au décalage courant, POST /finalize crée le document.
+_OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _offset_headers(upload) -> dict:
+    return {
+        "Upload-Offset": str(upload.offset),
+        "Upload-Length": str(upload.length),
+        "Cache-Control": "no-store",
+    }
+
+
+def _upload_errors(e: Exception) -> HTTPException:
+    if isinstance(e, FileNotFoundError):
+        return HTTPException(status.HTTP_404_NOT_FOUND, "Envoi introuvable")
+    if isinstance(e, UploadConflictError):
+        return HTTPException(status.HTTP_409_CONFLICT, str(e), headers={"Upload-Offset": str(e.offset)})
+    if isinstance(e, UploadLockedError):
+        return HTTPException(status.HTTP_423_LOCKED, str(e))
+    return HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+
+
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=UploadSessionResponse)
+async def create_upload(
+    payload: UploadCreate,
+    response: Response,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    try:
+        upload = await svc.create(
+            folder_id=payload.tender_folder_id,
+            org_id=current_user.organization_id,
+            user_id=current_user.id,
+            filename=payload.filename,
+            length=payload.size,
+            content_type=payload.mime_type,
+        )
+    except FileNotFoundError:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Dossier introuvable")
+    except UploadTooLargeError as e:
+        raise HTTPException(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, str(e))
+    response.headers["Location"] = f"/uploads/{upload.id}"
+    response.headers.update(_offset_headers(upload))
+    return UploadSessionResponse.from_session(upload)
+
+
+@router.head("/{upload_id}")
+async def upload_offset(
+    upload_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    upload = await svc.get(upload_id, current_user.id)
+    if not upload:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Envoi introuvable")
+    return Response(status_code=status.HTTP_200_OK, headers=_offset_headers(upload))
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+async def upload_detail(
+    upload_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    upload = await svc.get(upload_id, current_user.id)
+    if not upload:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Envoi introuvable")
+    return UploadSessionResponse.from_session(upload)
+
+
+@router.patch("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def append_to_upload(
+    upload_id: UUID,
+    request: Request,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    if request.headers.get("content-type", "").split(";")[0].strip() != _OFFSET_CONTENT_TYPE:
+        raise HTTPException(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, f"Content-Type attendu : {_OFFSET_CONTENT_TYPE}")
+    offset = request.headers.get("upload-offset", "")
+    if not offset.isdigit():
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "En-tête Upload-Offset manquant ou invalide")
+
+    try:
+        # Corps lu au fil de l'eau : jamais chargé entier en mémoire
+        upload = await svc.append(
+            upload_id, current_user.id, int(offset), request.stream(),
+            declared=int(request.headers["content-length"]) if request.headers.get("content-length", "").isdigit() else None,
+        )
+    except ClientDisconnect:
+        # Octets reçus déjà enregistrés ; le client reprendra au décalage donné par HEAD
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    except (FileNotFoundError, UploadConflictError, UploadLockedError, UploadTooLargeError) as e:
+        raise _upload_errors(e)
+    return Response(status_code=status.HTTP_204_NO_CONTENT, headers=_offset_headers(upload))
+
+
+@router.post("/{upload_id}/finalize", status_code=status.HTTP_202_ACCEPTED)
+async def finalize_upload(
+    upload_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    try:
+        upload, created, ignored = await svc.finalize(upload_id, current_user.id)
+    except (FileNotFoundError, UploadConflictError, UploadLockedError, UploadTooLargeError) as e:
+        raise _upload_errors(e)
+    except ValueError as ve:
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, str(ve))
+    return {
+        "message": "Documents ajoutés, indexation en cours",
+        "upload_id": str(upload.id),
+        "count": len(created),
+        "documents": [
+            {
+                "id": str(d.id),
+                "filename": d.filename,
+                "file_type": d.file_type,
+                "created_at": d.created_at,
+                "job_id": str(job.id),
+            }
+            for d, job in created
+        ],
+        "ignored": ignored,
+    }
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_upload(
+    upload_id: UUID,
+    current_user: User = Depends(get_current_verified_user),
+    svc: ResumableUploadService = Depends(get_upload_service),
+):
+    try:
+        await svc.cancel(upload_id, current_user.id)
+    except (FileNotFoundError, UploadLockedError) as e:
+        raise _upload_errors(e)
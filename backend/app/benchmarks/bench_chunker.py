@@ -0,0 +1,77 @@
+"""Compare l'ancien découpage (RecursiveCharacterTextSplitter + longueur tiktoken)
+au TokenChunker sur un texte extrait synthétique de 500 pages.
+
+Usage (depuis backend/app) : python -m benchmarks.bench_chunker [--pages 500]
+"""
+import argparse
+import random
+import time
+
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from services.chunker import TokenChunker
+from services.tokens import token_len
+
+WORDS = (
+    "marché public lot prestations candidat soumissionnaire offre technique financière caution provisoire "
+    "définitive délai exécution pénalités retard maître ouvrage règlement consultation cahier prescriptions "
+    "spéciales article montant dirhams TTC HT date limite dépôt plis ouverture séance commission attestation "
+    "fiscale CNSS registre commerce référence qualification classification agrément"
+).split()
+
+
+def synthetic_text(pages: int, seed: int = 42) -> str:
+    rng = random.Random(seed)
+    out = []
+    for page in range(1, pages + 1):
+        out.append(f"ARTICLE {page} - DISPOSITIONS")
+        for _ in range(rng.randint(4, 7)):
+            lines = []
+            for _ in range(rng.randint(3, 6)):
+                lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))) + ".")
+            out.append("\n".join(lines))
+        out.append("")
+    return "\n\n".join(out)
+
+
+def legacy_split(text: str):
+    def length(t: str) -> int:
+        # Comportement d'origine : get_encoding à chaque appel
+        return len(tiktoken.get_encoding("cl100k_base").encode(t))
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=800, chunk_overlap=120, length_function=length, separators=["\n\n", "\n", " ", ""]
+    )
+    return splitter.split_text(text)
+
+
+def timed(fn, text):
+    started = time.perf_counter()
+    chunks = fn(text)
+    return chunks, time.perf_counter() - started
+
+
+def report(name, chunks, seconds):
+    sizes = [token_len(c) for c in chunks]
+    print(f"{name:<10} {seconds:8.2f}s  chunks={len(chunks):5d}  "
+          f"tokens moy={sum(sizes) / len(sizes):6.0f} max={max(sizes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=500)
+    args = parser.parse_args()
+
+    text = synthetic_text(args.pages)
+    print(f"{args.pages} pages, {len(text):,} caractères, {token_len(text):,} tokens")
+
+    new_chunks, new_s = timed(TokenChunker(800, 120).split, text)
+    old_chunks, old_s = timed(legacy_split, text)
+    report("ancien", old_chunks, old_s)
+    report("nouveau", new_chunks, new_s)
+    print(f"accélération x{old_s / new_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Valide `_clean_text` contre l'implémentation d'origine sur un corpus de référence,
+puis mesure les deux versions (page OCR, cellule de tableau, document complet).
+
+Usage (depuis backend/app) : python -m benchmarks.bench_clean_text [--fuzz 5000]
+"""
+import argparse
+import random
+import re
+import time
+import unicodedata
+
+from services.extraction import _clean_text, _control_chars
+
+
+def legacy_clean_text(s: str) -> str:
+    if not s:
+        return ""
+    s = s.replace("\x00", "").replace("\ufffd", "")
+    s = "".join(ch for ch in s if unicodedata.category(ch)[0] != "C" or ch in "\n\t\r")
+    s = re.sub(r"(\w)-\n(\w)", r"\1\2", s)
+    s = re.sub(r"[ \t]+", " ", s)
+    s = re.sub(r"\n{3,}", "\n\n", s)
+    s = "\n".join(line.strip() for line in s.split("\n"))
+    s = unicodedata.normalize("NFKC", s)
+    return s.strip()
+
+
+GOLDEN = [
+    "",
+    "   ",
+    "Article 1 :\tObjet du marché",
+    "Le soumis-\nsionnaire doit fournir la cau-\ntion provisoire.",
+    "a-\nb-\nc",
+    "Montant\u00a0: 50\u202f000,00\u00a0DH TTC",
+    "ligne 1\r\nligne 2\r\n\r\n\r\nligne 3",
+    "\n\n\n\n\nDébut\n\n\n\nFin\n\n\n",
+    " \n \n \n texte \n \n",
+    "Zéro\u200blargeur, BOM\ufeff, bidi\u202edroite\u202c, soft\u00adhyphen",
+    "contrôles \x00\x01\x07\x1b[0m\x7f\x85 fin",
+    "remplacement \ufffd\ufffd caractère",
+    "ligatures ﬁn ﬂeur, pleine largeur ＡＢＣ １２",
+    "exposants m² m³, fractions ½, cercle ①",
+    "usage privé \ue000\uf8ff et non assigné \U000e0001\U0010ffff",
+    "séparateurs\u2028de ligne\u2029et paragraphe",
+    "tab\t\t\tmultiples   espaces\t \t fin   ",
+    "accents décomposés e\u0301 a\u0300 c\u0327",
+    "--- Page 1 ---\nCAHIER DES PRESCRIPTIONS SPÉCIALES\n\n--- Tableau 1 (Page 1) ---\nLot | Montant\n",
+    "mot-\n\nsuite",
+    "-\nx",
+    "\x1c\x1d\x1e\x1f séparateurs ASCII",
+    "surrogate isolé \ud800 fin",
+]
+
+_POOL = (
+    list("abcdefghijklmnopqrstuvwxyzéèàçôÉ0123456789-_.,;:'|")
+    + [" ", " ", "\t", "\n", "\n", "\r", "\x00", "\x0b", "\x0c", "\x85", "\u00a0", "\u202f", "\u2028",
+       "\u200b", "\ufeff", "\u00ad", "\ufffd", "ﬁ", "Ａ", "²", "\u0301", "\ue000", "\ud800"]
+)
+
+
+# Petit alphabet pour multiplier les césures enchaînées ("a-\nb-\nc")
+_HYPHEN_POOL = list("ab_é1-\n \t")
+
+
+def fuzz_corpus(n: int, seed: int = 7):
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n):
+        pool = _HYPHEN_POOL if i % 2 else _POOL
+        corpus.append("".join(rng.choice(pool) for _ in range(rng.randint(0, 200))))
+    return corpus
+
+
+def ocr_page(rng: random.Random) -> str:
+    words = "marché lot offre caution délai exécution pénalités soumissionnaire article montant".split()
+    lines = []
+    for _ in range(45):
+        line = " ".join(rng.choice(words) for _ in range(rng.randint(6, 12)))
+        if rng.random() < 0.1:
+            line += " cau-"
+        lines.append(("  " if rng.random() < 0.3 else "") + line + ("\t " if rng.random() < 0.2 else ""))
+        if rng.random() < 0.05:
+            lines.append("\x0c\n\n")
+    return "\n".join(lines)
+
+
+def bench(fn, samples, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for s in samples:
+            fn(s)
+    return (time.perf_counter() - started) / (repeat * len(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fuzz", type=int, default=5000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    _control_chars()
+    print(f"construction de la classe de caractères : {time.perf_counter() - started:.2f}s (une fois par processus)")
+
+    corpus = GOLDEN + fuzz_corpus(args.fuzz)
+    mismatches = [s for s in corpus if _clean_text(s) != legacy_clean_text(s)]
+    print(f"corpus de référence : {len(corpus)} textes, {len(mismatches)} différence(s)")
+    for s in mismatches[:5]:
+        print(f"  {s!r}\n    attendu={legacy_clean_text(s)!r}\n    obtenu ={_clean_text(s)!r}")
+    if mismatches:
+        raise SystemExit(1)
+
+    rng = random.Random(1)
+    pages = [ocr_page(rng) for _ in range(50)]
+    cells = ["  Montant\u00a0TTC : 1 200,00  ", "Lot n° 2", "", "Délai\td'exécution\n(jours)"] * 50
+    document = "\n".join(pages * 10)
+    for name, samples, repeat in (
+        ("page OCR", pages, 5),
+        ("cellule", cells, 50),
+        ("document 500 p.", [document], 1),
+    ):
+        old = bench(legacy_clean_text, samples, repeat)
+        new = bench(_clean_text, samples, repeat)
+        print(f"{name:<16} ancien={old * 1e6:10.1f}µs  nouveau={new * 1e6:10.1f}µs  x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,96 @@ class Settings(BaseSettings):
     OPENROUTER_API_KEY: str
     OPENROUTER_BASE_URL: str
 
+    EMBEDDING_MODEL_NAME: str = "BAAI/bge-m3"
+    LLM_MODEL: str = "openai/gpt-4o-mini"
+    # Retry-After des réponses 503 pendant le chargement du modèle
+    MODEL_WARMUP_RETRY_AFTER_SECONDS: int = 10
+
+    EMBEDDING_BATCH_SIZE: int = 32
+    INGEST_INSERT_BATCH_SIZE: int = 256
+
+    QUERY_BATCH_MAX_SIZE: int = 16
+    QUERY_BATCH_MAX_WAIT_MS: float = 5.0
+    QUERY_EMBEDDING_CACHE_SIZE: int = 1024
+
+    EXTRACTION_WORKERS: int = 2
+    EXTRACTION_MAX_CONCURRENCY: int = 4
+    INFERENCE_THREADS: int = 2
+    INFERENCE_MAX_CONCURRENCY: int = 4
+
+    EXTRACTION_CACHE_ENABLED: bool = True
+    EXTRACTION_CACHE_DIR: str = ""
+    EXTRACTION_CACHE_MAX_MB: int = 2048
+
+    UPLOAD_MAX_FILE_MB: int = 100
+    UPLOAD_MAX_REQUEST_MB: int = 500
+    UPLOAD_DIR: str = ""
+    RESUMABLE_UPLOAD_MAX_MB: int = 2048
+    RESUMABLE_UPLOAD_EXPIRE_HOURS: int = 24
+    ZIP_MAX_ENTRIES: int = 1000
+    ZIP_MAX_TOTAL_MB: int = 4096
+    ZIP_MAX_RATIO: int = 200
+    ZIP_MAX_DEPTH: int = 3
+
+    BLOB_BACKEND: str = "local"
+    BLOB_DIR: str = "/data/blobs"
+    S3_BUCKET: str = ""
+    S3_PREFIX: str = ""
+    S3_ENDPOINT_URL: str = ""
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+
+    INGEST_PAGES_PER_TASK: int = 8
+    INGEST_PAGE_WINDOW: int = 4
+
+    OCR_MAX_CONCURRENCY: int = 2
+    OCR_PAGES_PER_TASK: int = 2
+    OCR_PAGE_TIMEOUT_SECONDS: float = 120.0
+    OCR_MIN_DPI: int = 150
+    OCR_MAX_DPI: int = 300
+    OCR_MAX_PIXELS: int = 12_000_000
+
+    HNSW_M: int = 16
+    HNSW_EF_CONSTRUCTION: int = 64
+    HNSW_EF_SEARCH: int = 64
+    HNSW_ITERATIVE_SCAN: str = "relaxed_order"
+    ANN_EXACT_SCAN_MAX_ROWS: int = 5000
+    HYBRID_CANDIDATES: int = 10
+    RRF_K: int = 60
+
+    INGESTION_WORKERS: int = 2
+    INGESTION_MAX_ATTEMPTS: int = 3
+    INGESTION_POLL_SECONDS: float = 5.0
+    INGESTION_RETRY_BASE_SECONDS: float = 30.0
+    INGESTION_STALE_SECONDS: int = 900
+
+    CHUNK_EMBEDDING_TTL_DAYS: float = 90.0
+    CHUNK_EMBEDDING_EVICT_BATCH: int = 5000
+
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 32
+    LLM_GLOBAL_CONCURRENCY: int = 16
+    LLM_ORG_CONCURRENCY: int = 4
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_SECONDS: float = 1.0
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+
+    LLM_CONTEXT_TOKEN_BUDGET: int = 24000
+    LLM_MAP_GROUP_TOKENS: int = 12000
+    LLM_MAP_CONCURRENCY: int = 4
+    LLM_MAP_MAX_ROUNDS: int = 3
+
+    DIGEST_ENABLED: bool = True
+    DIGEST_GROUP_TOKENS: int = 12000
+    DIGEST_CONCURRENCY: int = 2
+
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MIN_SIMILARITY: float = 0.95
+    ANSWER_CACHE_TTL_HOURS: float = 168.0
+
     model_config = SettingsConfigDict(env_file=".env")
  
 
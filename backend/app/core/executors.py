@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+
+from core.config import Config
+
+T = TypeVar("T")
+
+
+class Executors:
+    """Pools dédiés aux traitements bloquants, hors de la boucle asyncio.
+
+    - process pool : extraction de texte et OCR (CPU, GIL)
+    - thread pool borné : inférence du modèle d'embedding (torch libère le GIL)
+
+    Des sémaphores limitent le nombre de tâches en vol pour que les
+    ingestions ne saturent pas les pools utilisés par les requêtes API.
+    """
+
+    def __init__(self):
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._cpu_slots: Optional[asyncio.Semaphore] = None
+        self._ocr_slots: Optional[asyncio.Semaphore] = None
+        self._inference_slots: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        if self._process_pool is None:
+            from services.extraction import configure_tesseract
+
+            # spawn : ne pas hériter par fork des threads torch du processus parent
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=Config.EXTRACTION_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_tesseract,
+            )
+            self._cpu_slots = asyncio.Semaphore(Config.EXTRACTION_MAX_CONCURRENCY)
+            self._ocr_slots = asyncio.Semaphore(Config.OCR_MAX_CONCURRENCY)
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(
+                max_workers=Config.INFERENCE_THREADS,
+                thread_name_prefix="inference",
+            )
+            self._inference_slots = asyncio.Semaphore(Config.INFERENCE_MAX_CONCURRENCY)
+
+    def shutdown(self) -> None:
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+
+    async def run_cpu(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Exécute `fn` dans le process pool (fonction et arguments picklables)."""
+        self.start()
+        async with self._cpu_slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._process_pool, partial(fn, *args, **kwargs))
+
+    async def run_ocr(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Comme `run_cpu`, sous un plafond global de tâches OCR (toutes ingestions confondues)."""
+        self.start()
+        async with self._ocr_slots:
+            return await self.run_cpu(fn, *args, **kwargs)
+
+    async def run_inference(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Exécute `fn` dans le thread pool d'inférence."""
+        self.start()
+        async with self._inference_slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._thread_pool, partial(fn, *args, **kwargs))
+
+
+executors = Executors()
@@ -0,0 +1,26 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class RequestSizeLimitMiddleware:
+    """Refuse (413) une requête dont le Content-Length annoncé dépasse `max_bytes`,
+    avant que le corps ne soit lu et parsé (multipart compris).
+
+    Les corps sans Content-Length restent bornés fichier par fichier à l'upload.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            for name, value in scope["headers"]:
+                if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                    response = JSONResponse(
+                        {"detail": f"L'envoi dépasse la taille maximale de {self.max_bytes // (1024 * 1024)} Mo"},
+                        status_code=413,
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
@@ -1,3 +1,5 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import NullPool 
 from typing import AsyncGenerator
@@ -26,9 +28,52 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
         finally:
             await session.close()
 
+def _add_missing_columns(sync_conn):
+    # Pas d'outil de migration : les colonnes ajoutées aux modèles sont créées ici
+    inspector = inspect(sync_conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=sync_conn.dialect)
+                sync_conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+def _create_missing_indexes(sync_conn):
+    # create_all ne crée les index que pour les nouvelles tables
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            # HNSW : construction longue qui bloquerait les écritures et le démarrage,
+            # faite à part (scripts/build_hnsw_index.py)
+            if index.dialect_options["postgresql"]["using"] == "hnsw":
+                continue
+            index.create(sync_conn, checkfirst=True)
+
+
+def _check_vector_index(sync_conn):
+    from db.vector_index import hnsw_index_state, hnsw_options
+
+    state = hnsw_index_state(sync_conn)
+    if state is None:
+        print("[DB] index HNSW absent : recherche vectorielle en scan exact. "
+              "Lancer python -m scripts.build_hnsw_index")
+    elif not state["valid"]:
+        print("[DB] index HNSW invalide (construction interrompue) : "
+              "lancer python -m scripts.build_hnsw_index --rebuild")
+    elif state["options"] != hnsw_options():
+        print(f"[DB] index HNSW construit avec {state['options']}, configuration {hnsw_options()} : "
+              "lancer python -m scripts.build_hnsw_index --rebuild")
+
+
 async def create_tables():
     async with engine.begin() as conn:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_missing_indexes)
+        await conn.run_sync(_check_vector_index)
 
 
 async def drop_tables():
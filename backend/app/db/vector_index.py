@@ -0,0 +1,35 @@
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+from core.config import Config
+from models.embedding import HNSW_INDEX
+
+_STATE = text("""
+    SELECT i.indisvalid AS valid, c.reloptions AS options
+    FROM pg_class c
+    JOIN pg_index i ON i.indexrelid = c.oid
+    WHERE c.relname = :name AND c.relkind = 'i'
+""")
+
+
+def hnsw_options() -> Dict[str, str]:
+    return {"m": str(Config.HNSW_M), "ef_construction": str(Config.HNSW_EF_CONSTRUCTION)}
+
+
+def hnsw_index_state(sync_conn, name: str = HNSW_INDEX) -> Optional[dict]:
+    """{valid, options} de l'index, ou None s'il n'existe pas."""
+    row = sync_conn.execute(_STATE, {"name": name}).first()
+    if row is None:
+        return None
+    options = dict(opt.split("=", 1) for opt in row.options or [])
+    return {"valid": row.valid, "options": options}
+
+
+def create_hnsw_sql(name: str = HNSW_INDEX) -> str:
+    # CONCURRENTLY : les écritures continuent pendant la construction (hors transaction)
+    return (
+        f"CREATE INDEX CONCURRENTLY {name} ON embeddings "
+        f"USING hnsw (embedding vector_cosine_ops) "
+        f"WITH (m = {int(Config.HNSW_M)}, ef_construction = {int(Config.HNSW_EF_CONSTRUCTION)})"
+    )
@@ -1,15 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import uvicorn 
 
 from core.config import Config
+from core.limits import RequestSizeLimitMiddleware
 from db.session import create_tables #, drop_tables
 from api.routers.auth import router as auth_router
 from api.routers.organization import router as organizations_routes
 from api.routers.tender_folder import router as tender_folders_routes
+from api.routers.documents import router as documents_routes
+from api.routers.uploads import router as uploads_routes
 from api.routers.chat import router as chatbot_routes
 from api.routers.marche import router as marche_routes
+from api.routers.health import router as health_routes
+from core.executors import executors
+from services.model_registry import ModelNotReadyError, model_registry
+from services.llm_gateway import llm_gateway
+from services.ingestion_worker import ingestion_workers
 
 
 @asynccontextmanager
@@ -17,7 +27,16 @@ async def lifespan(app: FastAPI):
     #await drop_tables() 
     await create_tables() 
     print("Tables created successfully!")
+    executors.start()
+    llm_gateway.start()
+    # Chargement en arrière-plan : /health/ready passe à 200 après l'encode de chauffe
+    warmup = asyncio.create_task(model_registry.startup())
+    await ingestion_workers.start()
     yield  
+    await ingestion_workers.stop()
+    warmup.cancel()
+    executors.shutdown()
+    await llm_gateway.aclose()
     print("Application shutting down...")
 
 
@@ -28,19 +47,39 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# Ajouté avant CORS : les réponses 413 gardent les en-têtes CORS
+app.add_middleware(
+    RequestSizeLimitMiddleware,
+    # Marge pour les champs de formulaire et les délimiteurs multipart
+    max_bytes=(Config.UPLOAD_MAX_REQUEST_MB + 1) * 1024 * 1024,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[Config.FRONTEND_URL],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lus par le client des envois reprenables
+    expose_headers=["Upload-Offset", "Upload-Length", "Location"],
 )
 
+@app.exception_handler(ModelNotReadyError)
+async def model_not_ready_handler(request: Request, exc: ModelNotReadyError):
+    # Même réponse que /health/ready : le client réessaie après le chargement
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), **model_registry.status()},
+        headers={"Retry-After": str(Config.MODEL_WARMUP_RETRY_AFTER_SECONDS)},
+    )
+
 app.include_router(auth_router)
 app.include_router(organizations_routes)
 app.include_router(tender_folders_routes)
+app.include_router(documents_routes)
+app.include_router(uploads_routes)
 app.include_router(chatbot_routes)
 app.include_router(marche_routes)
+app.include_router(health_routes)
 
 
 @app.get("/")
@@ -4,6 +4,10 @@ from .organization_join_request import OrganizationJoinRequest
 from .tender_folder import TenderFolder
 from .document import Document  
 from .embedding import Embedding
+from .ingestion_job import IngestionJob
+from .chunk_embedding import ChunkEmbedding
+from .answer_cache import AnswerCache
+from .upload_session import UploadSession
 
 
-__all__ = ["User", "Organization", "OrganizationJoinRequest", "TenderFolder", "Document", "Embedding"]
\ No newline at end of file
+__all__ = ["User", "Organization", "OrganizationJoinRequest", "TenderFolder", "Document", "Embedding", "IngestionJob", "ChunkEmbedding", "AnswerCache", "UploadSession"]
\ No newline at end of file
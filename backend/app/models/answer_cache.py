@@ -0,0 +1,21 @@
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from pgvector.sqlalchemy import Vector
+from db.base import Base
+
+class AnswerCache(Base):
+    """Réponses déjà générées pour un dossier, retrouvées par similarité de la question."""
+    __tablename__ = "answer_cache"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=False, index=True)
+    mode = Column(String(10), nullable=False)
+    question = Column(Text, nullable=False)
+    question_embedding = Column(Vector(1024), nullable=False)
+    answer = Column(Text, nullable=False)
+    sources = Column(JSON)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, String
+from pgvector.sqlalchemy import Vector
+from db.base import Base
+
+class ChunkEmbedding(Base):
+    """Vecteurs déjà calculés, indexés par le hash du texte normalisé du chunk."""
+    __tablename__ = "chunk_embeddings"
+
+    text_hash = Column(String(64), primary_key=True)
+    embedding = Column(Vector(1024), nullable=False)
+    hits = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Mis à jour à chaque réutilisation : les vecteurs inutilisés depuis
+    # CHUNK_EMBEDDING_TTL_DAYS sont évincés (RAGService.evict_chunk_vectors)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
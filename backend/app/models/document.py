@@ -1,8 +1,8 @@
 from datetime import datetime
 from uuid import uuid4
-from sqlalchemy import Column, ForeignKey, String, DateTime, LargeBinary
+from sqlalchemy import BigInteger, Column, ForeignKey, String, DateTime, LargeBinary, JSON
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from db.base import Base
 
 class Document(Base):
@@ -13,13 +13,24 @@ class Document(Base):
     file_type = Column(String(10), nullable=True)
     tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=False,index=True)
     uploaded_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    file_content = Column(LargeBinary, nullable=True) 
+    # Contenu dans le blob store (services.blob_store) ; seules ses métadonnées sont ici
+    blob_key = Column(String(64), nullable=True, index=True)
+    size = Column(BigInteger, nullable=True)
+    sha256 = Column(String(64), nullable=True)
+    mime_type = Column(String(100), nullable=True)
+    # Texte extrait à l'ingestion, stocké lui aussi dans le blob store (export du dossier)
+    text_key = Column(String(64), nullable=True, index=True)
+    text_size = Column(BigInteger, nullable=True)
+    # Ancien stockage en base, vidé par scripts/migrate_blobs.py ; jamais chargé implicitement
+    file_content = deferred(Column(LargeBinary, nullable=True))
+    digest = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # Relations
     tender_folder = relationship("TenderFolder", back_populates="documents", lazy="noload")
     uploader = relationship("User", foreign_keys=[uploaded_by], back_populates="uploaded_documents", lazy="noload")
     embeddings = relationship("Embedding", back_populates="document", cascade="all, delete-orphan", lazy="noload")
+    ingestion_jobs = relationship("IngestionJob", back_populates="document", cascade="all, delete-orphan", lazy="noload")
 
 
 
@@ -1,24 +1,42 @@
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, Text, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, Computed, DateTime, ForeignKey, Index, Integer, Text, JSON
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
 from uuid import uuid4
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from pgvector.sqlalchemy import Vector
+from core.config import Config
 from db.base import Base
 
+HNSW_INDEX = "ix_embeddings_embedding_hnsw"
+
 class Embedding(Base):
     __tablename__ = "embeddings"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
-    tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=True)
-    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False)
+    tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=True, index=True)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
     embedding = Column(Vector(1024))
     chunk_text = Column(Text, nullable=False)
+    chunk_tsv = Column(TSVECTOR, Computed("to_tsvector('french'::regconfig, chunk_text)", persisted=True))
     chunk_index = Column(Integer)
+    token_count = Column(Integer)
     extra_data = Column(JSON)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Créé avec la table ; sur une table existante, il se construit avec
+    # python -m scripts.build_hnsw_index (CONCURRENTLY, hors démarrage)
+    __table_args__ = (
+        Index(
+            HNSW_INDEX,
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_with={"m": Config.HNSW_M, "ef_construction": Config.HNSW_EF_CONSTRUCTION},
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_embeddings_chunk_tsv", "chunk_tsv", postgresql_using="gin"),
+    )
+
     # Relations
     document = relationship("Document", back_populates="embeddings", lazy="noload")
     tender_folder = relationship("TenderFolder", back_populates="embeddings", lazy="noload")
\ No newline at end of file
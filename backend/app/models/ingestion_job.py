@@ -0,0 +1,40 @@
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Text, JSON
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from enum import Enum
+from db.base import Base
+
+class IngestionStatus(str, Enum):
+    EN_ATTENTE = "en_attente"
+    EN_COURS = "en_cours"
+    TERMINE = "termine"
+    ECHEC = "echec"
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(String(20), default=IngestionStatus.EN_ATTENTE.value, nullable=False, index=True)
+    stage = Column(String(30), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=3, nullable=False)
+    pages_total = Column(Integer, nullable=True)
+    pages_done = Column(Integer, default=0, nullable=False)
+    chunks_total = Column(Integer, nullable=True)
+    chunks_done = Column(Integer, default=0, nullable=False)
+    stage_timings = Column(JSON, default=dict)
+    # Méthode (native, ocr, vide...), tableaux et durée de chaque page
+    page_report = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relations
+    document = relationship("Document", back_populates="ingestion_jobs", lazy="noload")
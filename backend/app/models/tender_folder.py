@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import uuid4
-from sqlalchemy import Column, ForeignKey, String, DateTime, Text, Date
+from sqlalchemy import Column, ForeignKey, Integer, String, DateTime, Text, Date, JSON
 from sqlalchemy.dialects.postgresql import UUID
 from uuid import uuid4
 from sqlalchemy.orm import relationship
@@ -25,6 +25,9 @@ class TenderFolder(Base):
     organization_id = Column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
     created_by = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    digest = Column(JSON, nullable=True)
+    # Incrémenté à chaque invalidation du cache de réponses du dossier
+    answer_cache_generation = Column(Integer, nullable=False, default=0, server_default="0")
     
     # Relations
     organization = relationship("Organization", back_populates="tender_folders", lazy="noload")
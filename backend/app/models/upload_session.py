@@ -0,0 +1,27 @@
+from datetime import datetime
+from uuid import uuid4
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, String
+from sqlalchemy.dialects.postgresql import UUID
+from enum import Enum
+from db.base import Base
+
+class UploadStatus(str, Enum):
+    EN_COURS = "en_cours"
+    TERMINE = "termine"
+
+class UploadSession(Base):
+    """Envoi reprenable (type tus) : les octets reçus sont ajoutés à un fichier partiel sur disque."""
+    __tablename__ = "upload_sessions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4)
+    tender_folder_id = Column(UUID(as_uuid=True), ForeignKey("tender_folders.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_by = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    mime_type = Column(String(100), nullable=True)
+    length = Column(BigInteger, nullable=False)
+    offset = Column(BigInteger, default=0, nullable=False)
+    status = Column(String(20), default=UploadStatus.EN_COURS.value, nullable=False)
+    document_id = Column(UUID(as_uuid=True), ForeignKey("documents.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.answer_cache import AnswerCache
+from models.tender_folder import TenderFolder
+
+
+class AnswerCacheRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def generation(self, folder_id: UUID) -> Optional[int]:
+        stmt = select(TenderFolder.answer_cache_generation).where(TenderFolder.id == folder_id)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def add_if_current(self, entry: AnswerCache, generation: int) -> bool:
+        """Ajoute l'entrée seulement si le cache du dossier n'a pas été invalidé depuis `generation`.
+
+        FOR SHARE : une invalidation en cours est attendue, puis la condition
+        est réévaluée sur la ligne à jour ; le verrou est tenu jusqu'au commit.
+        """
+        stmt = (
+            select(TenderFolder.id)
+            .where(
+                TenderFolder.id == entry.tender_folder_id,
+                TenderFolder.answer_cache_generation == generation,
+            )
+            .with_for_update(read=True)
+        )
+        if (await self.db.execute(stmt)).scalar_one_or_none() is None:
+            return False
+        self.db.add(entry)
+        return True
+
+    async def find_similar(self, folder_id: UUID, mode: str, vector: List[float],
+                           min_similarity: float, max_age_hours: float) -> Optional[AnswerCache]:
+        distance = AnswerCache.question_embedding.cosine_distance(vector)
+        stmt = (
+            select(AnswerCache, distance.label("distance"))
+            .where(
+                AnswerCache.tender_folder_id == folder_id,
+                AnswerCache.mode == mode,
+                AnswerCache.created_at >= datetime.utcnow() - timedelta(hours=max_age_hours),
+            )
+            .order_by(distance)
+            .limit(1)
+        )
+        row = (await self.db.execute(stmt)).first()
+        if row is None or 1 - row.distance < min_similarity:
+            return None
+        return row.AnswerCache
+
+    async def record_hit(self, entry_id: UUID) -> None:
+        await self.db.execute(
+            update(AnswerCache)
+            .where(AnswerCache.id == entry_id)
+            .values(hits=AnswerCache.hits + 1, last_hit_at=datetime.utcnow())
+        )
+
+    async def invalidate_folder(self, folder_id: UUID) -> int:
+        await self.db.execute(
+            update(TenderFolder)
+            .where(TenderFolder.id == folder_id)
+            .values(answer_cache_generation=TenderFolder.answer_cache_generation + 1)
+        )
+        result = await self.db.execute(
+            delete(AnswerCache).where(AnswerCache.tender_folder_id == folder_id)
+        )
+        return result.rowcount or 0
@@ -1,7 +1,13 @@
 from __future__ import annotations
+import hashlib
+from typing import AsyncIterator, BinaryIO, List, Optional
+from uuid import UUID
+from sqlalchemy import delete, func, null, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from models.document import Document
+from models.tender_folder import TenderFolder
+from models.embedding import Embedding
 
 
 class DocumentRepo:
@@ -11,4 +17,151 @@ class DocumentRepo:
     async def add(self, doc: Document) -> None:
         self.db.add(doc)
 
+    async def get_in_org(self, document_id: UUID, org_id: UUID) -> Optional[Document]:
+        stmt = (
+            select(Document)
+            .join(TenderFolder, TenderFolder.id == Document.tender_folder_id)
+            .where(Document.id == document_id, TenderFolder.organization_id == org_id)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
 
+    async def get_blob_info(self, document_id: UUID):
+        stmt = (
+            select(Document.file_type, Document.blob_key, Document.sha256, Document.text_key)
+            .where(Document.id == document_id)
+        )
+        return (await self.db.execute(stmt)).first()
+
+    async def legacy_content(self, document_id: UUID) -> Optional[bytes]:
+        stmt = select(Document.file_content).where(Document.id == document_id)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def blob_keys_by_folder(self, folder_id: UUID) -> List[str]:
+        stmt = select(Document.blob_key).where(
+            Document.tender_folder_id == folder_id, Document.blob_key.is_not(None)
+        )
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def stored_keys_by_folder(self, folder_id: UUID) -> List[str]:
+        """Blobs des fichiers et des textes extraits du dossier."""
+        stmt = select(Document.blob_key, Document.text_key).where(Document.tender_folder_id == folder_id)
+        return [key for row in (await self.db.execute(stmt)).all() for key in row if key]
+
+    async def lock_blob_keys(self, keys: List[str], exclusive: bool = False) -> None:
+        """Verrous consultatifs par clé de blob, jusqu'à la fin de la transaction.
+
+        Partagé : pris avant de stocker un blob que la transaction va référencer.
+        Exclusif : pris par la purge, qui attend donc le commit de ces écritures.
+        Clés triées : pas d'interblocage entre deux transactions.
+        """
+        lock = func.pg_advisory_xact_lock if exclusive else func.pg_advisory_xact_lock_shared
+        for key in sorted(set(keys)):
+            # 60 premiers bits du SHA-256 : tient dans un bigint positif
+            await self.db.execute(select(lock(int(key[:15], 16))))
+
+    async def unreferenced_blobs(self, keys: List[str]) -> List[str]:
+        """Clés qu'aucun document ne référence plus (contenu partagé par déduplication)."""
+        if not keys:
+            return []
+        used = set((await self.db.execute(
+            select(Document.blob_key).where(Document.blob_key.in_(keys)).distinct()
+        )).scalars().all())
+        used.update((await self.db.execute(
+            select(Document.text_key).where(Document.text_key.in_(keys)).distinct()
+        )).scalars().all())
+        return [k for k in set(keys) if k not in used]
+
+    async def set_text(self, document_id: UUID, key: str, size: int) -> Optional[str]:
+        """Enregistre le texte extrait ; renvoie la clé du texte précédent (réingestion)."""
+        previous = await self.db.scalar(select(Document.text_key).where(Document.id == document_id))
+        await self.db.execute(
+            update(Document).where(Document.id == document_id).values(text_key=key, text_size=size)
+        )
+        return previous
+
+    async def legacy_sizes(self, folder_id: UUID) -> dict:
+        """Taille des documents du dossier encore stockés en base : {id: octets}."""
+        stmt = select(Document.id, func.length(Document.file_content)).where(
+            Document.tender_folder_id == folder_id,
+            Document.blob_key.is_(None),
+            Document.file_content.is_not(None),
+        )
+        return {doc_id: size for doc_id, size in (await self.db.execute(stmt)).all()}
+
+    async def legacy_batch(self, limit: int) -> List[tuple]:
+        """Documents encore stockés en base : (id, filename)."""
+        stmt = (
+            select(Document.id, Document.filename)
+            .where(Document.blob_key.is_(None), Document.file_content.is_not(None))
+            .limit(limit)
+        )
+        return [tuple(row) for row in (await self.db.execute(stmt)).all()]
+
+    async def set_blob(self, document_id: UUID, key: str, size: int, mime_type: str) -> None:
+        await self.db.execute(
+            update(Document)
+            .where(Document.id == document_id)
+            .values(blob_key=key, sha256=key, size=size, mime_type=mime_type, file_content=None)
+        )
+
+    async def spool_content(self, document_id: UUID, dest: BinaryIO,
+                            chunk_size: int = 4 * 1024 * 1024) -> Optional[tuple[str, str]]:
+        """Copie le fichier vers `dest` par tranches (substring sur le bytea),
+        sans le charger en entier ; renvoie (file_type, sha256)."""
+        stmt = select(Document.file_type, func.length(Document.file_content)).where(Document.id == document_id)
+        row = (await self.db.execute(stmt)).first()
+        if row is None:
+            return None
+        file_type, size = row
+        digest = hashlib.sha256()
+        async for piece in self.iter_legacy_content(document_id, size or 0, chunk_size):
+            digest.update(piece)
+            dest.write(piece)
+        return file_type, digest.hexdigest()
+
+    async def iter_legacy_content(self, document_id: UUID, size: int,
+                                  chunk_size: int = 4 * 1024 * 1024) -> AsyncIterator[bytes]:
+        for offset in range(0, size, chunk_size):
+            yield await self.db.scalar(
+                select(func.substring(Document.file_content, offset + 1, chunk_size))
+                .where(Document.id == document_id)
+            )
+
+    async def exists_in_folder(self, document_id: UUID, folder_id: UUID) -> bool:
+        stmt = select(Document.id).where(Document.id == document_id, Document.tender_folder_id == folder_id)
+        return (await self.db.execute(stmt)).first() is not None
+
+    async def delete(self, document_id: UUID) -> int:
+        result = await self.db.execute(delete(Document).where(Document.id == document_id))
+        return result.rowcount or 0
+
+    async def chunk_texts(self, document_id: UUID) -> List[str]:
+        stmt = (
+            select(Embedding.chunk_text)
+            .where(Embedding.document_id == document_id)
+            .order_by(Embedding.chunk_index)
+        )
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def set_digest(self, document_id: UUID, digest: Optional[dict]) -> Optional[str]:
+        stmt = (
+            update(Document)
+            .where(Document.id == document_id)
+            .values(digest=digest if digest is not None else null())
+            .returning(Document.filename)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def digests_by_folder(self, folder_id: UUID) -> List[tuple]:
+        stmt = (
+            select(Document.filename, Document.digest)
+            .where(Document.tender_folder_id == folder_id)
+            .order_by(Document.created_at, Document.id)
+        )
+        return [tuple(row) for row in (await self.db.execute(stmt)).all()]
+
+    async def delete_embeddings(self, document_id: UUID) -> int:
+        result = await self.db.execute(
+            delete(Embedding).where(Embedding.document_id == document_id)
+        )
+        return result.rowcount or 0
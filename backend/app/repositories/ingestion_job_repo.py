@@ -0,0 +1,130 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from uuid import UUID
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.document import Document
+from models.ingestion_job import IngestionJob, IngestionStatus
+
+
+class IngestionJobRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, job: IngestionJob) -> None:
+        self.db.add(job)
+
+    async def get(self, job_id: UUID) -> Optional[IngestionJob]:
+        stmt = select(IngestionJob).where(IngestionJob.id == job_id)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def claim_next(self) -> Optional[IngestionJob]:
+        # SKIP LOCKED : plusieurs workers (et processus uvicorn) se partagent la file
+        stmt = (
+            select(IngestionJob)
+            .where(
+                IngestionJob.status == IngestionStatus.EN_ATTENTE.value,
+                IngestionJob.available_at <= datetime.utcnow(),
+            )
+            .order_by(IngestionJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = (await self.db.execute(stmt)).scalar_one_or_none()
+        if job:
+            now = datetime.utcnow()
+            job.status = IngestionStatus.EN_COURS.value
+            job.attempts += 1
+            job.started_at = now
+            job.updated_at = now
+        return job
+
+    async def update_progress(self, job_id: UUID, **values) -> None:
+        stmt = (
+            update(IngestionJob)
+            .where(IngestionJob.id == job_id)
+            .values(updated_at=datetime.utcnow(), **values)
+        )
+        await self.db.execute(stmt)
+
+    async def mark_done(self, job_id: UUID) -> None:
+        now = datetime.utcnow()
+        await self.update_progress(
+            job_id,
+            status=IngestionStatus.TERMINE.value,
+            stage="termine",
+            error=None,
+            finished_at=now,
+        )
+
+    async def mark_failed(self, job_id: UUID, error: str, retry_in: Optional[float]) -> None:
+        if retry_in is None:
+            await self.update_progress(
+                job_id,
+                status=IngestionStatus.ECHEC.value,
+                error=error,
+                finished_at=datetime.utcnow(),
+            )
+        else:
+            await self.update_progress(
+                job_id,
+                status=IngestionStatus.EN_ATTENTE.value,
+                error=error,
+                available_at=datetime.utcnow() + timedelta(seconds=retry_in),
+            )
+
+    async def release(self, job_id: UUID) -> int:
+        # Job interrompu par l'arrêt du processus : remis en file sans consommer de tentative
+        stmt = (
+            update(IngestionJob)
+            .where(
+                IngestionJob.id == job_id,
+                IngestionJob.status == IngestionStatus.EN_COURS.value,
+            )
+            .values(
+                status=IngestionStatus.EN_ATTENTE.value,
+                attempts=func.greatest(IngestionJob.attempts - 1, 0),
+                available_at=datetime.utcnow(),
+                updated_at=datetime.utcnow(),
+            )
+        )
+        result = await self.db.execute(stmt)
+        return result.rowcount or 0
+
+    async def requeue_stale(self, older_than_seconds: int) -> Tuple[int, int]:
+        """(remis en file, abandonnés) parmi les jobs en cours sans nouvelles depuis `older_than_seconds`.
+
+        Un job qui tue son processus à chaque essai (OOM...) a déjà consommé ses
+        tentatives : il passe en échec au lieu de tourner en boucle.
+        """
+        now = datetime.utcnow()
+        stale = (
+            IngestionJob.status == IngestionStatus.EN_COURS.value,
+            IngestionJob.updated_at < now - timedelta(seconds=older_than_seconds),
+        )
+        abandoned = await self.db.execute(
+            update(IngestionJob)
+            .where(*stale, IngestionJob.attempts >= IngestionJob.max_attempts)
+            .values(
+                status=IngestionStatus.ECHEC.value,
+                error="Traitement interrompu à chaque tentative (arrêt du processus) : nombre maximal de tentatives atteint",
+                finished_at=now,
+                updated_at=now,
+            )
+        )
+        requeued = await self.db.execute(
+            update(IngestionJob)
+            .where(*stale, IngestionJob.attempts < IngestionJob.max_attempts)
+            .values(status=IngestionStatus.EN_ATTENTE.value, available_at=now)
+        )
+        return requeued.rowcount or 0, abandoned.rowcount or 0
+
+    async def list_by_folder(self, folder_id: UUID) -> List[tuple[IngestionJob, str]]:
+        stmt = (
+            select(IngestionJob, Document.filename)
+            .join(Document, IngestionJob.document_id == Document.id)
+            .where(IngestionJob.tender_folder_id == folder_id)
+            .order_by(IngestionJob.created_at)
+        )
+        return (await self.db.execute(stmt)).all()
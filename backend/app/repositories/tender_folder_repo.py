@@ -22,6 +22,19 @@ class TenderFolderRepo:
         result = await self.db.execute(stmt)
         return result.rowcount or 0
 
+    async def lock_digest(self, folder_id: UUID):
+        stmt = (
+            select(TenderFolder.digest)
+            .where(TenderFolder.id == folder_id)
+            .with_for_update()
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def set_digest(self, folder_id: UUID, digest: dict) -> None:
+        await self.db.execute(
+            update(TenderFolder).where(TenderFolder.id == folder_id).values(digest=digest)
+        )
+
 
     async def get_by_org_with_doc_counts(self, org_id):
         doc_count_sq = (
@@ -57,6 +70,16 @@ class TenderFolderRepo:
         )
         return (await self.db.execute(stmt)).scalar_one_or_none()
 
+    async def get_in_org(self, folder_id, org_id):
+        stmt = (
+            select(TenderFolder)
+            .where(
+                TenderFolder.id == folder_id,
+                TenderFolder.organization_id == org_id,
+            )
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
     async def get_with_docs(self, folder_id, org_id):
         stmt = (
             select(TenderFolder)
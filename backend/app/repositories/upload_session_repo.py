@@ -0,0 +1,41 @@
+from datetime import datetime
+from typing import List, Optional
+from uuid import UUID
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.upload_session import UploadSession
+
+
+class UploadSessionRepo:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def add(self, upload: UploadSession) -> None:
+        self.db.add(upload)
+
+    async def get(self, upload_id: UUID, user_id: UUID) -> Optional[UploadSession]:
+        stmt = select(UploadSession).where(UploadSession.id == upload_id, UploadSession.created_by == user_id)
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def lock(self, upload_id: UUID, user_id: UUID) -> Optional[UploadSession]:
+        # NOWAIT : un second PATCH concurrent sur le même envoi échoue tout de suite
+        stmt = (
+            select(UploadSession)
+            .where(UploadSession.id == upload_id, UploadSession.created_by == user_id)
+            .with_for_update(nowait=True)
+        )
+        return (await self.db.execute(stmt)).scalar_one_or_none()
+
+    async def expired(self, now: datetime, limit: int = 50) -> List[UploadSession]:
+        stmt = (
+            select(UploadSession)
+            .where(UploadSession.expires_at < now)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list((await self.db.execute(stmt)).scalars().all())
+
+    async def delete(self, upload_ids: List[UUID]) -> None:
+        if upload_ids:
+            await self.db.execute(delete(UploadSession).where(UploadSession.id.in_(upload_ids)))
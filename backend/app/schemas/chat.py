@@ -21,6 +21,7 @@ class ChatMessageResponse(BaseModel):
     sources: List[Dict[str, Any]]
     mode: str
     conversation_length: int
+    cached: bool = False
 
 class ChatHistoryResponse(BaseModel):
     folder_id: str
@@ -1,8 +1,7 @@
 from pydantic import BaseModel, Field 
 from datetime import datetime
 from uuid import UUID
-from typing import Optional
-import base64
+from typing import Any, Dict, Optional
 
 class DocumentBase(BaseModel):
     filename: str = Field(..., min_length=1, max_length=255)
@@ -13,10 +12,14 @@ class DocumentResponse(DocumentBase):
     tender_folder_id: UUID
     uploaded_by: UUID
     created_at: datetime
-    file_content: Optional[str] = None
+    file_type: Optional[str] = None
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+    digest: Optional[Dict[str, Any]] = None
 
     @classmethod
-    def from_orm_with_base64(cls, doc):
+    def from_document(cls, doc):
+        # Métadonnées seulement : le contenu est servi par GET /documents/{id}/content
         return cls(
             id=doc.id,
             filename=doc.filename,
@@ -24,7 +27,9 @@ class DocumentResponse(DocumentBase):
             tender_folder_id=doc.tender_folder_id,
             uploaded_by=doc.uploaded_by,
             created_at=doc.created_at,
-            file_content=base64.b64encode(doc.file_content).decode("utf-8") if doc.file_content else None
+            size=doc.size,
+            mime_type=doc.mime_type,
+            digest=doc.digest,
         )
 
 
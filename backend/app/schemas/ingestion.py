@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from datetime import datetime
+from uuid import UUID
+from typing import Any, Dict, List, Optional
+
+
+class IngestionJobResponse(BaseModel):
+    id: UUID
+    document_id: UUID
+    filename: str
+    status: str
+    stage: Optional[str]
+    attempts: int
+    max_attempts: int
+    pages_total: Optional[int]
+    pages_done: int
+    chunks_total: Optional[int]
+    chunks_done: int
+    stage_timings: Dict[str, float] = {}
+    page_report: Optional[List[Dict[str, Any]]] = None
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+
+class FolderIngestionResponse(BaseModel):
+    folder_id: UUID
+    total: int
+    done: int
+    failed: int
+    pending: int
+    pages_done: int
+    pages_total: int
+    chunks_done: int
+    chunks_total: int
+    jobs: List[IngestionJobResponse]
@@ -2,7 +2,7 @@ from fastapi import Form
 from pydantic import BaseModel, ConfigDict 
 from datetime import date, datetime
 from uuid import UUID
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict
 from enum import Enum
 from .document import DocumentResponse
 from typing import Literal
@@ -53,6 +53,7 @@ class TenderFolderResponse(BaseModel):
     created_at: datetime
     document_count: int = 0
     documents: List[DocumentResponse] = []
+    digest: Optional[Dict[str, Any]] = None
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+from uuid import UUID
+from typing import Optional
+
+
+class UploadCreate(BaseModel):
+    tender_folder_id: UUID
+    filename: str = Field(..., min_length=1, max_length=255)
+    size: int = Field(..., gt=0)
+    mime_type: Optional[str] = Field(None, max_length=100)
+
+
+class UploadSessionResponse(BaseModel):
+    id: UUID
+    tender_folder_id: UUID
+    filename: str
+    length: int
+    offset: int
+    status: str
+    document_id: Optional[UUID] = None
+    expires_at: datetime
+
+    @classmethod
+    def from_session(cls, upload):
+        return cls(
+            id=upload.id,
+            tender_folder_id=upload.tender_folder_id,
+            filename=upload.filename,
+            length=upload.length,
+            offset=upload.offset,
+            status=upload.status,
+            document_id=upload.document_id,
+            expires_at=upload.expires_at,
+        )
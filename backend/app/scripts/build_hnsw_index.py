@@ -0,0 +1,74 @@
+"""Construit l'index HNSW des embeddings sans bloquer l'application.
+
+Usage (depuis backend/app) : python -m scripts.build_hnsw_index [--rebuild] [--maintenance-work-mem 2GB]
+
+L'index n'est plus créé au démarrage sur une table existante : CREATE INDEX
+dans la transaction de démarrage bloquait les écritures sur `embeddings`
+et l'application pendant toute la construction. Ici, CREATE INDEX
+CONCURRENTLY en autocommit : ingestion et recherche continuent.
+
+Après un changement de HNSW_M ou HNSW_EF_CONSTRUCTION, relancer avec
+--rebuild : un nouvel index est construit à côté, puis remplace l'ancien
+(DROP INDEX CONCURRENTLY + renommage). Même chose si le démarrage signale
+un index invalide (construction interrompue).
+
+Une construction plus rapide demande un maintenance_work_mem assez grand
+pour contenir le graphe (voir --maintenance-work-mem).
+"""
+import argparse
+import asyncio
+import re
+import time
+
+from sqlalchemy import text
+
+from db.session import engine
+from db.vector_index import create_hnsw_sql, hnsw_index_state, hnsw_options
+from models import chat_conversation, chat_session  # noqa: F401  (configuration des mappers)
+from models.embedding import HNSW_INDEX
+
+_NEW_INDEX = f"{HNSW_INDEX}_new"
+
+
+async def build(rebuild: bool, maintenance_work_mem: str) -> None:
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        if maintenance_work_mem:
+            if not re.fullmatch(r"\d+\s*(kB|MB|GB)?", maintenance_work_mem):
+                raise SystemExit(f"maintenance_work_mem invalide : {maintenance_work_mem}")
+            await conn.execute(text(f"SET maintenance_work_mem = '{maintenance_work_mem}'"))
+
+        state = await conn.run_sync(hnsw_index_state)
+        if state is not None and state["valid"] and not rebuild:
+            if state["options"] != hnsw_options():
+                print(f"[HNSW] index existant {state['options']}, configuration {hnsw_options()} : "
+                      "relancer avec --rebuild")
+            else:
+                print(f"[HNSW] index {HNSW_INDEX} déjà présent {state['options']}")
+            return
+
+        started = time.perf_counter()
+        # Reste d'une reconstruction interrompue
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {_NEW_INDEX}"))
+        if state is None:
+            print(f"[HNSW] construction de {HNSW_INDEX} {hnsw_options()}...")
+            await conn.execute(text(create_hnsw_sql()))
+        else:
+            print(f"[HNSW] reconstruction de {HNSW_INDEX} {hnsw_options()} (l'ancien index reste utilisé)...")
+            await conn.execute(text(create_hnsw_sql(_NEW_INDEX)))
+            await conn.execute(text(f"DROP INDEX CONCURRENTLY {HNSW_INDEX}"))
+            await conn.execute(text(f"ALTER INDEX {_NEW_INDEX} RENAME TO {HNSW_INDEX}"))
+        print(f"[HNSW] terminé en {time.perf_counter() - started:.1f}s")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true")
+    parser.add_argument("--maintenance-work-mem", default="")
+    args = parser.parse_args()
+    asyncio.run(build(args.rebuild, args.maintenance_work_mem))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Déplace le contenu des documents encore stockés en base (documents.file_content)
+vers le blob store configuré, par lots.
+
+Usage (depuis backend/app) : python -m scripts.migrate_blobs [--batch 50] [--dry-run]
+
+Reprenable : chaque lot est commité, un document déjà migré n'est plus
+sélectionné. Après migration, un VACUUM FULL documents rend l'espace au disque.
+"""
+import argparse
+import asyncio
+import time
+
+from db.session import AsyncSessionLocal
+from models import chat_conversation, chat_session  # noqa: F401  (configuration des mappers)
+from repositories.document_repo import DocumentRepo
+from services.blob_store import blob_key, get_blob_store, guess_mime_type
+
+
+async def migrate(batch_size: int, dry_run: bool) -> None:
+    store = get_blob_store()
+    moved = 0
+    total_bytes = 0
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        repo = DocumentRepo(db)
+        while True:
+            batch = await repo.legacy_batch(batch_size)
+            if not batch:
+                break
+            if dry_run:
+                print(f"[MIGRATION] {len(batch)} document(s) (au moins) à migrer, ex. {batch[0][1]}")
+                return
+            for document_id, filename in batch:
+                # Un document à la fois : la mémoire reste bornée à un fichier
+                content = await repo.legacy_content(document_id) or b""
+                # Verrou jusqu'au commit du lot : une purge concurrente ne supprime pas ce blob
+                await repo.lock_blob_keys([blob_key(content)])
+                key = await store.put_bytes(content)
+                await repo.set_blob(document_id, key, len(content), guess_mime_type(filename))
+                moved += 1
+                total_bytes += len(content)
+            await db.commit()
+            print(f"[MIGRATION] {moved} documents, {total_bytes / 1024 / 1024:.1f} Mo "
+                  f"({time.perf_counter() - started:.1f}s)")
+    print(f"[MIGRATION] terminé : {moved} documents déplacés vers le blob store")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
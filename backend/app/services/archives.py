@@ -0,0 +1,180 @@
+import hashlib
+import os
+import posixpath
+import zipfile
+import zlib
+from typing import Callable, List, NamedTuple, Optional, Set, Tuple
+
+from core.config import Config
+from services.uploads import UPLOAD_CHUNK_SIZE, UploadTooLargeError
+
+INGESTIBLE_TYPES = {"pdf", "docx", "doc", "txt", "csv"}
+_IGNORED_PREFIXES = ("__MACOSX/",)
+
+
+class ArchiveEntry(NamedTuple):
+    filename: str
+    path: str
+    key: str
+    size: int
+
+
+class ArchiveLimits:
+    """Garde-fous contre les archives piégées (zip bombs) : nombre de fichiers,
+    taille décompressée cumulée, taux de compression et profondeur d'imbrication."""
+
+    def __init__(self, max_entries: Optional[int] = None, max_total_bytes: Optional[int] = None,
+                 max_ratio: Optional[int] = None, max_depth: Optional[int] = None,
+                 max_file_bytes: Optional[int] = None):
+        self.max_entries = max_entries or Config.ZIP_MAX_ENTRIES
+        self.max_total_bytes = max_total_bytes or Config.ZIP_MAX_TOTAL_MB * 1024 * 1024
+        self.max_ratio = max_ratio or Config.ZIP_MAX_RATIO
+        self.max_depth = max_depth or Config.ZIP_MAX_DEPTH
+        self.max_file_bytes = max_file_bytes or Config.UPLOAD_MAX_FILE_MB * 1024 * 1024
+        self.entries = 0
+        self.total = 0
+
+    def check_entry(self, name: str, info: zipfile.ZipInfo, nested_archive: bool = False) -> None:
+        self.entries += 1
+        if self.entries > self.max_entries:
+            raise UploadTooLargeError(f"L'archive contient plus de {self.max_entries} fichiers")
+        # Tailles annoncées par l'en-tête : contrôlées avant toute décompression
+        if not nested_archive and info.file_size > self.max_file_bytes:
+            raise UploadTooLargeError(
+                f"{name} dépasse la taille maximale de {self.max_file_bytes // (1024 * 1024)} Mo"
+            )
+        if info.file_size > 1024 * 1024 and info.file_size > self.max_ratio * max(info.compress_size, 1):
+            raise UploadTooLargeError(f"{name} : taux de compression suspect, archive refusée")
+        self.check_total(info.file_size)
+
+    def check_total(self, size: int) -> None:
+        if self.total + size > self.max_total_bytes:
+            raise UploadTooLargeError(
+                f"L'archive dépasse {self.max_total_bytes // (1024 * 1024)} Mo une fois décompressée"
+            )
+
+    def consume(self, size: int) -> None:
+        self.total += size
+
+
+def is_archive(filename: str) -> bool:
+    return (filename or "").lower().endswith(".zip")
+
+
+def _entry_name(info: zipfile.ZipInfo) -> str:
+    # Sans le drapeau UTF-8, zipfile décode en cp437 ; les archives créées sous
+    # Windows sont en pratique en UTF-8 ou cp850 (accents)
+    name = info.filename
+    if not info.flag_bits & 0x800:
+        try:
+            raw = name.encode("cp437")
+        except UnicodeEncodeError:
+            return name
+        try:
+            name = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            name = raw.decode("cp850")
+    return name
+
+
+def _basename(name: str) -> str:
+    base = posixpath.basename(name.replace("\\", "/"))
+    if len(base) > 255:
+        stem, ext = os.path.splitext(base)
+        base = stem[:255 - len(ext)] + ext
+    return base
+
+
+def _copy_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo, name: str, dest: str,
+                limits: ArchiveLimits) -> Tuple[str, int]:
+    """Décompresse l'entrée dans `dest` par blocs, en calculant son SHA-256.
+
+    La taille réelle est recontrôlée au fil de l'eau : l'en-tête peut mentir.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with zf.open(info) as src, open(dest, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            if size > info.file_size:
+                raise UploadTooLargeError(f"{name} : taille décompressée supérieure à celle annoncée")
+            digest.update(chunk)
+            out.write(chunk)
+    limits.consume(size)
+    return digest.hexdigest(), size
+
+
+def expand_archive(path: str, staging_file: Callable, seen: Set[str],
+                   limits: Optional[ArchiveLimits] = None, depth: int = 0) -> Tuple[List[ArchiveEntry], List[dict]]:
+    """Décompresse en flux les fichiers exploitables de l'archive `path` (ZIP imbriqués compris).
+
+    Chaque entrée est écrite dans un fichier de `staging_file()` ; celles dont le
+    SHA-256 figure déjà dans `seen` (dossier ou même envoi) sont ignorées.
+    Renvoie (entrées retenues, entrées ignorées avec leur motif). En cas d'erreur,
+    aucun fichier temporaire ne subsiste.
+    """
+    limits = limits or ArchiveLimits()
+    entries: List[ArchiveEntry] = []
+    ignored: List[dict] = []
+    try:
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = _entry_name(info)
+                filename = _basename(name)
+                if info.is_dir() or not filename or filename.startswith(".") or name.startswith(_IGNORED_PREFIXES):
+                    continue
+                ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+                if info.flag_bits & 0x1:
+                    ignored.append({"filename": name, "reason": "chiffré"})
+                    continue
+                if ext == "zip" and depth + 1 >= limits.max_depth:
+                    ignored.append({"filename": name, "reason": "archive trop imbriquée"})
+                    continue
+                if ext != "zip" and ext not in INGESTIBLE_TYPES:
+                    ignored.append({"filename": name, "reason": "format non supporté"})
+                    continue
+
+                limits.check_entry(name, info, nested_archive=ext == "zip")
+                fd, tmp = staging_file()
+                os.close(fd)
+                try:
+                    try:
+                        key, size = _copy_entry(zf, info, name, tmp, limits)
+                    except NotImplementedError:
+                        # Méthode que zipfile ne sait pas décompresser (Deflate64, PPMd...)
+                        os.remove(tmp)
+                        ignored.append({"filename": name, "reason": "compression non supportée"})
+                        continue
+                    if ext == "zip":
+                        try:
+                            nested, nested_ignored = expand_archive(tmp, staging_file, seen, limits, depth + 1)
+                            entries += nested
+                            ignored += nested_ignored
+                        except ValueError:
+                            ignored.append({"filename": name, "reason": "archive invalide"})
+                        os.remove(tmp)
+                    elif size == 0:
+                        os.remove(tmp)
+                    elif key in seen:
+                        os.remove(tmp)
+                        ignored.append({"filename": name, "reason": "doublon"})
+                    else:
+                        seen.add(key)
+                        entries.append(ArchiveEntry(filename, tmp, key, size))
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+    except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+        discard_entries(entries)
+        raise ValueError(f"Archive ZIP invalide : {e}")
+    except BaseException:
+        discard_entries(entries)
+        raise
+    return entries, ignored
+
+
+def discard_entries(entries: List[ArchiveEntry]) -> None:
+    for entry in entries:
+        if os.path.exists(entry.path):
+            os.remove(entry.path)
@@ -0,0 +1,27 @@
+from typing import List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from repositories.document_repo import DocumentRepo
+from services.blob_store import get_blob_store
+
+
+async def purge_unreferenced(db: AsyncSession, keys: List[str]) -> int:
+    """Supprime les blobs que plus aucun document ne référence ; à appeler après commit.
+
+    Le contenu est dédupliqué : une autre requête peut avoir stocké la même
+    clé sans avoir encore commité son document. Sous verrou exclusif, la
+    vérification attend ce commit ; une clé à la fois, transaction courte.
+    """
+    repo = DocumentRepo(db)
+    store = get_blob_store()
+    deleted = 0
+    for key in sorted({k for k in keys if k}):
+        try:
+            await repo.lock_blob_keys([key], exclusive=True)
+            if await repo.unreferenced_blobs([key]):
+                await store.delete(key)
+                deleted += 1
+        finally:
+            await db.commit()
+    return deleted
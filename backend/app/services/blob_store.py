@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import mimetypes
+import os
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from core.config import Config
+
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+def blob_key(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def guess_mime_type(filename: str, declared: Optional[str] = None) -> str:
+    if declared and declared != "application/octet-stream":
+        return declared
+    return mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+class BlobWriter:
+    """Blob écrit au fil de l'eau (fichier temporaire du store, SHA-256 et taille
+    calculés à l'écriture), puis déplacé dans le store par commit()."""
+
+    def __init__(self, blob_store):
+        self.blob_store = blob_store
+        fd, self.path = blob_store.staging_file()
+        self._file = os.fdopen(fd, "wb")
+        self._digest = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._digest.update(data)
+        self.size += len(data)
+
+    async def commit(self, reserve: Optional[Callable[[List[str]], Awaitable[None]]] = None) -> str:
+        """Déplace le blob dans le store ; `reserve([clé])` est attendu juste avant (verrou)."""
+        self._file.close()
+        key = self._digest.hexdigest()
+        if reserve is not None:
+            await reserve([key])
+        await self.blob_store.put_file(self.path, key)
+        return key
+
+    def discard(self) -> None:
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class LocalBlobStore:
+    """Fichiers adressés par leur SHA-256, répartis en root/ab/cd/<sha256>.
+
+    Un même contenu n'est stocké qu'une fois ; les écritures sont atomiques
+    (fichier temporaire puis os.replace).
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def staging_file(self):
+        """(fd, chemin) d'un fichier temporaire sur le même disque : put_file n'est alors qu'un renommage."""
+        staging = os.path.join(self.root, ".staging")
+        os.makedirs(staging, exist_ok=True)
+        return tempfile.mkstemp(dir=staging, suffix=".part")
+
+    def _put_bytes(self, key: str, content: bytes) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+
+    def _put_file(self, src: str, key: str) -> None:
+        path = self._path(key)
+        if os.path.exists(path):
+            os.remove(src)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.replace(src, path)
+        except OSError:
+            # Autre système de fichiers : copie puis renommage atomique
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                while piece := f.read(1024 * 1024):
+                    out.write(piece)
+            os.replace(tmp, path)
+            os.remove(src)
+
+    async def put_bytes(self, content: bytes) -> str:
+        key = blob_key(content)
+        await asyncio.to_thread(self._put_bytes, key, content)
+        return key
+
+    async def put_file(self, src: str, key: str) -> None:
+        """Déplace `src` (dont le SHA-256 est `key`) dans le store."""
+        await asyncio.to_thread(self._put_file, src, key)
+
+    async def get_bytes(self, key: str) -> bytes:
+        def read() -> bytes:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        return await asyncio.to_thread(read)
+
+    async def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None,
+                         chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        """Octets `start`..`end` (inclus) du blob, par morceaux."""
+        f = await asyncio.to_thread(open, self._path(key), "rb")
+        try:
+            await asyncio.to_thread(f.seek, start)
+            remaining = None if end is None else end - start + 1
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                piece = await asyncio.to_thread(f.read, size)
+                if not piece:
+                    break
+                if remaining is not None:
+                    remaining -= len(piece)
+                yield piece
+        finally:
+            f.close()
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        """Chemin local du blob, en lecture seule, le temps du bloc."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Blob {key} introuvable")
+        yield path
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.exists, self._path(key))
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3BlobStore:
+    """Même interface sur un bucket S3 ou compatible (MinIO...), via boto3."""
+
+    def __init__(self, bucket: str, prefix: str = "", **client_kwargs):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("BLOB_BACKEND=s3 nécessite boto3 (pip install boto3).")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.client = boto3.client("s3", **{k: v for k, v in client_kwargs.items() if v})
+
+    def _name(self, key: str) -> str:
+        return f"{self.prefix}{key[:2]}/{key[2:4]}/{key}"
+
+    def staging_file(self):
+        return tempfile.mkstemp(prefix="upload-", suffix=".part")
+
+    async def put_bytes(self, content: bytes) -> str:
+        key = blob_key(content)
+        if not await self.exists(key):
+            await asyncio.to_thread(self.client.put_object, Bucket=self.bucket, Key=self._name(key), Body=content)
+        return key
+
+    async def put_file(self, src: str, key: str) -> None:
+        if not await self.exists(key):
+            await asyncio.to_thread(self.client.upload_file, src, self.bucket, self._name(key))
+        await asyncio.to_thread(os.remove, src)
+
+    async def get_bytes(self, key: str) -> bytes:
+        def read() -> bytes:
+            return self.client.get_object(Bucket=self.bucket, Key=self._name(key))["Body"].read()
+        return await asyncio.to_thread(read)
+
+    async def iter_bytes(self, key: str, start: int = 0, end: Optional[int] = None,
+                         chunk_size: int = STREAM_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        params = {"Bucket": self.bucket, "Key": self._name(key)}
+        if start or end is not None:
+            params["Range"] = f"bytes={start}-{'' if end is None else end}"
+        body = (await asyncio.to_thread(lambda: self.client.get_object(**params)))["Body"]
+        try:
+            while piece := await asyncio.to_thread(body.read, chunk_size):
+                yield piece
+        finally:
+            body.close()
+
+    @asynccontextmanager
+    async def local_file(self, key: str) -> AsyncIterator[str]:
+        fd, path = tempfile.mkstemp(prefix="blob-")
+        os.close(fd)
+        try:
+            await asyncio.to_thread(self.client.download_file, self.bucket, self._name(key), path)
+            yield path
+        finally:
+            os.remove(path)
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self._name(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self._name(key))
+
+
+_store = None
+
+
+def get_blob_store():
+    global _store
+    if _store is None:
+        if Config.BLOB_BACKEND == "s3":
+            _store = S3BlobStore(
+                Config.S3_BUCKET,
+                prefix=Config.S3_PREFIX,
+                endpoint_url=Config.S3_ENDPOINT_URL,
+                region_name=Config.S3_REGION,
+                aws_access_key_id=Config.S3_ACCESS_KEY_ID,
+                aws_secret_access_key=Config.S3_SECRET_ACCESS_KEY,
+            )
+        else:
+            _store = LocalBlobStore(Config.BLOB_DIR)
+    return _store
@@ -1,5 +1,7 @@
-from typing import List, Tuple
+import time
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import UUID
+from core.metrics import metrics
 from repositories.chat_repository import ChatRepository
 from models.chat_session import ChatSession
 from models.chat_conversation import ChatConversation, MessageRole
@@ -20,7 +22,8 @@ class ChatService:
         
         return session
     
-    async def send_message(self, user_id: UUID, folder_id: UUID, message: str, use_rag: bool = True) -> Tuple[ChatConversation, ChatConversation, dict]:
+    async def send_message(self, user_id: UUID, folder_id: UUID, message: str, use_rag: bool = True,
+                           org_id: Optional[UUID] = None) -> Tuple[ChatConversation, ChatConversation, dict]:
         session = await self.get_or_create_session(user_id, folder_id)
         
         user_message = await self.chat_repo.add_message(
@@ -31,12 +34,12 @@ class ChatService:
         
         if use_rag:
             response = await self._generate_rag_response_with_history(
-                folder_id, message, conversation_history
+                folder_id, message, conversation_history, org_id
             )
             mode = "RAG"
         else:
             response = await self._generate_llm_response_with_history(
-                folder_id, message, conversation_history
+                folder_id, message, conversation_history, org_id
             )
             mode = "LLM"
         
@@ -49,7 +52,8 @@ class ChatService:
         return user_message, assistant_message, {
             "sources": response.get("sources", []),
             "conversation_length": len(conversation_history) + 1,
-            "mode": mode
+            "mode": mode,
+            "cached": response.get("cached", False)
         }
     
     async def get_conversation_history(self, user_id: UUID, folder_id: UUID) -> List[ChatConversation]:
@@ -60,60 +64,127 @@ class ChatService:
         
         return await self.chat_repo.get_all_messages(session.id)
     
-    async def _generate_rag_response_with_history(
-        self, 
-        folder_id: UUID, 
-        user_message: str, 
+    def _question_with_history(
+        self,
+        user_message: str,
         conversation_history: List[ChatConversation]
-    ) -> dict:
-        if conversation_history:
-            context_messages = []
-            for msg in conversation_history[-3:]:  # 3 derniers messages pour éviter overflow
-                role = "Utilisateur" if msg.role == "user" else "Assistant"
-                context_messages.append(f"{role}: {msg.content}")
-            
-            history_context = "\n".join(context_messages)
-            
-            enhanced_question = f"""
+    ) -> str:
+        if not conversation_history:
+            return user_message
+
+        context_messages = []
+        for msg in conversation_history[-3:]:  # 3 derniers messages pour éviter overflow
+            role = "Utilisateur" if msg.role == "user" else "Assistant"
+            context_messages.append(f"{role}: {msg.content}")
+
+        history_context = "\n".join(context_messages)
+
+        return f"""
 Contexte de la conversation précédente:
 {history_context}
 
 Question actuelle: {user_message}
 """
-        else:
-            enhanced_question = user_message
+
+    @staticmethod
+    def _cache_question(
+        user_message: str,
+        conversation_history: List[ChatConversation]
+    ) -> Optional[str]:
+        # L'historique contient déjà la question courante. Une relance (« et le délai ? »)
+        # dépend de la conversation : seules les questions sans contexte passent par le cache,
+        # leur texte enrichi ne dépendant que de la question elle-même
+        if len(conversation_history) > 1:
+            return None
+        return user_message
+
+    async def _generate_rag_response_with_history(
+        self, 
+        folder_id: UUID, 
+        user_message: str, 
+        conversation_history: List[ChatConversation],
+        org_id: Optional[UUID] = None
+    ) -> dict:
+        enhanced_question = self._question_with_history(user_message, conversation_history)
         
         # Utiliser votre système RAG existant
         return await self.rag_service.generate_rag_response(
-            self.db, folder_id, enhanced_question
+            self.db, folder_id, enhanced_question, org_id=org_id,
+            cache_question=self._cache_question(user_message, conversation_history)
         )
     
     async def _generate_llm_response_with_history(
         self, 
         folder_id: UUID, 
         user_message: str, 
-        conversation_history: List[ChatConversation]
+        conversation_history: List[ChatConversation],
+        org_id: Optional[UUID] = None
     ) -> dict:
-        if conversation_history:
-            context_messages = []
-            for msg in conversation_history[-3:]:  # 3 derniers messages pour éviter overflow
-                role = "Utilisateur" if msg.role == "user" else "Assistant"
-                context_messages.append(f"{role}: {msg.content}")
-            
-            history_context = "\n".join(context_messages)
-            
-            enhanced_question = f"""
-Contexte de la conversation précédente:
-{history_context}
-
-Question actuelle: {user_message}
-"""
-        else:
-            enhanced_question = user_message
+        enhanced_question = self._question_with_history(user_message, conversation_history)
         
         return await self.rag_service.generate_llm_response(
-            self.db, folder_id, enhanced_question
+            self.db, folder_id, enhanced_question, org_id=org_id,
+            cache_question=self._cache_question(user_message, conversation_history)
+        )
+
+    async def stream_message(self, user_id: UUID, folder_id: UUID, message: str, use_rag: bool = True,
+                             org_id: Optional[UUID] = None) -> AsyncIterator[dict]:
+        started = time.perf_counter()
+        session = await self.get_or_create_session(user_id, folder_id)
+
+        user_message = await self.chat_repo.add_message(
+            session.id, MessageRole.USER, message
         )
+        yield {"event": "user_message", "data": {
+            "id": str(user_message.id),
+            "role": user_message.role,
+            "content": user_message.content,
+            "created_at": user_message.created_at.isoformat(),
+        }}
+
+        conversation_history = await self.chat_repo.get_recent_messages(session.id, limit=15)
+        enhanced_question = self._question_with_history(message, conversation_history)
+
+        parts: List[str] = []
+        sources: list = []
+        cached = False
+        ttft_ms = None
+        async for event in self.rag_service.stream_response(
+            self.db, folder_id, enhanced_question, use_rag=use_rag, org_id=org_id,
+            cache_question=self._cache_question(message, conversation_history)
+        ):
+            if event["type"] == "token":
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started) * 1000.0
+                    metrics.observe("chat_ttft_ms", ttft_ms)
+                parts.append(event["content"])
+                yield {"event": "token", "data": {"content": event["content"]}}
+            elif event["type"] == "sources":
+                sources = event["sources"]
+                cached = event.get("cached", False)
+
+        # La réponse n'est persistée qu'une fois le flux terminé
+        assistant_message = await self.chat_repo.add_message(
+            session.id, MessageRole.ASSISTANT, "".join(parts)
+        )
+        await self.chat_repo.update_session_activity(session.id)
+
+        total_ms = (time.perf_counter() - started) * 1000.0
+        metrics.observe("chat_stream_total_ms", total_ms)
+        yield {"event": "done", "data": {
+            "assistant_message": {
+                "id": str(assistant_message.id),
+                "role": assistant_message.role,
+                "content": assistant_message.content,
+                "created_at": assistant_message.created_at.isoformat(),
+            },
+            "sources": sources,
+            "mode": "RAG" if use_rag else "LLM",
+            "cached": cached,
+            "conversation_length": len(conversation_history) + 1,
+            "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+            "total_ms": round(total_ms, 1),
+        }}
     
     
     async def clear_session(self, user_id: UUID, folder_id: UUID) -> bool:
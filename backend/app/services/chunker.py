@@ -0,0 +1,141 @@
+import re
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import List, Tuple
+
+from services.tokens import encoding, token_byte_lengths
+
+# Séparateurs par ordre de préférence : paragraphe, ligne, mot
+_SEPARATORS = (b"\n\n", b"\n", b" ")
+_WHITESPACE = re.compile(rb"\s")
+
+
+class TokenChunker:
+    """Découpage en chunks de `chunk_size` tokens avec `chunk_overlap` tokens de recouvrement.
+
+    Le texte n'est encodé qu'une seule fois : les offsets (en octets) de
+    chaque token servent ensuite à couper au meilleur séparateur trouvé
+    dans la seconde moitié de la fenêtre, sans jamais ré-encoder.
+    """
+
+    def __init__(self, chunk_size: int = 800, chunk_overlap: int = 120):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap doit être inférieur à chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+
+    @staticmethod
+    def _cut(data: bytes, offsets: List[int], lo: int, hi: int) -> int:
+        """Index du token avant lequel couper, dans ]lo, hi]."""
+        for sep in _SEPARATORS:
+            pos = data.rfind(sep, offsets[lo], offsets[hi])
+            if pos == -1:
+                continue
+            after = pos + len(sep)
+            i = bisect_left(offsets, after, lo, hi + 1)
+            if lo < i <= hi:
+                return i
+            # Séparateur au milieu d'un token d'espaces : couper avant ce token
+            i = bisect_right(offsets, after, lo, hi + 1) - 1
+            if lo < i <= hi:
+                return i
+        return hi
+
+    @staticmethod
+    def _overlap_start(data: bytes, offsets: List[int], lo: int, hi: int) -> int:
+        """Premier token de [lo, hi[ qui commence sur une frontière de mot."""
+        match = _WHITESPACE.search(data, offsets[lo], offsets[hi])
+        if match:
+            i = bisect_left(offsets, match.start(), lo, hi)
+            if i < hi:
+                return i
+        return lo
+
+    def split(self, text: str) -> List[str]:
+        if not text or not text.strip():
+            return []
+        return self._split(text, final=True)[0]
+
+    def stream(self, flush_chars: int = 0) -> "ChunkStream":
+        return ChunkStream(self, flush_chars or self.chunk_size * 16)
+
+    def _split(self, text: str, final: bool) -> Tuple[List[str], str]:
+        """Chunks de `text` et reste non découpé.
+
+        Si `final` est faux, la dernière fenêtre incomplète n'est pas émise :
+        elle est renvoyée (recouvrement compris) pour être complétée par la
+        suite du texte.
+        """
+        try:
+            data = text.encode("utf-8")
+        except UnicodeEncodeError:
+            # Même normalisation que tiktoken pour les surrogates isolés
+            text = text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+            data = text.encode("utf-8")
+
+        tokens = encoding().encode(text, disallowed_special=())
+        n = len(tokens)
+        if n <= self.chunk_size:
+            if not final:
+                return [], text
+            return ([text.strip()] if text.strip() else []), ""
+
+        # offsets[i] = position en octets du début du token i ; offsets[n] = fin du texte
+        lengths = token_byte_lengths()
+        offsets = [0]
+        offsets.extend(accumulate(map(lengths.__getitem__, tokens)))
+
+        chunks: List[str] = []
+        start = 0
+        while start < n:
+            if not final and n - start <= self.chunk_size:
+                break
+            end = min(start + self.chunk_size, n)
+            if end < n:
+                end = self._cut(data, offsets, start + self.chunk_size // 2, end)
+
+            # Une coupe forcée peut tomber au milieu d'un caractère multi-octets
+            chunk = data[offsets[start]:offsets[end]].decode("utf-8", errors="ignore").strip()
+            if chunk:
+                chunks.append(chunk)
+            if end >= n:
+                return chunks, ""
+            start = max(self._overlap_start(data, offsets, end - self.chunk_overlap, end), start + 1)
+
+        pos = offsets[start]
+        # Un token peut commencer au milieu d'un caractère multi-octets
+        while pos > 0 and data[pos] & 0xC0 == 0x80:
+            pos -= 1
+        return chunks, data[pos:].decode("utf-8", errors="ignore")
+
+
+class ChunkStream:
+    """Découpage incrémental d'un texte reçu par morceaux (pages, lots de pages).
+
+    Le recouvrement est conservé d'un morceau à l'autre ; seul le reste non
+    découpé (au plus une fenêtre plus `flush_chars` caractères) est gardé.
+    """
+
+    def __init__(self, chunker: TokenChunker, flush_chars: int):
+        self.chunker = chunker
+        self.flush_chars = flush_chars
+        self._parts: List[str] = []
+        self._size = 0
+
+    def feed(self, text: str) -> List[str]:
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size < self.flush_chars:
+            return []
+        chunks, rest = self.chunker._split("".join(self._parts), final=False)
+        self._parts = [rest]
+        self._size = len(rest)
+        return chunks
+
+    def close(self) -> List[str]:
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        if not text.strip():
+            return []
+        return self.chunker._split(text, final=True)[0]
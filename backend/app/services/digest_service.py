@@ -0,0 +1,196 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Config
+from core.metrics import metrics
+from repositories.document_repo import DocumentRepo
+from repositories.tender_folder_repo import TenderFolderRepo
+from services.llm_gateway import LLMGateway
+from services.tokens import group_by_tokens, token_len
+
+
+DIGEST_PROMPT = (
+    "Tu extrais une fiche de synthèse d'un document d'appel d'offres public.\n"
+    "Réponds uniquement par un objet JSON de la forme :\n"
+    '{"resume": "2 à 3 phrases", '
+    '"dates_cles": [{"libelle": "...", "date": "..."}], '
+    '"montants": [{"libelle": "...", "montant": "..."}], '
+    '"pieces_requises": ["..."], '
+    '"plan": ["titre de section", "..."]}\n'
+    "N'invente rien : laisse une liste vide si l'information est absente de l'extrait."
+)
+
+_LIST_FIELDS = {
+    "dates_cles": ("libelle", "date"),
+    "montants": ("libelle", "montant"),
+}
+_MAX_ITEMS = 40
+_MAX_CHARS = 300
+
+
+def _parse_json(content: str) -> dict:
+    content = (content or "").strip()
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end <= start:
+        raise ValueError("Réponse du LLM sans objet JSON")
+    return json.loads(content[start:end + 1])
+
+
+def _clip(value) -> str:
+    return " ".join(str(value).split())[:_MAX_CHARS]
+
+
+def _dedupe(items: List, key) -> List:
+    seen = set()
+    unique = []
+    for item in items:
+        k = key(item)
+        if k and k not in seen:
+            seen.add(k)
+            unique.append(item)
+    return unique[:_MAX_ITEMS]
+
+
+def normalize_digest(raw: dict) -> dict:
+    digest = {"resume": _clip(raw.get("resume") or "")}
+    for field, (label, value) in _LIST_FIELDS.items():
+        entries = [
+            {label: _clip(e.get(label, "")), value: _clip(e.get(value, ""))}
+            for e in raw.get(field) or [] if isinstance(e, dict) and e.get(value)
+        ]
+        digest[field] = _dedupe(entries, lambda e: (e[label].lower(), e[value].lower()))
+    for field in ("pieces_requises", "plan"):
+        entries = [_clip(e) for e in raw.get(field) or [] if isinstance(e, (str, int, float)) and str(e).strip()]
+        digest[field] = _dedupe(entries, str.lower)
+    return digest
+
+
+def merge_digests(partials: List[dict]) -> dict:
+    """Fusionne les fiches partielles (un appel par lot de texte) d'un même document."""
+    merged = {"resume": " ".join(p["resume"] for p in partials if p["resume"])[:3 * _MAX_CHARS]}
+    for field in list(_LIST_FIELDS) + ["pieces_requises", "plan"]:
+        merged[field] = [item for p in partials for item in p[field]]
+    return normalize_digest(merged)
+
+
+def remove_from_folder_digest(folder_digest: Optional[dict], document_id: UUID) -> dict:
+    doc_id = str(document_id)
+    folder_digest = folder_digest or {}
+    return {
+        "documents": [d for d in folder_digest.get("documents", []) if d["document_id"] != doc_id],
+        "dates_cles": [d for d in folder_digest.get("dates_cles", []) if d["document_id"] != doc_id],
+        "montants": [d for d in folder_digest.get("montants", []) if d["document_id"] != doc_id],
+        "pieces_requises": [d for d in folder_digest.get("pieces_requises", []) if d["document_id"] != doc_id],
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+def merge_into_folder_digest(folder_digest: Optional[dict], document_id: UUID, filename: str, digest: dict) -> dict:
+    """Remplace la contribution d'un document dans la fiche du dossier (idempotent)."""
+    rolled = remove_from_folder_digest(folder_digest, document_id)
+    origin = {"document_id": str(document_id), "document": filename}
+    rolled["documents"].append({**origin, "resume": digest["resume"]})
+    rolled["dates_cles"] += [{**e, **origin} for e in digest["dates_cles"]]
+    rolled["montants"] += [{**e, **origin} for e in digest["montants"]]
+    known = {p["piece"].lower() for p in rolled["pieces_requises"]}
+    for piece in digest["pieces_requises"]:
+        if piece.lower() not in known:
+            known.add(piece.lower())
+            rolled["pieces_requises"].append({"piece": piece, **origin})
+    return rolled
+
+
+def _token_blocks(chunks: List[str]) -> List[Tuple[str, int]]:
+    return [(c + "\n", token_len(c) + 1) for c in chunks]
+
+
+def digests_to_text(documents: List[tuple]) -> str:
+    """Rendu compact des fiches (nom de fichier, fiche) pour le prompt du mode LLM."""
+    parts = []
+    for filename, digest in documents:
+        lines = [f"--- {filename} ---", digest.get("resume", "")]
+        if digest.get("dates_cles"):
+            lines.append("Dates clés : " + " ; ".join(f"{e['libelle']} : {e['date']}" for e in digest["dates_cles"]))
+        if digest.get("montants"):
+            lines.append("Montants : " + " ; ".join(f"{e['libelle']} : {e['montant']}" for e in digest["montants"]))
+        if digest.get("pieces_requises"):
+            lines.append("Pièces requises : " + " ; ".join(digest["pieces_requises"]))
+        if digest.get("plan"):
+            lines.append("Plan : " + " | ".join(digest["plan"]))
+        parts.append("\n".join(line for line in lines if line))
+    return "\n\n".join(parts)
+
+
+class DigestService:
+    """Fiches de synthèse structurées, calculées une fois à l'ingestion."""
+
+    def __init__(self, llm: LLMGateway):
+        self.llm = llm
+
+    async def build(self, db: AsyncSession, document_id: UUID, org_id: Optional[UUID] = None,
+                    on_group: Optional[Callable[[], Awaitable[None]]] = None) -> Optional[dict]:
+        """Fiche du document ; `on_group()` est attendu après chaque lot traité par le LLM."""
+        chunks = await DocumentRepo(db).chunk_texts(document_id)
+        if not chunks:
+            return None
+        # Tokenisation hors de la boucle d'événements : un gros document la bloquerait
+        blocks = await asyncio.to_thread(_token_blocks, chunks)
+        groups = group_by_tokens(blocks, Config.DIGEST_GROUP_TOKENS)
+        slots = asyncio.Semaphore(Config.DIGEST_CONCURRENCY)
+
+        async def digest_group(group: str) -> dict:
+            async with slots:
+                content = await self.llm.complete([
+                    {"role": "system", "content": DIGEST_PROMPT},
+                    {"role": "user", "content": group},
+                ], org_id=org_id, temperature=0.0, response_format={"type": "json_object"})
+            digest = normalize_digest(_parse_json(content))
+            if on_group is not None:
+                await on_group()
+            return digest
+
+        tasks = [asyncio.create_task(digest_group(g)) for g in groups]
+        try:
+            partials = await asyncio.gather(*tasks)
+        except BaseException:
+            # Un lot en échec : les autres s'arrêtent avant que l'appelant ne reprenne la session
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        metrics.observe("digest_groups", len(groups))
+        return partials[0] if len(partials) == 1 else merge_digests(partials)
+
+    async def clear_document(self, db: AsyncSession, folder_id: UUID, document_id: UUID) -> None:
+        """Retire la fiche du document (et sa part de la fiche du dossier) avant réindexation :
+        si la nouvelle fiche échoue, le mode LLM ne répond pas sur l'ancien fichier. L'appelant commit."""
+        await DocumentRepo(db).set_digest(document_id, None)
+        folder_repo = TenderFolderRepo(db)
+        folder_digest = await folder_repo.lock_digest(folder_id)
+        if folder_digest:
+            await folder_repo.set_digest(folder_id, remove_from_folder_digest(folder_digest, document_id))
+
+    async def refresh_document(self, db: AsyncSession, folder_id: UUID, document_id: UUID,
+                               on_group: Optional[Callable[[], Awaitable[None]]] = None) -> Optional[dict]:
+        folder_repo = TenderFolderRepo(db)
+        folder = await folder_repo.get(folder_id)
+        if folder is None:
+            return None
+        # Limites par organisation de la passerelle LLM, comme pour les questions
+        digest = await self.build(db, document_id, org_id=folder.organization_id, on_group=on_group)
+        if digest is None:
+            return None
+        doc_repo = DocumentRepo(db)
+        filename = await doc_repo.set_digest(document_id, digest)
+        # Verrou sur le dossier : plusieurs workers peuvent terminer des documents du même dossier
+        folder_digest = await folder_repo.lock_digest(folder_id)
+        await folder_repo.set_digest(
+            folder_id, merge_into_folder_digest(folder_digest, document_id, filename, digest)
+        )
+        await db.commit()
+        return digest
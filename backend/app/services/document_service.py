@@ -0,0 +1,25 @@
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.document import Document
+from repositories.document_repo import DocumentRepo
+from services.blob_store import get_blob_store
+
+
+class DocumentService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.repo = DocumentRepo(db)
+        self.blob_store = get_blob_store()
+
+    async def get(self, document_id: UUID, org_id: UUID) -> Optional[Document]:
+        return await self.repo.get_in_org(document_id, org_id)
+
+    async def legacy_content(self, document_id: UUID) -> bytes:
+        """Contenu d'un document pas encore migré vers le blob store."""
+        return await self.repo.legacy_content(document_id) or b""
+
+    def iter_content(self, doc: Document, start: int, end: int) -> AsyncIterator[bytes]:
+        return self.blob_store.iter_bytes(doc.blob_key, start, end)
@@ -0,0 +1,55 @@
+import asyncio
+import time
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from core.config import Config
+from core.executors import executors
+from core.metrics import metrics
+from services.extraction import count_pages, extract_document, extract_pdf_range, merge_ocr_segments
+from services.ocr import ocr_parallel
+
+
+async def _pdf_range(path: str, first: int, last: int, file_hash: Optional[str]) -> Tuple[str, List[Dict]]:
+    part = await executors.run_cpu(extract_pdf_range, path, first, last, file_hash)
+    results = []
+    if part["ocr_pages"]:
+        started = time.perf_counter()
+        results = await ocr_parallel(path, part["ocr_pages"], file_hash)
+        elapsed = time.perf_counter() - started
+        metrics.observe("ocr_pages_per_second", len(results) / elapsed if elapsed > 0 else 0.0)
+    return merge_ocr_segments(part, results)
+
+
+async def iter_document_text(path: str, file_type: str, file_hash: Optional[str] = None,
+                             pages: Optional[int] = None) -> AsyncIterator[Tuple[str, List[Dict]]]:
+    """Texte d'un document sur disque, par plages de pages dans l'ordre, avec leur rapport.
+
+    Pour un PDF, au plus `INGEST_PAGE_WINDOW` plages de `INGEST_PAGES_PER_TASK`
+    pages sont en cours (extraction native puis OCR des pages numérisées) :
+    la mémoire dépend de la fenêtre, pas de la taille du document.
+    """
+    if (file_type or "").lower() != "pdf":
+        extraction = await executors.run_cpu(extract_document, path, file_type, file_hash=file_hash)
+        yield extraction["text"], extraction["report"]
+        return
+
+    if pages is None:
+        pages = await asyncio.to_thread(count_pages, path, file_type)
+    step = max(1, Config.INGEST_PAGES_PER_TASK)
+    ranges = iter([(first, min(first + step - 1, pages)) for first in range(1, pages + 1, step)])
+    window = deque()
+    for first, last in ranges:
+        window.append(asyncio.ensure_future(_pdf_range(path, first, last, file_hash)))
+        if len(window) >= max(1, Config.INGEST_PAGE_WINDOW):
+            break
+    try:
+        while window:
+            text, report = await window.popleft()
+            following = next(ranges, None)
+            if following:
+                window.append(asyncio.ensure_future(_pdf_range(path, *following, file_hash)))
+            yield text, report
+    finally:
+        for task in window:
+            task.cancel()
@@ -0,0 +1,91 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.executors import executors
+from core.metrics import metrics
+
+
+class QueryEmbeddingBatcher:
+    """Regroupe les questions arrivant à quelques ms d'intervalle en un seul `encode`.
+
+    Un cache LRU borné évite de ré-encoder une question déjà vue, et les
+    questions identiques en vol partagent le même futur.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], List[List[float]]],
+                 max_batch: int, max_wait_ms: float, cache_size: int):
+        self.encode_fn = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> List[float]:
+        key = text.strip()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            metrics.incr("query_embedding_cache_hits")
+            return cached
+        metrics.incr("query_embedding_cache_misses")
+
+        future = self._pending.get(key)
+        if future is None:
+            self._ensure_worker()
+            future = asyncio.get_running_loop().create_future()
+            self._pending[key] = future
+            self._queue.put_nowait((key, time.perf_counter()))
+        return await asyncio.shield(future)
+
+    def _ensure_worker(self) -> None:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def _collect(self) -> List[Tuple[str, float]]:
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            dispatched = time.perf_counter()
+            keys = [key for key, _ in batch]
+            metrics.observe("query_batch_size", len(batch))
+            for _, enqueued in batch:
+                metrics.observe("query_batch_wait_ms", (dispatched - enqueued) * 1000.0)
+            try:
+                vectors = await executors.run_inference(self.encode_fn, keys)
+            except Exception as e:
+                for key in keys:
+                    future = self._pending.pop(key, None)
+                    if future and not future.done():
+                        future.set_exception(e)
+                continue
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+                future = self._pending.pop(key, None)
+                if future and not future.done():
+                    future.set_result(vector)
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,492 @@
+import hashlib
+import os
+import re
+import shutil
+import sys
+import time
+import unicodedata
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple, Union
+
+import docx
+import fitz
+import pytesseract
+from PIL import Image
+
+from services.extraction_cache import ExtractionCache, get_extraction_cache
+
+# À incrémenter dès que le texte produit change : invalide le cache d'extraction
+EXTRACTOR_VERSION = "4"
+
+# Valeurs par défaut du rendu OCR (surchargées par la config côté orchestrateur)
+OCR_MIN_DPI = 150
+OCR_MAX_DPI = 300
+OCR_MAX_PIXELS = 12_000_000
+OCR_PAGE_TIMEOUT_SECONDS = 120
+# En dessous de cette proportion de pixels non blancs, la page est considérée vide
+_BLANK_INK_RATIO = 0.002
+# Au-delà, la page est dense (petits caractères, tableaux) : résolution maximale
+_DENSE_INK_RATIO = 0.15
+_INK_BYTES = bytes(range(200, 256))
+# Une page avec au moins ce nombre de caractères natifs n'est pas OCRisée
+_MIN_NATIVE_CHARS = 40
+# Sinon, elle l'est si ses images couvrent au moins cette part de sa surface
+_MIN_SCAN_COVERAGE = 0.3
+
+
+def configure_tesseract() -> None:
+    tess_cmd = os.getenv("TESSERACT_CMD") or shutil.which("tesseract") or "/usr/bin/tesseract"
+    pytesseract.pytesseract.tesseract_cmd = tess_cmd
+    # Parallélisme au niveau des pages : un seul thread OpenMP par Tesseract
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+# Ne remplace que les tabulations et les espaces multiples (l'espace simple est laissé tel quel)
+_SPACES = re.compile(r"\t[ \t]*| [ \t]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_ASTRAL = re.compile(r"[\U00010000-\U0010ffff]")
+_CONTROL_CHARS = None
+
+
+def _char_class(first: int, last: int) -> "re.Pattern":
+    ranges = []
+    start = None
+    for cp in range(first, last + 2):
+        drop = cp <= last and (
+            cp == 0xFFFD or (unicodedata.category(chr(cp))[0] == "C" and chr(cp) not in "\n\t\r")
+        )
+        if drop and start is None:
+            start = cp
+        elif not drop and start is not None:
+            ranges.append(f"\\U{start:08x}-\\U{cp - 1:08x}")
+            start = None
+    return re.compile("[" + "".join(ranges) + "]+")
+
+
+def _control_chars() -> Tuple["re.Pattern", "re.Pattern"]:
+    """Caractères de catégorie Unicode C (sauf \\n \\t \\r) et U+FFFD, en deux classes regex.
+
+    Construites une fois par processus à partir de la base Unicode de
+    l'interpréteur, pour rester identiques au filtre caractère par caractère
+    d'origine. La classe BMP est compilée en bitmap par `re` ; celle des plans
+    supplémentaires (lente) n'est appliquée que si le texte en contient.
+    """
+    global _CONTROL_CHARS
+    if _CONTROL_CHARS is None:
+        _CONTROL_CHARS = (_char_class(0, 0xFFFF), _char_class(0x10000, sys.maxunicode))
+    return _CONTROL_CHARS
+
+
+def _is_word(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _join_hyphenated(s: str) -> str:
+    """Équivalent de re.sub(r"(\\w)-\\n(\\w)", r"\\1\\2", s) sans balayer tout le texte."""
+    if "-\n" not in s:
+        return s
+    parts = s.split("-\n")
+    out = [parts[0]]
+    # Comme la regex, un caractère déjà consommé par la jonction précédente ne compte pas
+    consumed = False
+    for prev, part in zip(parts, parts[1:]):
+        if prev and part and _is_word(prev[-1]) and _is_word(part[0]) and not (consumed and len(prev) == 1):
+            consumed = True
+        else:
+            out.append("-\n")
+            consumed = False
+        out.append(part)
+    return "".join(out)
+
+
+def _clean_text(s: str) -> str:
+    if not s:
+        return ""
+    bmp, astral = _control_chars()
+    s = bmp.sub("", s)
+    if _ASTRAL.search(s):
+        s = astral.sub("", s)
+    s = _join_hyphenated(s)
+    s = _SPACES.sub(" ", s)
+    if "\n\n\n" in s:
+        s = _BLANK_LINES.sub("\n\n", s)
+    s = "\n".join(map(str.strip, s.split("\n")))
+    if not unicodedata.is_normalized("NFKC", s):
+        s = unicodedata.normalize("NFKC", s)
+    return s.strip()
+
+
+def _table_row(row) -> str:
+    cells = " | ".join(_clean_text(str(c)) if c else "" for c in row)
+    return _SPACES.sub(" ", cells).strip()
+
+
+
+def _needs_ocr(page: "fitz.Page", text: str) -> bool:
+    if len(text.strip()) >= _MIN_NATIVE_CHARS:
+        return False
+    area = abs(page.rect)
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return area > 0 and covered / area >= _MIN_SCAN_COVERAGE
+
+
+def _has_ruling_lines(page: "fitz.Page", min_lines: int = 2) -> bool:
+    """Présence de filets horizontaux et verticaux : condition pour chercher des tableaux."""
+    horizontal = vertical = 0
+    for path in page.get_drawings():
+        for item in path["items"]:
+            if item[0] == "l":
+                p1, p2 = item[1], item[2]
+                if abs(p1.y - p2.y) < 1:
+                    horizontal += 1
+                elif abs(p1.x - p2.x) < 1:
+                    vertical += 1
+            elif item[0] == "re":
+                r = item[1]
+                if r.height < 2 and r.width > 10:
+                    horizontal += 1
+                elif r.width < 2 and r.height > 10:
+                    vertical += 1
+                elif r.width > 10 and r.height > 10:
+                    horizontal += 2
+                    vertical += 2
+            if horizontal >= min_lines and vertical >= min_lines:
+                return True
+    return False
+
+
+def _native_page(page: "fitz.Page", number: int, text: str) -> Tuple[str, int]:
+    """Texte natif de la page suivi de ses tableaux, et nombre de tableaux."""
+    out = f"\n--- Page {number} ---\n{_clean_text(text)}\n" if text.strip() else ""
+    if not _has_ruling_lines(page):
+        return out, 0
+    try:
+        tables = page.find_tables().tables
+    except Exception as e:
+        print(f"[EXTRACT] Détection des tableaux page {number} échouée: {e}")
+        return out, 0
+    for tnum, table in enumerate(tables, start=1):
+        rows = [row for row in table.extract() if row and any(cell for cell in row)]
+        if rows:
+            out += f"\n--- Tableau {tnum} (Page {number}) ---\n"
+            out += "".join(_table_row(row) + "\n" for row in rows)
+            out += "--- Fin tableau ---\n\n"
+    return out, len(tables)
+
+
+def _ocr_dpi(page: "fitz.Page", min_dpi: int, max_dpi: int, max_pixels: int) -> int:
+    """Résolution de rendu d'une page scannée, 0 si la page est blanche.
+
+    La densité d'encre est mesurée sur une vignette à 36 dpi ; la résolution
+    ne dépasse jamais celle de l'image numérisée embarquée, et le nombre de
+    pixels est plafonné pour borner la mémoire des grands formats (A3, plans).
+    """
+    thumb = page.get_pixmap(dpi=36, colorspace=fitz.csGRAY, alpha=False)
+    samples = thumb.samples
+    if not samples:
+        return 0
+    # Proportion de pixels non blancs, comptée en C
+    ink = len(samples.translate(None, _INK_BYTES)) / len(samples)
+    if ink < _BLANK_INK_RATIO:
+        return 0
+    dpi = min_dpi + (max_dpi - min_dpi) * min(1.0, ink / _DENSE_INK_RATIO)
+
+    rect = page.rect
+    native = 0.0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info["bbox"])
+        if bbox.width >= rect.width * 0.5 and bbox.width > 0:
+            native = max(native, info["width"] * 72 / bbox.width)
+    if native:
+        dpi = min(dpi, native)
+
+    dpi = max(min_dpi, min(dpi, max_dpi))
+    area_in2 = (rect.width / 72) * (rect.height / 72)
+    if area_in2 > 0:
+        dpi = min(dpi, (max_pixels / area_in2) ** 0.5)
+    return max(1, int(dpi))
+
+
+def _ocr_page(page: "fitz.Page", number: int, dpi: int, lang: str, timeout: float) -> Optional[str]:
+    """OCR d'une page ; None si le rendu échoue ou si Tesseract dépasse le délai."""
+    try:
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        img = Image.frombytes("L", (pix.width, pix.height), pix.samples)
+        del pix
+    except Exception as page_error:
+        print(f"[OCR] Rendu page {number} échoué: {page_error}")
+        return None
+    try:
+        return _clean_text(pytesseract.image_to_string(img, lang=lang, timeout=timeout) or "")
+    except pytesseract.TesseractNotFoundError:
+        raise RuntimeError("Tesseract introuvable. Installe tesseract-ocr (+ packs fra/eng).")
+    except Exception as ocr_error:
+        # pytesseract lève RuntimeError("Tesseract process timeout") au-delà de `timeout`
+        print(f"[OCR] Erreur page {number} (dpi={dpi}): {ocr_error}")
+        return None
+    finally:
+        img.close()
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def ocr_pages(source: Union[str, bytes], numbers: List[int], lang: str,
+              file_hash: Optional[str] = None, min_dpi: int = OCR_MIN_DPI,
+              max_dpi: int = OCR_MAX_DPI, max_pixels: int = OCR_MAX_PIXELS,
+              page_timeout: float = OCR_PAGE_TIMEOUT_SECONDS) -> List[Dict]:
+    """OCR des pages `numbers` (numérotées à partir de 1) d'un PDF.
+
+    `source` est un chemin (cas du process pool : rien de volumineux à
+    sérialiser) ou les octets du fichier. Une seule page est rendue à la fois.
+    Renvoie une entrée de rapport par page, texte compris.
+    """
+    doc = _open_pdf(source)
+    cache = get_extraction_cache() if file_hash else None
+    results = []
+    try:
+        for number in numbers:
+            started = time.perf_counter()
+            page_key = None
+            if cache:
+                page_key = ExtractionCache.make_key(
+                    "ocr-page", file_hash, number, lang, min_dpi, max_dpi, max_pixels, EXTRACTOR_VERSION
+                )
+                cached = cache.get(page_key)
+                if cached is not None:
+                    results.append({"page": number, "method": "ocr-cache", "text": cached["text"],
+                                    "ms": _elapsed_ms(started)})
+                    continue
+            page = doc[number - 1]
+            try:
+                dpi = _ocr_dpi(page, min_dpi, max_dpi, max_pixels)
+            except Exception as dpi_error:
+                print(f"[OCR] Analyse page {number} échouée: {dpi_error}")
+                dpi = min_dpi
+            text = _ocr_page(page, number, dpi, lang, page_timeout) if dpi else ""
+            # Un échec (délai, rendu) n'est pas mis en cache : nouvel essai à la prochaine ingestion
+            if text is not None and cache:
+                cache.put(page_key, {"text": text})
+            method = "vide" if not dpi else ("ocr" if text is not None else "ocr-echec")
+            results.append({"page": number, "method": method, "dpi": dpi, "text": text or "",
+                            "ms": _elapsed_ms(started)})
+    finally:
+        doc.close()
+    return results
+
+
+def merge_ocr_segments(extraction: Dict, results: List[Dict]) -> Tuple[str, List[Dict]]:
+    """Texte (pages dans l'ordre, non strippé) et rapport d'une extraction PDF
+    partielle complétée par le résultat de l'OCR de ses pages."""
+    segments = dict(extraction["segments"])
+    report = list(extraction["report"])
+    for r in results:
+        text = r.pop("text")
+        segments[r["page"]] = f"\n--- Page {r['page']} ---\n{text}\n" if text.strip() else ""
+        report.append(r)
+    report.sort(key=lambda r: r["page"])
+    return "".join(segments[n] for n in sorted(segments)), report
+
+
+def merge_ocr_pages(extraction: Dict, results: List[Dict]) -> Dict:
+    """Complète une extraction PDF partielle avec le résultat de l'OCR de ses pages."""
+    text, report = merge_ocr_segments(extraction, results)
+    return {"text": text.strip(), "pages": extraction["pages"], "report": report}
+
+
+def _open_pdf(source: Union[str, bytes]) -> "fitz.Document":
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+def _scan_pages(doc: "fitz.Document", numbers: range) -> Dict:
+    """Classe et extrait les pages `numbers` : segments natifs, rapport, pages à OCRiser."""
+    segments: Dict[int, str] = {}
+    report: List[Dict] = []
+    pending: List[int] = []
+    for number in numbers:
+        started = time.perf_counter()
+        try:
+            page = doc[number - 1]
+            text = page.get_text("text", sort=True)
+            if _needs_ocr(page, text):
+                pending.append(number)
+                continue
+            segments[number], tables = _native_page(page, number, text)
+            method = "native" if text.strip() else "vide"
+        except Exception as e:
+            print(f"[EXTRACT] Erreur page {number} ({e}) → OCR")
+            pending.append(number)
+            continue
+        report.append({"page": number, "method": method, "tables": tables, "ms": _elapsed_ms(started)})
+    return {"segments": segments, "report": report, "ocr_pages": pending}
+
+
+def extract_pdf_range(path: str, first: int, last: int, file_hash: Optional[str] = None) -> Dict:
+    """Pages `first`..`last` d'un PDF sur disque, sans OCR (voir `_scan_pages`).
+
+    Unité de travail du pipeline d'ingestion : seul le texte de la plage
+    traverse la frontière du process pool. Résultat mis en cache par plage.
+    """
+    cache = get_extraction_cache() if file_hash else None
+    key = None
+    if cache:
+        key = ExtractionCache.make_key("pdf-range", file_hash, first, last, EXTRACTOR_VERSION)
+        cached = cache.get(key)
+        if cached is not None:
+            cached["segments"] = {int(n): t for n, t in cached["segments"].items()}
+            return cached
+    doc = fitz.open(path)
+    try:
+        part = _scan_pages(doc, range(first, min(last, len(doc)) + 1))
+    finally:
+        doc.close()
+    if cache:
+        cache.put(key, part)
+    return part
+
+
+def _extract_pdf(source: Union[str, bytes], file_hash: Optional[str] = None, ocr: bool = True) -> Dict:
+    """Extraction PDF en un seul passage PyMuPDF, méthode choisie page par page.
+
+    Texte natif quand il existe, tableaux seulement sur les pages à filets,
+    OCR seulement sur les pages numérisées. Avec `ocr=False`, ces dernières
+    sont laissées dans `ocr_pages` (texte None) pour l'OCR parallèle
+    (services.ocr) ; sinon elles sont OCRisées ici, séquentiellement.
+    """
+    doc = _open_pdf(source)
+    try:
+        pages = len(doc)
+        part = _scan_pages(doc, range(1, pages + 1))
+    finally:
+        doc.close()
+    segments, report, pending = part["segments"], part["report"], part["ocr_pages"]
+
+    extraction = {"text": None, "pages": pages, "segments": segments, "report": report, "ocr_pages": pending}
+    print(f"[EXTRACT] PDF {pages} pages : natives={len(segments)} ocr={len(pending)}")
+    if not pending:
+        return merge_ocr_pages(extraction, [])
+    if not ocr:
+        return extraction
+    lang = os.getenv("RAG_LANGS", "fra+eng")
+    return merge_ocr_pages(extraction, ocr_pages(source, pending, lang, file_hash))
+
+
+def _read(source: Union[str, bytes]) -> bytes:
+    if isinstance(source, bytes):
+        return source
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while piece := f.read(1024 * 1024):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+def _extract(source: Union[str, bytes], file_type: str, file_hash: Optional[str] = None, ocr: bool = True) -> Dict:
+    """`source` : chemin du fichier ou son contenu."""
+    try:
+        ftype = (file_type or "").lower()
+
+        if ftype == "pdf":
+            try:
+                extraction = _extract_pdf(source, file_hash=file_hash, ocr=ocr)
+            except Exception as e:
+                # PDF illisible par PyMuPDF : rien à OCRiser non plus
+                print(f"[EXTRACT] Erreur PDF ({e})")
+                return {"text": "", "pages": 1, "report": []}
+            if extraction["text"] is not None:
+                print(f"[EXTRACT] PDF chars={len(extraction['text'])}")
+            return extraction
+
+        if ftype in {"docx", "doc"}:
+            d = docx.Document(source if isinstance(source, str) else BytesIO(source))
+            text = "\n".join(p.text for p in d.paragraphs)
+            print(f"[EXTRACT] DOCX/DOC chars={len(text)}")
+            return {"text": _clean_text(text), "pages": 1, "report": []}
+
+        if ftype in {"txt", "csv"}:
+            file_content = _read(source)
+            text = ""
+            for enc in ["utf-8", "latin-1", "cp1252", "iso-8859-1"]:
+                try:
+                    text = file_content.decode(enc)
+                    break
+                except Exception:
+                    continue
+            if not text:
+                text = file_content.decode("utf-8", errors="ignore")
+            print(f"[EXTRACT] {ftype.upper()} chars={len(text)}")
+            return {"text": _clean_text(text), "pages": 1, "report": []}
+
+        print(f"[EXTRACT] Format non supporté: {ftype}")
+        return {"text": "", "pages": 1, "report": []}
+
+    except Exception as e:
+        print(f"[EXTRACT] Erreur extraction générique: {e}")
+        try:
+            text = _read(source).decode("utf-8", errors="ignore")
+            return {"text": _clean_text(text), "pages": 1, "report": []}
+        except Exception:
+            return {"text": "", "pages": 1, "report": []}
+
+
+def extract_text(file_content: bytes, file_type: str, file_hash: Optional[str] = None) -> str:
+    return _extract(file_content, file_type, file_hash=file_hash)["text"]
+
+
+def count_pages(source: Union[str, bytes], file_type: str) -> int:
+    if (file_type or "").lower() != "pdf":
+        return 1
+    try:
+        doc = _open_pdf(source)
+    except Exception:
+        return 1
+    try:
+        return len(doc)
+    finally:
+        doc.close()
+
+
+def document_cache_key(file_hash: str, file_type: str) -> str:
+    ocr_langs = os.getenv("RAG_LANGS", "fra+eng")
+    return ExtractionCache.make_key("document", file_hash, (file_type or "").lower(), ocr_langs, EXTRACTOR_VERSION)
+
+
+def store_document(file_hash: str, file_type: str, extraction: Dict) -> None:
+    cache = get_extraction_cache()
+    if cache is not None:
+        cache.put(document_cache_key(file_hash, file_type), {
+            "text": extraction["text"], "pages": extraction["pages"], "report": extraction["report"],
+        })
+
+
+def extract_document(source: Union[str, bytes], file_type: str, ocr: bool = True,
+                     file_hash: Optional[str] = None) -> Dict:
+    """{"text", "pages", "report"} ; pour un PDF avec des pages à OCRiser et
+    `ocr=False` : text None, plus "segments" et "ocr_pages" (voir `_extract_pdf`).
+
+    `source` est de préférence un chemin : les PDF et DOCX sont alors lus
+    depuis le disque sans copie intégrale en mémoire.
+    """
+    cache = get_extraction_cache()
+    if cache is None:
+        return _extract(source, file_type, ocr=ocr)
+
+    if file_hash is None:
+        file_hash = _file_sha256(source) if isinstance(source, str) else ExtractionCache.file_hash(source)
+    cached = cache.get(document_cache_key(file_hash, file_type))
+    if cached is not None:
+        print(f"[EXTRACT] cache hit sha256={file_hash[:12]} chars={len(cached['text'])}")
+        return cached
+
+    extraction = _extract(source, file_type, file_hash=file_hash, ocr=ocr)
+    if extraction["text"] is not None:
+        store_document(file_hash, file_type, extraction)
+    return extraction
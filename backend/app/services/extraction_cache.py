@@ -0,0 +1,121 @@
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from typing import Optional
+
+
+class ExtractionCache:
+    """Cache disque du texte extrait, adressé par le contenu des fichiers.
+
+    Les clés combinent le SHA-256 du fichier, la version de l'extracteur et
+    les langues OCR ; un même CPS/RC ré-uploadé ne repasse donc ni par
+    l'extraction PDF ni par Tesseract. Les entrées sont compressées et évincées
+    par ordre d'accès (mtime) au-delà de `max_bytes`.
+
+    Partagé entre processus (workers d'extraction) : écritures atomiques via
+    os.replace, la taille totale n'est qu'une estimation par processus.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._approx_size: Optional[int] = None
+
+    @staticmethod
+    def file_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        return hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.json.z")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error):
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return payload
+
+    def put(self, key: str, payload: dict) -> None:
+        path = self._path(key)
+        data = zlib.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[CACHE] écriture impossible ({e})")
+            return
+        if self._approx_size is None:
+            self._approx_size = self._scan_size()
+        else:
+            self._approx_size += len(data)
+        if self._approx_size > self.max_bytes:
+            self._evict()
+
+    def _entries(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        self._approx_size = total
+        if removed:
+            print(f"[CACHE] éviction de {removed} entrée(s), taille={total / 1e6:.1f} Mo")
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_cache: Optional[ExtractionCache] = None
+
+
+def get_extraction_cache() -> Optional[ExtractionCache]:
+    global _cache
+    from core.config import Config
+
+    if not Config.EXTRACTION_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        root = Config.EXTRACTION_CACHE_DIR or os.path.join(tempfile.gettempdir(), "intelliao-extraction-cache")
+        _cache = ExtractionCache(root, Config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
+    return _cache
@@ -0,0 +1,104 @@
+import posixpath
+from datetime import datetime
+from functools import partial
+from typing import AsyncIterator, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.session import AsyncSessionLocal
+from models.chat_conversation import MessageRole
+from models.tender_folder import TenderFolder
+from repositories.chat_repository import ChatRepository
+from repositories.document_repo import DocumentRepo
+from repositories.tender_folder_repo import TenderFolderRepo
+from services.blob_store import get_blob_store
+from services.zip_stream import ZipEntry
+
+
+class _UniqueNames:
+    """Chemins uniques dans l'archive : « a.pdf », « a (2).pdf »..."""
+
+    def __init__(self):
+        self._taken = set()
+
+    def take(self, path: str) -> str:
+        stem, ext = posixpath.splitext(path)
+        candidate, n = path, 1
+        while candidate.lower() in self._taken:
+            n += 1
+            candidate = f"{stem} ({n}){ext}"
+        self._taken.add(candidate.lower())
+        return candidate
+
+
+def _safe_filename(filename: str, fallback: str) -> str:
+    # Jamais de sous-dossier ni de remontée (« ../ ») dans l'archive
+    name = posixpath.basename((filename or "").replace("\\", "/")).strip()
+    return name if name not in ("", ".", "..") else fallback
+
+
+async def _legacy_chunks(document_id: UUID, size: int) -> AsyncIterator[bytes]:
+    # Lu pendant l'envoi de la réponse : session propre, indépendante de la requête
+    async with AsyncSessionLocal() as db:
+        async for piece in DocumentRepo(db).iter_legacy_content(document_id, size):
+            yield piece
+
+
+async def _single(content: bytes) -> AsyncIterator[bytes]:
+    yield content
+
+
+def render_transcript(folder_name: str, messages) -> str:
+    labels = {MessageRole.USER.value: "Question", MessageRole.ASSISTANT.value: "Réponse"}
+    lines = [f"# Conversation — {folder_name}", "", f"Exportée le {datetime.utcnow():%Y-%m-%d %H:%M} UTC", ""]
+    for message in messages:
+        when = f" — {message.created_at:%Y-%m-%d %H:%M}" if message.created_at else ""
+        lines += [f"## {labels.get(message.role, message.role)}{when}", "", message.content.strip(), ""]
+    return "\n".join(lines)
+
+
+class FolderExportService:
+    """Contenu de l'export ZIP d'un dossier : fichiers, textes extraits et conversation."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.folder_repo = TenderFolderRepo(db)
+        self.doc_repo = DocumentRepo(db)
+        self.chat_repo = ChatRepository(db)
+        self.blob_store = get_blob_store()
+
+    async def folder_entries(self, folder_id: UUID, org_id: UUID, user_id: UUID, *,
+                             include_text: bool = False,
+                             include_chat: bool = False) -> Optional[Tuple[TenderFolder, List[ZipEntry]]]:
+        folder = await self.folder_repo.get_with_docs(folder_id, org_id)
+        if not folder:
+            return None
+        legacy_sizes = await self.doc_repo.legacy_sizes(folder_id)
+
+        names = _UniqueNames()
+        files: List[ZipEntry] = []
+        texts: List[ZipEntry] = []
+        for doc in sorted(folder.documents, key=lambda d: (d.created_at or datetime.min, d.filename)):
+            filename = _safe_filename(doc.filename, f"document-{doc.id}")
+            if doc.blob_key:
+                files.append(ZipEntry(names.take(f"documents/{filename}"), doc.size, doc.created_at,
+                                      partial(self.blob_store.iter_bytes, doc.blob_key)))
+            elif doc.id in legacy_sizes:
+                size = legacy_sizes[doc.id] or 0
+                files.append(ZipEntry(names.take(f"documents/{filename}"), size, doc.created_at,
+                                      partial(_legacy_chunks, doc.id, size)))
+            # Texte disponible pour les documents ingérés depuis son introduction
+            if include_text and doc.text_key:
+                texts.append(ZipEntry(names.take(f"textes/{filename}.txt"), doc.text_size, doc.created_at,
+                                      partial(self.blob_store.iter_bytes, doc.text_key)))
+
+        entries = files + texts
+        if include_chat:
+            session = await self.chat_repo.get_session_by_user_and_folder(user_id, folder_id)
+            messages = await self.chat_repo.get_all_messages(session.id) if session else []
+            if messages:
+                content = render_transcript(folder.name, messages).encode("utf-8")
+                entries.append(ZipEntry(names.take("conversation.md"), len(content), datetime.utcnow(),
+                                        partial(_single, content)))
+        return folder, entries
@@ -0,0 +1,41 @@
+import time
+from typing import Dict, Optional
+
+
+class IngestionProgress:
+    """Suivi des étapes d'une ingestion (durées et compteurs).
+
+    L'implémentation de base ne persiste rien ; le worker d'ingestion la
+    spécialise pour écrire l'avancement dans la table `ingestion_jobs`.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._stage: Optional[str] = None
+        self._stage_started: float = 0.0
+
+    async def stage(self, name: str, **counters) -> None:
+        self._close_stage()
+        self._stage = name
+        self._stage_started = time.perf_counter()
+        await self.flush(stage=name, **counters)
+
+    async def update(self, **counters) -> None:
+        await self.flush(**counters)
+
+    async def finish(self) -> None:
+        self._close_stage()
+        self._stage = None
+        await self.flush()
+
+    def add_time(self, name: str, seconds: float) -> None:
+        """Durée d'une activité entrelacée avec d'autres au sein d'une étape."""
+        self.timings[name] = round(self.timings.get(name, 0.0) + seconds, 3)
+
+    def _close_stage(self) -> None:
+        if self._stage:
+            elapsed = time.perf_counter() - self._stage_started
+            self.timings[self._stage] = round(self.timings.get(self._stage, 0.0) + elapsed, 3)
+
+    async def flush(self, **values) -> None:
+        pass
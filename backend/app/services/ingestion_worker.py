@@ -0,0 +1,215 @@
+import asyncio
+import os
+import tempfile
+import time
+import traceback
+from contextlib import asynccontextmanager
+from typing import List
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Config
+from db.session import AsyncSessionLocal
+from repositories.answer_cache_repo import AnswerCacheRepo
+from repositories.document_repo import DocumentRepo
+from repositories.ingestion_job_repo import IngestionJobRepo
+from services.blob_store import get_blob_store
+from services.digest_service import DigestService
+from services.ingestion_progress import IngestionProgress
+from services.llm_gateway import llm_gateway
+from services.model_registry import model_registry
+from services.rag_service import RAGService, rag_service
+
+
+class JobProgress(IngestionProgress):
+    def __init__(self, db: AsyncSession, job_id: UUID):
+        super().__init__()
+        self.repo = IngestionJobRepo(db)
+        self.db = db
+        self.job_id = job_id
+
+    async def flush(self, **values) -> None:
+        await self.repo.update_progress(self.job_id, stage_timings=dict(self.timings), **values)
+        await self.db.commit()
+
+
+class IngestionWorkerPool:
+    """Workers asyncio qui consomment la file `ingestion_jobs` stockée en base."""
+
+    def __init__(self, rag_service: RAGService, digest_service: DigestService):
+        self.rag_service = rag_service
+        self.digest_service = digest_service
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._last_sweep = 0.0
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        await self._sweep()
+        self._tasks = [
+            asyncio.create_task(self._worker(n)) for n in range(Config.INGESTION_WORKERS)
+        ]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    async def _sweep(self) -> None:
+        # Au démarrage puis périodiquement
+        self._last_sweep = time.monotonic()
+        await self._requeue_stale()
+        try:
+            await self.rag_service.evict_chunk_vectors()
+        except Exception as e:
+            print(f"[EMBEDDING] éviction du store des vecteurs impossible: {e}")
+
+    async def _requeue_stale(self) -> None:
+        # Jobs d'un processus tué sans pouvoir les libérer (crash, SIGKILL) :
+        # ils sont repris par n'importe quel processus
+        async with AsyncSessionLocal() as db:
+            requeued, abandoned = await IngestionJobRepo(db).requeue_stale(Config.INGESTION_STALE_SECONDS)
+            await db.commit()
+        if requeued:
+            print(f"[INGESTION] {requeued} job(s) interrompu(s) remis en file")
+        if abandoned:
+            print(f"[INGESTION] {abandoned} job(s) interrompu(s) en échec : tentatives épuisées")
+
+    async def _release(self, job_id: UUID) -> None:
+        # Appelé pendant l'annulation : nouvelle session, l'ancienne est déjà fermée
+        try:
+            async with AsyncSessionLocal() as db:
+                released = await IngestionJobRepo(db).release(job_id)
+                await db.commit()
+            if released:
+                print(f"[INGESTION] job={job_id} interrompu par l'arrêt, remis en file")
+        except Exception as e:
+            print(f"[INGESTION] job={job_id} non remis en file ({e}), repris après {Config.INGESTION_STALE_SECONDS}s")
+
+    async def _idle(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=Config.INGESTION_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                # Ne pas consommer de tentatives tant que le modèle n'est pas chargé
+                if not model_registry.ready:
+                    await self._idle()
+                    continue
+                if time.monotonic() - self._last_sweep > Config.INGESTION_STALE_SECONDS / 2:
+                    await self._sweep()
+                job_id = await self._claim()
+                if job_id is None:
+                    await self._idle()
+                    continue
+                try:
+                    await self._run(job_id)
+                except asyncio.CancelledError:
+                    await self._release(job_id)
+                    raise
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[INGESTION] worker {n} erreur inattendue: {e}")
+                await self._idle()
+
+    async def _claim(self):
+        async with AsyncSessionLocal() as db:
+            job = await IngestionJobRepo(db).claim_next()
+            job_id = job.id if job else None
+            await db.commit()
+            return job_id
+
+    async def _run(self, job_id: UUID) -> None:
+        async with AsyncSessionLocal() as db:
+            repo = IngestionJobRepo(db)
+            job = await repo.get(job_id)
+            if job is None:
+                return
+            attempts, max_attempts = job.attempts, job.max_attempts
+            folder_id, document_id = job.tender_folder_id, job.document_id
+            progress = JobProgress(db, job_id)
+            try:
+                doc_repo = DocumentRepo(db)
+                async with self._document_file(doc_repo, document_id) as (path, file_type, file_hash):
+                    # Reprise idempotente : on repart d'un index vide (et sans fiche) pour ce document
+                    await doc_repo.delete_embeddings(document_id)
+                    await self.digest_service.clear_document(db, folder_id, document_id)
+                    await db.commit()
+
+                    await self.rag_service.process_document(
+                        db=db,
+                        tender_folder_id=folder_id,
+                        document_id=document_id,
+                        file_path=path,
+                        file_type=file_type,
+                        file_hash=file_hash,
+                        progress=progress,
+                    )
+                if Config.DIGEST_ENABLED:
+                    await progress.stage("digest")
+                    await self._digest(db, folder_id, document_id, progress)
+                await progress.finish()
+                await repo.mark_done(job_id)
+                # Le corpus du dossier a changé : les réponses en cache ne sont plus fiables
+                await AnswerCacheRepo(db).invalidate_folder(folder_id)
+                await db.commit()
+                print(f"[INGESTION] job={job_id} terminé timings={progress.timings}")
+            except Exception as e:
+                await db.rollback()
+                retry_in = None
+                if attempts < max_attempts:
+                    retry_in = Config.INGESTION_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+                print(f"[INGESTION] job={job_id} échec tentative {attempts}/{max_attempts}: {e}")
+                traceback.print_exc()
+                await repo.mark_failed(job_id, str(e), retry_in)
+                await db.commit()
+
+    @asynccontextmanager
+    async def _document_file(self, doc_repo: DocumentRepo, document_id: UUID):
+        """(chemin local, type, sha256) du fichier, le temps de l'ingestion."""
+        info = await doc_repo.get_blob_info(document_id)
+        if info is None:
+            raise FileNotFoundError(f"Document {document_id} introuvable")
+        if info.blob_key:
+            async with get_blob_store().local_file(info.blob_key) as path:
+                yield path, info.file_type, info.sha256
+            return
+        # Document pas encore migré vers le blob store : copie depuis la base
+        fd, path = tempfile.mkstemp(prefix="ingest-")
+        try:
+            with os.fdopen(fd, "wb") as spool:
+                _, file_hash = await doc_repo.spool_content(document_id, spool)
+            yield path, info.file_type, file_hash
+        finally:
+            os.remove(path)
+
+    async def _digest(self, db: AsyncSession, folder_id: UUID, document_id: UUID,
+                      progress: JobProgress) -> None:
+        flushing = asyncio.Lock()
+
+        async def on_group() -> None:
+            # Plusieurs lots en parallèle sur une seule session : écritures sérialisées.
+            # Chaque lot rafraîchit updated_at, sinon requeue_stale reprendrait le job
+            async with flushing:
+                await progress.update()
+
+        # La fiche est un bonus : son échec ne doit pas faire échouer l'indexation
+        try:
+            await self.digest_service.refresh_document(db, folder_id, document_id, on_group=on_group)
+        except Exception as e:
+            await db.rollback()
+            print(f"[INGESTION] fiche de synthèse impossible pour document={document_id}: {e}")
+
+
+ingestion_workers = IngestionWorkerPool(rag_service, DigestService(llm_gateway))
@@ -0,0 +1,217 @@
+import asyncio
+import random
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, TypeVar
+from uuid import UUID
+
+import httpx
+import openai
+
+from core.config import Config
+from core.metrics import metrics
+
+T = TypeVar("T")
+
+_RETRYABLE = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+)
+
+
+class LLMGateway:
+    """Point d'accès unique au fournisseur LLM (OpenRouter).
+
+    - connexions HTTP mutualisées (httpx) et timeouts
+    - sémaphore global + sémaphore par organisation
+    - retries avec backoff exponentiel sur 429/5xx/erreurs réseau
+    - requête doublée (hedging) si la réponse dépasse le percentile de latence observé,
+      seulement si un créneau est libre : la concurrence réelle reste bornée
+    - métriques de latence et de tokens par appel
+    """
+
+    def __init__(self):
+        self._client: Optional[openai.AsyncOpenAI] = None
+        self._http: Optional[httpx.AsyncClient] = None
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        # Références faibles : le sémaphore d'une organisation disparaît quand plus aucun
+        # appel ne le détient, le dictionnaire ne grossit pas avec le nombre d'organisations
+        self._org_slots: "weakref.WeakValueDictionary[UUID, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+        self._latencies = deque(maxlen=200)
+
+    def start(self) -> None:
+        if self._client is not None:
+            return
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=Config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        self._client = openai.AsyncOpenAI(
+            api_key=Config.OPENROUTER_API_KEY,
+            base_url=Config.OPENROUTER_BASE_URL,
+            http_client=self._http,
+            max_retries=0,  # les retries sont gérés ici
+        )
+        self._global_slots = asyncio.Semaphore(Config.LLM_GLOBAL_CONCURRENCY)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+        self._client = None
+        self._http = None
+
+    def _org_semaphore(self, org_id: UUID) -> asyncio.Semaphore:
+        slots = self._org_slots.get(org_id)
+        if slots is None:
+            slots = asyncio.Semaphore(Config.LLM_ORG_CONCURRENCY)
+            self._org_slots[org_id] = slots
+        return slots
+
+    @asynccontextmanager
+    async def _slot(self, org_id: Optional[UUID]):
+        self.start()
+        org_slots = None
+        if org_id is not None:
+            org_slots = self._org_semaphore(org_id)
+        if org_slots is not None:
+            await org_slots.acquire()
+        try:
+            async with self._global_slots:
+                yield
+        finally:
+            if org_slots is not None:
+                org_slots.release()
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not Config.LLM_HEDGE_ENABLED or len(self._latencies) < Config.LLM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * Config.LLM_HEDGE_PERCENTILE / 100.0))
+        return ordered[index]
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except _RETRYABLE as e:
+                if attempt >= Config.LLM_MAX_RETRIES:
+                    metrics.incr("llm_errors")
+                    raise
+                delay = Config.LLM_RETRY_BASE_SECONDS * 2 ** attempt + random.uniform(0, 0.5)
+                response = getattr(e, "response", None)
+                retry_after = response.headers.get("retry-after") if response is not None else None
+                if retry_after:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                attempt += 1
+                metrics.incr("llm_retries")
+                print(f"[LLM] {type(e).__name__}, nouvelle tentative {attempt}/{Config.LLM_MAX_RETRIES} dans {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _try_hedge_slots(self, org_id: Optional[UUID]) -> Optional[List[asyncio.Semaphore]]:
+        """Créneaux (global et organisation) pour la requête doublée, sans attendre ; None si aucun n'est libre."""
+        slots = [self._global_slots]
+        if org_id is not None:
+            slots.append(self._org_semaphore(org_id))
+        if any(s.locked() for s in slots):
+            return None
+        for s in slots:
+            # Non verrouillé : acquire() rend la main sans suspension, rien ne s'intercale
+            await s.acquire()
+        return slots
+
+    async def _hedged(self, call: Callable[[], Awaitable[T]], org_id: Optional[UUID] = None) -> T:
+        delay = self._hedge_delay()
+        if delay is None:
+            return await call()
+
+        primary = asyncio.create_task(call())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            slots = await self._try_hedge_slots(org_id)
+            if slots is None:
+                metrics.incr("llm_hedges_skipped")
+                return await primary
+        except BaseException:
+            primary.cancel()
+            raise
+
+        metrics.incr("llm_hedges")
+        backup = asyncio.create_task(call())
+        # Créneaux rendus quand la requête doublée se termine, y compris annulée
+        backup.add_done_callback(lambda _: [s.release() for s in slots])
+        pending = {primary, backup}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+            # les deux requêtes ont échoué : remonter l'erreur de la requête principale
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _record(self, started: float, usage) -> None:
+        latency = time.perf_counter() - started
+        self._latencies.append(latency)
+        metrics.observe("llm_latency_ms", latency * 1000.0)
+        if usage is not None:
+            metrics.incr("llm_prompt_tokens", usage.prompt_tokens or 0)
+            metrics.incr("llm_completion_tokens", usage.completion_tokens or 0)
+
+    async def complete(self, messages: List[Dict], *, org_id: Optional[UUID] = None,
+                       temperature: float = 0.2, model: Optional[str] = None, **params) -> str:
+        async with self._slot(org_id):
+            started = time.perf_counter()
+            response = await self._with_retries(lambda: self._hedged(
+                lambda: self._client.chat.completions.create(
+                    model=model or Config.LLM_MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    **params,
+                ),
+                org_id,
+            ))
+            self._record(started, response.usage)
+            return response.choices[0].message.content
+
+    async def stream(self, messages: List[Dict], *, org_id: Optional[UUID] = None,
+                     temperature: float = 0.2, model: Optional[str] = None) -> AsyncIterator[str]:
+        async with self._slot(org_id):
+            started = time.perf_counter()
+            # retries possibles tant qu'aucun token n'a été émis ; pas de hedging en streaming
+            stream = await self._with_retries(lambda: self._client.chat.completions.create(
+                model=model or Config.LLM_MODEL,
+                messages=messages,
+                temperature=temperature,
+                stream=True,
+                stream_options={"include_usage": True},
+            ))
+            usage = None
+            first_token = True
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first_token:
+                        metrics.observe("llm_ttft_ms", (time.perf_counter() - started) * 1000.0)
+                        first_token = False
+                    yield chunk.choices[0].delta.content
+            self._record(started, usage)
+
+
+llm_gateway = LLMGateway()
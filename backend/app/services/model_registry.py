@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from sentence_transformers import SentenceTransformer
+
+from core.config import Config
+from services.extraction import configure_tesseract
+
+
+class ModelNotReadyError(RuntimeError):
+    pass
+
+
+class ModelRegistry:
+    """Modèle d'embedding partagé par tout le processus.
+
+    Chargés une seule fois au démarrage (lifespan), puis réutilisés par
+    toutes les requêtes au lieu d'être reconstruits à chaque appel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._embedding_model: Optional[SentenceTransformer] = None
+        self.ready = False
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    def load(self) -> None:
+        with self._lock:
+            if self.ready:
+                return
+            started = time.perf_counter()
+            try:
+                configure_tesseract()
+                model = SentenceTransformer(Config.EMBEDDING_MODEL_NAME)
+                # Encode de chauffe : le premier appel paie l'initialisation des kernels
+                model.encode("passage: warm-up", normalize_embeddings=True)
+                self._embedding_model = model
+                self.error = None
+                self.ready = True
+            except Exception as e:
+                self.error = str(e)
+                raise
+            finally:
+                self.load_seconds = time.perf_counter() - started
+
+    async def startup(self) -> None:
+        try:
+            await asyncio.to_thread(self.load)
+            print(f"[MODELS] Modèles chargés en {self.load_seconds:.1f}s")
+        except Exception as e:
+            print(f"[MODELS] Échec du chargement des modèles: {e}")
+
+    def require_ready(self) -> None:
+        if not self.ready:
+            raise ModelNotReadyError("Le modèle d'embedding est en cours de chargement")
+
+    @property
+    def embedding_model(self) -> SentenceTransformer:
+        self.require_ready()
+        return self._embedding_model
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "embedding_model": Config.EMBEDDING_MODEL_NAME,
+            "load_seconds": round(self.load_seconds, 2) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+model_registry = ModelRegistry()
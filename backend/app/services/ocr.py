@@ -0,0 +1,32 @@
+import asyncio
+import os
+from typing import Dict, List, Optional
+
+from core.config import Config
+from core.executors import executors
+from services.extraction import ocr_pages
+
+
+async def ocr_parallel(path: str, numbers: List[int], file_hash: Optional[str] = None) -> List[Dict]:
+    """OCR des pages `numbers` d'un PDF sur disque, réparti sur le process pool.
+
+    Chaque tâche ne reçoit qu'un chemin et un lot de pages, qu'elle rend une
+    à une. Le nombre de tâches OCR en vol est plafonné globalement par
+    `executors.run_ocr`. Renvoie une entrée de rapport par page (texte compris).
+    """
+    lang = os.getenv("RAG_LANGS", "fra+eng")
+    step = max(1, Config.OCR_PAGES_PER_TASK)
+    tasks = [
+        asyncio.ensure_future(executors.run_ocr(
+            ocr_pages, path, numbers[i:i + step], lang, file_hash,
+            Config.OCR_MIN_DPI, Config.OCR_MAX_DPI, Config.OCR_MAX_PIXELS, Config.OCR_PAGE_TIMEOUT_SECONDS,
+        ))
+        for i in range(0, len(numbers), step)
+    ]
+    try:
+        batches = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [entry for batch in batches for entry in batch]
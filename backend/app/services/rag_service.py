@@ -1,319 +1,634 @@
-import os
-import shutil
-import re
-from io import BytesIO
-from typing import List, Dict
-
-import openai
-import docx
-import fitz
-import pdfplumber
-import pytesseract
-import tiktoken
-from PIL import Image
-from sentence_transformers import SentenceTransformer
-from sqlalchemy import select, text
+import asyncio
+import hashlib
+import time
+from contextlib import aclosing
+from datetime import datetime, timedelta
+from functools import partial
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from models.document import Document
 from core.config import Config
 from models.embedding import Embedding
-
-
-def _tiktoken_len(text: str) -> int:
-    enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
-
-
-
-def _clean_text(s: str) -> str:
-    if not s:
-        return ""
-    s = s.replace("\x00", "").replace("\ufffd", "")
-    import unicodedata
-    s = "".join(ch for ch in s if unicodedata.category(ch)[0] != "C" or ch in "\n\t\r")
-    s = re.sub(r"(\w)-\n(\w)", r"\1\2", s)
-    s = re.sub(r"[ \t]+", " ", s)
-    s = re.sub(r"\n{3,}", "\n\n", s)
-    s = "\n".join(line.strip() for line in s.split("\n"))
-    s = unicodedata.normalize("NFKC", s)
-    return s.strip()
-
-
-
-def _pdf_is_scanned(file_bytes: bytes, min_chars_per_page: int = 40) -> bool:
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    try:
-        pages_with_text = 0
-        for p in doc:
-            t = p.get_text("text")
-            if t and len(t.strip()) >= min_chars_per_page:
-                pages_with_text += 1
-        return pages_with_text < max(1, int(0.3 * len(doc)))
-    finally:
-        doc.close()
-
-
-def _ocr_pdf_bytes(file_bytes: bytes, lang: str) -> str:
-    doc = fitz.open(stream=file_bytes, filetype="pdf")
-    out_parts = []
-    try:
-        zoom = 4.0
-        mat = fitz.Matrix(zoom, zoom)
-        for i, page in enumerate(doc, start=1):
-            try:
-                pix = page.get_pixmap(matrix=mat, alpha=False)
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                try:
-                    txt = pytesseract.image_to_string(img, lang=lang) or ""
-                    txt = _clean_text(txt)
-                    if txt.strip():
-                        out_parts.append(f"\n--- Page {i} ---\n{txt}\n")
-                except pytesseract.TesseractNotFoundError:
-                    raise RuntimeError("Tesseract introuvable. Installe tesseract-ocr (+ packs fra/eng).")
-                except Exception as ocr_error:
-                    print(f"[OCR] Erreur page {i}: {ocr_error}")
-            except Exception as page_error:
-                print(f"[OCR] Rendu page {i} échoué: {page_error}")
-    finally:
-        doc.close()
-    return _clean_text("".join(out_parts))
+from models.chunk_embedding import ChunkEmbedding
+from models.answer_cache import AnswerCache
+from repositories.answer_cache_repo import AnswerCacheRepo
+from repositories.document_repo import DocumentRepo
+from core.metrics import metrics
+from core.executors import executors
+from db.session import AsyncSessionLocal
+from services.blob_gc import purge_unreferenced
+from services.blob_store import BlobWriter, get_blob_store
+from services.document_stream import iter_document_text
+from services.extraction import count_pages, extract_text
+from services.chunker import TokenChunker
+from services.digest_service import digests_to_text
+from services.embedding_batcher import QueryEmbeddingBatcher
+from services.ingestion_progress import IngestionProgress
+from services.llm_gateway import LLMGateway, llm_gateway
+from services.tokens import group_by_tokens, token_len, truncate_tokens
+from services.model_registry import ModelRegistry, model_registry
+
+
+SYSTEM_PROMPT = (
+    "Tu es un assistant expert en rédaction de documents administratifs et techniques pour les appels d'offres publics.\n\n"
+    "Ta mission :\n- Répondre de manière claire, utile et professionnelle aux questions de l'utilisateur.\n"
+    "- Utiliser exclusivement les informations trouvées dans les documents SI elles sont présentes.\n"
+    "- Si une information n'est pas trouvée explicitement, tu peux proposer une réponse générique structurée, en précisant que certains éléments doivent être complétés.\n"
+    "- Toujours répondre en français et rester factuel."
+    "- À la fin de chaque réponse, suggérer une question pertinente et naturelle qui prolonge la discussion, en lien direct avec la réponse donnée, sans supposer d'informations absentes ou incertaines."
+)
+
+NO_CONTEXT_RAG = "Je n'ai pas trouvé d'informations pertinentes dans les documents de ce dossier."
+NO_CONTEXT_LLM = "Aucun document trouvé pour ce dossier."
+
+MAP_PROMPT = (
+    "Tu analyses un extrait d'un dossier d'appel d'offres pour préparer la réponse à une question.\n"
+    "Relève, en français et de façon concise, toutes les informations de l'extrait utiles pour y répondre "
+    "(dates, montants, exigences, pièces, critères), en citant le nom du document d'où elles proviennent. "
+    "Si l'extrait ne contient rien d'utile, réponds uniquement : RAS."
+)
+
+
+def _document_header(filename: str) -> str:
+    return f"\n--- {filename} ---\n"
+
+
+def _reciprocal_rank_fusion(result_lists: List[List[Dict]], k: int = 60) -> List[Dict]:
+    fused: Dict[str, Dict] = {}
+    scores: Dict[str, float] = {}
+    for results in result_lists:
+        for rank, chunk in enumerate(results, start=1):
+            key = chunk["text"]
+            fused.setdefault(key, chunk)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    ordered = sorted(fused, key=lambda key: scores[key], reverse=True)
+    return [{**fused[key], "score": scores[key]} for key in ordered]
+
+
+def _chunk_hash(text: str) -> str:
+    # Texte normalisé (espaces) + modèle : deux chunks identiques partagent le même vecteur
+    normalized = " ".join(text.split())
+    return hashlib.sha256(f"{Config.EMBEDDING_MODEL_NAME}\x00passage\x00{normalized}".encode("utf-8")).hexdigest()
 
 
 class RAGService:
-    def __init__(self, api_key: str, base_url: str):
-        tess_cmd = os.getenv("TESSERACT_CMD") or shutil.which("tesseract") or "/usr/bin/tesseract"
-        pytesseract.pytesseract.tesseract_cmd = tess_cmd
-        self.openai_client = openai.OpenAI(api_key=api_key, base_url=base_url)
-        self.embedding_model = SentenceTransformer("BAAI/bge-m3")
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=800,
-            chunk_overlap=120,
-            length_function=_tiktoken_len,
-            separators=["\n\n", "\n", " ", ""]
+    def __init__(self, registry: ModelRegistry, llm: LLMGateway):
+        self.registry = registry
+        self.llm = llm
+        self._encode_seconds_per_chunk = 0.0
+        self.query_batcher = QueryEmbeddingBatcher(
+            partial(self.generate_embeddings, is_query=True),
+            max_batch=Config.QUERY_BATCH_MAX_SIZE,
+            max_wait_ms=Config.QUERY_BATCH_MAX_WAIT_MS,
+            cache_size=Config.QUERY_EMBEDDING_CACHE_SIZE,
         )
+        self.chunker = TokenChunker(chunk_size=800, chunk_overlap=120)
+        self.blob_store = get_blob_store()
+
+    @property
+    def embedding_model(self):
+        return self.registry.embedding_model
 
     def generate_embedding(self, text: str, is_query: bool = False) -> List[float]:
         prefix = "query: " if is_query else "passage: "
         return self.embedding_model.encode(prefix + text.strip(), normalize_embeddings=True).tolist()
 
-    def extract_text_from_file(self, file_content: bytes, file_type: str) -> str:
+    def generate_embeddings(self, texts: List[str], is_query: bool = False) -> List[List[float]]:
+        prefix = "query: " if is_query else "passage: "
+        vectors = self.embedding_model.encode(
+            [prefix + t.strip() for t in texts],
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            normalize_embeddings=True,
+        )
+        return vectors.tolist()
+
+    async def embed_passages(self, db: AsyncSession, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Vecteurs des chunks, en réutilisant ceux déjà calculés pour un texte identique.
+
+        Renvoie aussi le nombre de chunks servis par le store (sans encode).
+        """
+        hashes = [_chunk_hash(t) for t in texts]
+        text_by_hash = dict(zip(hashes, texts))
+        rows = await db.execute(
+            select(ChunkEmbedding.text_hash, ChunkEmbedding.embedding)
+            .where(ChunkEmbedding.text_hash.in_(list(text_by_hash)))
+        )
+        known = {row.text_hash: row.embedding for row in rows}
+        reused = set(known)
+        to_encode = [h for h in text_by_hash if h not in known]
+
+        if to_encode:
+            encode_started = time.perf_counter()
+            vectors = await executors.run_inference(
+                self.generate_embeddings, [text_by_hash[h] for h in to_encode]
+            )
+            per_chunk = (time.perf_counter() - encode_started) / len(to_encode)
+            self._encode_seconds_per_chunk = (
+                per_chunk if not self._encode_seconds_per_chunk
+                else 0.8 * self._encode_seconds_per_chunk + 0.2 * per_chunk
+            )
+            known.update(zip(to_encode, vectors))
+        await self._record_chunk_vectors({h: known[h] for h in to_encode}, reused)
+
+        hits = len(hashes) - len(to_encode)
+        metrics.incr("embedding_dedup_hits", hits)
+        metrics.incr("embedding_dedup_misses", len(to_encode))
+        metrics.incr("embedding_time_saved_seconds", hits * self._encode_seconds_per_chunk)
+        total = metrics.counter("embedding_dedup_hits") + metrics.counter("embedding_dedup_misses")
+        if total:
+            metrics.gauge("embedding_dedup_hit_rate", metrics.counter("embedding_dedup_hits") / total)
+        return [known[h] for h in hashes], hits
+
+    async def _record_chunk_vectors(self, new: Dict[str, List[float]], reused: set) -> None:
+        """Ajoute les nouveaux vecteurs au store et compte les réutilisations.
+
+        Transaction courte et séparée, hashes triés : deux ingestions qui partagent
+        des chunks ne se verrouillent pas mutuellement jusqu'à la fin de leur
+        document. Un vecteur ne dépend que du texte : le valider tout de suite est sans risque.
+        """
+        if not new and not reused:
+            return
         try:
-            ftype = (file_type or "").lower()
-            ocr_langs = os.getenv("RAG_LANGS", "fra+eng")
-
-            if ftype == "pdf":
-                path = "native"
-                try:
-                    if _pdf_is_scanned(file_content):
-                        path = "ocr"
-                        print(f"[EXTRACT] PDF détecté scanné → OCR lang={ocr_langs}")
-                        text = _ocr_pdf_bytes(file_content, lang=ocr_langs)
-                        print(f"[EXTRACT] OCR terminé, chars={len(text)}")
-                        return _clean_text(text)
-
-                    text = ""
-                    with pdfplumber.open(BytesIO(file_content)) as pdf:
-                        for page_num, page in enumerate(pdf.pages, start=1):
-                            page_text = page.extract_text() or ""
-                            if page_text.strip():  
-                                text += f"\n--- Page {page_num} ---\n{_clean_text(page_text)}\n"
-                            tables = page.extract_tables() or []
-                            for tnum, table in enumerate(tables, start=1):
-                                if table:
-                                    text += f"\n--- Tableau {tnum} (Page {page_num}) ---\n"
-                                    for row in table:
-                                        if row and any(cell for cell in row):
-                                            text += " | ".join(_clean_text(str(c)) if c else "" for c in row) + "\n"
-                                    text += "--- Fin tableau ---\n\n"
-                    if not text.strip():
-                        path = "ocr-fallback"
-                        print(f"[EXTRACT] PDF natif vide → fallback OCR lang={ocr_langs}")
-                        text = _ocr_pdf_bytes(file_content, lang=ocr_langs)
-                    print(f"[EXTRACT] méthode={path}, chars={len(text)}")
-                    return _clean_text(text)
-                except Exception as e:
-                    print(f"[EXTRACT] Erreur PDF ({e}) → fallback OCR lang={ocr_langs}")
-                    text = _ocr_pdf_bytes(file_content, lang=ocr_langs)
-                    print(f"[EXTRACT] OCR fallback, chars={len(text)}")
-                    return _clean_text(text)
-
-            if ftype in {"docx", "doc"}:
-                d = docx.Document(BytesIO(file_content))
-                text = "\n".join(p.text for p in d.paragraphs)
-                print(f"[EXTRACT] DOCX/DOC chars={len(text)}")
-                return _clean_text(text)
-
-            if ftype in {"txt", "csv"}:
-                text = ""
-                for enc in ["utf-8", "latin-1", "cp1252", "iso-8859-1"]:
-                    try:
-                        text = file_content.decode(enc)
-                        break
-                    except Exception:
-                        continue
-                if not text:
-                    text = file_content.decode("utf-8", errors="ignore")
-                print(f"[EXTRACT] {ftype.upper()} chars={len(text)}")
-                return _clean_text(text)
-
-            print(f"[EXTRACT] Format non supporté: {ftype}")
-            return ""
-
+            async with AsyncSessionLocal() as store_db:
+                if new:
+                    await store_db.execute(
+                        pg_insert(ChunkEmbedding)
+                        .values([{"text_hash": h, "embedding": new[h]} for h in sorted(new)])
+                        .on_conflict_do_nothing(index_elements=["text_hash"])
+                    )
+                if reused:
+                    locked = (
+                        select(ChunkEmbedding.text_hash)
+                        .where(ChunkEmbedding.text_hash.in_(sorted(reused)))
+                        .order_by(ChunkEmbedding.text_hash)
+                        .with_for_update()
+                    )
+                    await store_db.execute(
+                        update(ChunkEmbedding)
+                        .where(ChunkEmbedding.text_hash.in_(locked.scalar_subquery()))
+                        .values(hits=ChunkEmbedding.hits + 1, last_used_at=datetime.utcnow())
+                    )
+                await store_db.commit()
         except Exception as e:
-            print(f"[EXTRACT] Erreur extraction générique: {e}")
-            try:
-                text = file_content.decode("utf-8", errors="ignore")
-                return _clean_text(text)
-            except Exception:
-                return ""
+            # Le store n'est qu'un cache : l'ingestion continue sans lui
+            print(f"[EMBEDDING] store des vecteurs non mis à jour: {e}")
+
+    async def evict_chunk_vectors(self) -> int:
+        """Supprime du store les vecteurs inutilisés depuis CHUNK_EMBEDDING_TTL_DAYS (LRU sur last_used_at).
+
+        Par lots courts, en sautant les lignes verrouillées par une ingestion qui les réutilise.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=Config.CHUNK_EMBEDDING_TTL_DAYS)
+        evicted = 0
+        async with AsyncSessionLocal() as db:
+            while True:
+                expired = (
+                    select(ChunkEmbedding.text_hash)
+                    .where(ChunkEmbedding.last_used_at < cutoff)
+                    .order_by(ChunkEmbedding.last_used_at)
+                    .limit(Config.CHUNK_EMBEDDING_EVICT_BATCH)
+                    .with_for_update(skip_locked=True)
+                )
+                result = await db.execute(
+                    delete(ChunkEmbedding).where(ChunkEmbedding.text_hash.in_(expired.scalar_subquery()))
+                )
+                await db.commit()
+                deleted = result.rowcount or 0
+                evicted += deleted
+                if deleted < Config.CHUNK_EMBEDDING_EVICT_BATCH:
+                    break
+        if evicted:
+            metrics.incr("chunk_embeddings_evicted", evicted)
+            print(f"[EMBEDDING] {evicted} vecteur(s) inutilisé(s) depuis {Config.CHUNK_EMBEDDING_TTL_DAYS:g} jours supprimé(s) du store")
+        return evicted
 
+    def extract_text_from_file(self, file_content: bytes, file_type: str) -> str:
+        return extract_text(file_content, file_type)
 
     def chunk_text(self, text: str) -> List[str]:
-        return self.text_splitter.split_text(text)
-
-    async def process_document(self, db: AsyncSession, tender_folder_id: int, document_id: int,
-                               file_content: bytes, file_type: str):
-        document_text = self.extract_text_from_file(file_content, file_type)
-        print(f"[INGEST] doc_id={document_id} total_chars={len(document_text)}")
-        chunks = self.chunk_text(document_text)
-        if not chunks:
-            chunks = [document_text]  
-        inserted = 0
-        for i, chunk in enumerate(chunks):
-            if len(chunk.strip()) < 50 and i > 0:
-                continue
-            emb = self.generate_embedding(chunk)
-            db.add(Embedding(
-                tender_folder_id=tender_folder_id,
-                document_id=document_id,
-                embedding=emb,
-                chunk_text=chunk,
-                chunk_index=i,
-                extra_data={"file_type": file_type, "chunk_length": len(chunk)}
-            ))
-            inserted += 1
+        return self.chunker.split(text)
+
+    async def _insert_chunks(self, db: AsyncSession, tender_folder_id: UUID, document_id: UUID,
+                             file_type: str, batch: List[Tuple[int, str]]) -> int:
+        vectors, hits = await self.embed_passages(db, [chunk for _, chunk in batch])
+        # Compté une fois ici : le mode LLM somme ces valeurs en SQL au lieu de retokeniser le dossier
+        counts = await asyncio.to_thread(lambda: [token_len(chunk) for _, chunk in batch])
+        # insert multi-lignes (executemany) puis commit par lot : transactions courtes
+        await db.execute(insert(Embedding), [
+            {
+                "tender_folder_id": tender_folder_id,
+                "document_id": document_id,
+                "embedding": emb,
+                "chunk_text": chunk,
+                "chunk_index": i,
+                "token_count": tokens,
+                "extra_data": {"file_type": file_type, "chunk_length": len(chunk)},
+            }
+            for (i, chunk), emb, tokens in zip(batch, vectors, counts)
+        ])
         await db.commit()
-        print(f"[INGEST] inserted_embeddings={inserted} for doc_id={document_id}")
+        return hits
+
+    async def process_document(self, db: AsyncSession, tender_folder_id: UUID, document_id: UUID,
+                               file_path: str, file_type: str, file_hash: Optional[str] = None,
+                               progress: Optional[IngestionProgress] = None) -> Dict:
+        """Ingestion en flux : plages de pages → chunks → embeddings → insert par lots.
+
+        À tout instant, seuls une fenêtre de pages, le reste non découpé du
+        chunker et un lot de chunks sont en mémoire. Le texte extrait est
+        écrit au fil de l'eau dans le blob store (export du dossier).
+        """
+        progress = progress or IngestionProgress()
+        started = time.perf_counter()
+        pages = await asyncio.to_thread(count_pages, file_path, file_type)
+        await progress.stage("indexation", pages_total=pages, pages_done=0, chunks_done=0)
+
+        stream = self.chunker.stream()
+        batch_size = max(1, Config.INGEST_INSERT_BATCH_SIZE)
+        batch: List[Tuple[int, str]] = []
+        report: List[Dict] = []
+        index = inserted = reused = chars = pages_done = 0
+
+        async def flush() -> None:
+            nonlocal inserted, reused
+            flush_started = time.perf_counter()
+            reused += await self._insert_chunks(db, tender_folder_id, document_id, file_type, batch)
+            inserted += len(batch)
+            batch.clear()
+            progress.add_time("embedding", time.perf_counter() - flush_started)
+            await progress.update(chunks_done=inserted)
+
+        async def take(chunks: List[str]) -> None:
+            nonlocal index
+            for chunk in chunks:
+                if not (len(chunk.strip()) < 50 and index > 0):
+                    batch.append((index, chunk))
+                index += 1
+                if len(batch) >= batch_size:
+                    await flush()
 
-    async def search_similar_chunks(self, db: AsyncSession, tender_folder_id: int, query: str, limit: int = 10) -> List[Dict]:
-        q_emb = self.generate_embedding(query, is_query=True)
-        stmt = (
-            select(
-                Embedding.chunk_text,
-                Embedding.extra_data,
-                Document.filename,
-                Embedding.embedding.cosine_distance(q_emb).label("distance")
-            )
-            .join(Document, Embedding.document_id == Document.id)
-            .where(Embedding.tender_folder_id == tender_folder_id)
-            .order_by("distance")
-            .limit(limit)
+        text_blob = BlobWriter(self.blob_store)
+        try:
+            async with aclosing(iter_document_text(file_path, file_type, file_hash, pages=pages)) as texts:
+                waited = time.perf_counter()
+                async for text, page_report in texts:
+                    progress.add_time("extraction", time.perf_counter() - waited)
+                    chars += len(text)
+                    report += page_report
+                    pages_done += len(page_report)
+                    await asyncio.to_thread(text_blob.write, text.encode("utf-8", errors="replace"))
+                    split_started = time.perf_counter()
+                    chunks = await asyncio.to_thread(stream.feed, text)
+                    progress.add_time("decoupage", time.perf_counter() - split_started)
+                    await take(chunks)
+                    await progress.update(pages_done=pages_done)
+                    waited = time.perf_counter()
+
+            await take(await asyncio.to_thread(stream.close))
+            if index == 0:
+                batch.append((0, ""))
+            if batch:
+                await flush()
+            doc_repo = DocumentRepo(db)
+            # Verrou jusqu'au commit de set_text : une purge concurrente attend la référence
+            text_key = await text_blob.commit(reserve=doc_repo.lock_blob_keys)
+        except BaseException:
+            await asyncio.to_thread(text_blob.discard)
+            raise
+        previous = await doc_repo.set_text(document_id, text_key, text_blob.size)
+        await db.commit()
+        await progress.update(pages_done=pages, chunks_total=inserted, page_report=report)
+        if previous and previous != text_key:
+            # Réingestion : l'ancien texte n'est supprimé que s'il n'est plus référencé
+            await purge_unreferenced(db, [previous])
+
+        elapsed = time.perf_counter() - started
+        throughput = inserted / elapsed if elapsed > 0 else 0.0
+        print(f"[INGEST] inserted_embeddings={inserted} for doc_id={document_id} "
+              f"pages={pages} chars={chars} throughput={throughput:.1f} chunks/s "
+              f"dedup_hits={reused}/{inserted} total={elapsed:.2f}s")
+        return {
+            "chunks": inserted,
+            "dedup_hits": reused,
+            "seconds": round(elapsed, 3),
+            "chunks_per_sec": round(throughput, 1),
+        }
+
+    async def search_similar_chunks(self, db: AsyncSession, tender_folder_id: int, query: str, limit: int = 10,
+                                    ef_search: Optional[int] = None) -> List[Dict]:
+        q_emb = await self.query_batcher.embed(query)
+        folder_rows = await db.scalar(
+            select(func.count()).select_from(Embedding).where(Embedding.tender_folder_id == tender_folder_id)
         )
+        if (folder_rows or 0) <= Config.ANN_EXACT_SCAN_MAX_ROWS:
+            # Petit dossier : scan exact (le CTE matérialisé empêche l'usage de l'index HNSW,
+            # dont le post-filtrage par dossier peut renvoyer moins de `limit` résultats)
+            folder_chunks = (
+                select(Embedding.chunk_text, Embedding.extra_data, Embedding.document_id, Embedding.embedding)
+                .where(Embedding.tender_folder_id == tender_folder_id)
+                .cte("folder_chunks")
+                .prefix_with("MATERIALIZED")
+            )
+            stmt = (
+                select(
+                    folder_chunks.c.chunk_text,
+                    folder_chunks.c.extra_data,
+                    Document.filename,
+                    folder_chunks.c.embedding.cosine_distance(q_emb).label("distance")
+                )
+                .join(Document, folder_chunks.c.document_id == Document.id)
+                .order_by("distance")
+                .limit(limit)
+            )
+        else:
+            ef = max(ef_search or Config.HNSW_EF_SEARCH, limit)
+            await db.execute(select(func.set_config("hnsw.ef_search", str(ef), True)))
+            if Config.HNSW_ITERATIVE_SCAN:
+                await db.execute(select(func.set_config("hnsw.iterative_scan", Config.HNSW_ITERATIVE_SCAN, True)))
+            stmt = (
+                select(
+                    Embedding.chunk_text,
+                    Embedding.extra_data,
+                    Document.filename,
+                    Embedding.embedding.cosine_distance(q_emb).label("distance")
+                )
+                .join(Document, Embedding.document_id == Document.id)
+                .where(Embedding.tender_folder_id == tender_folder_id)
+                .order_by("distance")
+                .limit(limit)
+            )
         result = await db.execute(stmt)
-        return [{
+        chunks = [{
             "text": row.chunk_text,
             "source": row.filename,
             "distance": float(row.distance),
             "extra_data": row.extra_data
         } for row in result]
+        # relaxed_order : l'ordre renvoyé par le scan itératif n'est qu'approximatif
+        chunks.sort(key=lambda c: c["distance"])
+        return chunks
 
     async def search_by_keywords(self, db: AsyncSession, tender_folder_id: int, keywords: str, limit: int = 10) -> List[Dict]:
+        if not keywords.strip():
+            return []
+        # plainto_tsquery normalise la question, puis AND -> OR :
+        # ts_rank_cd favorise ensuite les chunks qui couvrent le plus de termes
         result = await db.execute(text("""
-            SELECT 
+            SELECT
                 e.chunk_text,
                 e.extra_data,
                 d.filename,
-                0.0 as distance
+                ts_rank_cd(e.chunk_tsv, q) AS rank
             FROM embeddings e
-            JOIN documents d ON e.document_id = d.id
+            JOIN documents d ON e.document_id = d.id,
+                 replace(plainto_tsquery('french', :keywords)::text, ' & ', ' | ')::tsquery q
             WHERE e.tender_folder_id = :tender_folder_id
-              AND e.chunk_text ILIKE :keywords
+              AND e.chunk_tsv @@ q
+            ORDER BY rank DESC
             LIMIT :limit
         """), {
             "tender_folder_id": tender_folder_id,
-            "keywords": f"%{keywords}%",
+            "keywords": keywords,
             "limit": limit
         })
         return [{
             "text": row.chunk_text,
             "source": row.filename,
-            "distance": 0.0,
-            "metadata": row.extra_data
+            "rank": float(row.rank),
+            "extra_data": row.extra_data
         } for row in result]
 
+    async def hybrid_search(self, db: AsyncSession, tender_folder_id: int, query: str, limit: int = 5) -> List[Dict]:
+        candidates = max(limit, Config.HYBRID_CANDIDATES)
 
-    async def generate_rag_response(self, db: AsyncSession, tender_folder_id: int, question: str) -> Dict:
-        vector_chunks = await self.search_similar_chunks(db, tender_folder_id, question, limit=10)
-        keyword_chunks = []
-        m = re.search(r"article\s+(\d+)", question.lower())
-        if m:
-            keyword_chunks = await self.search_by_keywords(db, tender_folder_id, f"article {m.group(1)}", limit=10)
-        all_chunks = keyword_chunks + vector_chunks
-        seen, relevant = set(), []
-        for ch in all_chunks:
-            if ch['text'] not in seen:
-                relevant.append(ch)
-                seen.add(ch['text'])
-                if len(relevant) >= 5:
-                    break
+        async def lexical() -> List[Dict]:
+            # Session dédiée : une AsyncSession n'exécute pas deux requêtes en parallèle
+            async with AsyncSessionLocal() as lexical_db:
+                return await self.search_by_keywords(lexical_db, tender_folder_id, query, limit=candidates)
+
+        keyword_chunks, vector_chunks = await asyncio.gather(
+            lexical(),
+            self.search_similar_chunks(db, tender_folder_id, query, limit=candidates),
+        )
+        return _reciprocal_rank_fusion([vector_chunks, keyword_chunks], k=Config.RRF_K)[:limit]
+
+    async def _rag_messages(self, db: AsyncSession, tender_folder_id: int, question: str) -> Tuple[Optional[List[Dict]], List[Dict]]:
+        relevant = await self.hybrid_search(db, tender_folder_id, question, limit=5)
         if not relevant:
-            return {"reponse": "Je n'ai pas trouvé d'informations pertinentes dans les documents de ce dossier.", "sources": []}
+            return None, []
         context = "\n\n".join([f"Source: {c['source']}\n{c['text']}" for c in relevant])
         messages = [
-            {"role": "system", "content": (
-                "Tu es un assistant expert en rédaction de documents administratifs et techniques pour les appels d'offres publics.\n\n"
-                "Ta mission :\n- Répondre de manière claire, utile et professionnelle aux questions de l'utilisateur.\n"
-                "- Utiliser exclusivement les informations trouvées dans les documents SI elles sont présentes.\n"
-                "- Si une information n'est pas trouvée explicitement, tu peux proposer une réponse générique structurée, en précisant que certains éléments doivent être complétés.\n"
-                "- Toujours répondre en français et rester factuel."
-                "- À la fin de chaque réponse, suggérer une question pertinente et naturelle qui prolonge la discussion, en lien direct avec la réponse donnée, sans supposer d'informations absentes ou incertaines."
-            )},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": f"Question: {question}\n\nContexte des documents:\n{context}\n\nRéponds en français de manière claire et structurée."}
         ]
-        resp = self.openai_client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            messages=messages,
-            temperature=0.2
-        )
         sources = list({c['source'] for c in relevant})
-        return {"reponse": resp.choices[0].message.content, "sources": [{"document": s} for s in sources]}
+        return messages, [{"document": s} for s in sources]
+
+    async def _folder_tokens(self, db: AsyncSession, tender_folder_id: int) -> Tuple[int, List[str]]:
+        """Taille du dossier en tokens, calculée en SQL sans lire le texte des chunks.
 
-    async def generate_llm_response(self, db: AsyncSession, tender_folder_id: int, question: str) -> Dict:
+        Les chunks indexés avant le comptage n'ont pas de token_count : on les
+        estime largement (3 caractères par token), quitte à passer en map-reduce.
+        """
+        chunk_tokens = case(
+            (Embedding.chunk_text == "", 0),
+            else_=func.coalesce(Embedding.token_count, func.ceil(func.char_length(Embedding.chunk_text) / 3.0)) + 1,
+        )
         stmt = (
-            select(Document)
+            select(Document.filename, func.coalesce(func.sum(chunk_tokens), 0).label("tokens"))
+            .outerjoin(Embedding, Embedding.document_id == Document.id)
             .where(Document.tender_folder_id == tender_folder_id)
-            .options(selectinload(Document.embeddings))
+            .group_by(Document.id, Document.filename, Document.created_at)
+            .order_by(Document.created_at, Document.id)
         )
-        result = await db.execute(stmt)
-        documents = result.scalars().all()
-        if not documents:
-            return {"reponse": "Aucun document trouvé pour ce dossier.", "sources": []}
-
-        full_text = ""
-        for doc in documents:
-            full_text += f"\n--- {doc.filename} ---\n"
-            chunks = sorted(doc.embeddings, key=lambda e: e.chunk_index or 0)
-            for chunk in chunks:
-                full_text += chunk.chunk_text + "\n"
+        rows = (await db.execute(stmt)).all()
+        filenames = [row.filename for row in rows]
+        total = sum(int(row.tokens) + token_len(_document_header(row.filename)) for row in rows)
+        return total, filenames
+
+    async def _folder_blocks(self, db: AsyncSession, tender_folder_id: int) -> List[Tuple[str, int]]:
+        """Texte du dossier en blocs (en-tête de document ou chunk) avec leur nombre de tokens.
+
+        Seules les colonnes texte sont lues : pas de vecteurs ni de contenu binaire.
+        """
+        stmt = (
+            select(Document.id, Document.filename, Embedding.chunk_text, Embedding.token_count)
+            .outerjoin(Embedding, Embedding.document_id == Document.id)
+            .where(Document.tender_folder_id == tender_folder_id)
+            .order_by(Document.created_at, Document.id, Embedding.chunk_index)
+        )
+        rows = (await db.execute(stmt)).all()
+
+        def build() -> List[Tuple[str, int]]:
+            blocks: List[Tuple[str, int]] = []
+            current_doc = None
+            for row in rows:
+                if row.id != current_doc:
+                    current_doc = row.id
+                    header = _document_header(row.filename)
+                    blocks.append((header, token_len(header)))
+                if row.chunk_text:
+                    # Seuls les chunks sans token_count (indexés avant le comptage) sont retokenisés
+                    tokens = row.token_count if row.token_count is not None else token_len(row.chunk_text)
+                    blocks.append((row.chunk_text + "\n", tokens + 1))
+            return blocks
+
+        return await asyncio.to_thread(build)
+
+    async def _map_reduce(self, blocks: List[Tuple[str, int]], question: str, org_id: Optional[UUID]) -> str:
+        """Réduit un dossier trop volumineux en notes tenant dans le budget de contexte."""
+        slots = asyncio.Semaphore(Config.LLM_MAP_CONCURRENCY)
+
+        async def summarize(group: str) -> str:
+            async with slots:
+                return await self.llm.complete([
+                    {"role": "system", "content": MAP_PROMPT},
+                    {"role": "user", "content": f"Question : {question}\n\nExtrait :\n{group}"},
+                ], org_id=org_id, temperature=0.0)
+
+        rounds = 0
+        while True:
+            groups = group_by_tokens(blocks, Config.LLM_MAP_GROUP_TOKENS)
+            started = time.perf_counter()
+            notes = await asyncio.gather(*(summarize(g) for g in groups))
+            rounds += 1
+            notes = [n.strip() + "\n\n" for n in notes if n and n.strip() and n.strip() != "RAS"]
+            blocks = [(n, token_len(n)) for n in notes]
+            total = sum(tokens for _, tokens in blocks)
+            print(f"[LLM] map-reduce tour {rounds}: {len(groups)} lots -> {total} tokens en {time.perf_counter() - started:.1f}s")
+            if total <= Config.LLM_CONTEXT_TOKEN_BUDGET:
+                return "".join(n for n, _ in blocks)
+            # Un seul lot ne se réduit plus, ou plus de tours autorisés : on tronque au budget
+            if len(groups) == 1 or rounds >= max(1, Config.LLM_MAP_MAX_ROUNDS):
+                metrics.incr("llm_map_reduce_truncated")
+                print(f"[LLM] map-reduce: notes tronquées à {Config.LLM_CONTEXT_TOKEN_BUDGET} tokens après {rounds} tour(s)")
+                kept = group_by_tokens(blocks, Config.LLM_CONTEXT_TOKEN_BUDGET)[0]
+                # Une note seule peut encore dépasser le budget
+                return await asyncio.to_thread(truncate_tokens, kept, Config.LLM_CONTEXT_TOKEN_BUDGET)
+
+    async def _llm_messages(self, db: AsyncSession, tender_folder_id: int, question: str,
+                            org_id: Optional[UUID] = None) -> Tuple[Optional[List[Dict]], List[Dict]]:
+        total_tokens, filenames = await self._folder_tokens(db, tender_folder_id)
+        if not filenames:
+            return None, []
+
+        metrics.observe("llm_mode_folder_tokens", total_tokens)
+        digests = []
+        if total_tokens > Config.LLM_CONTEXT_TOKEN_BUDGET and Config.DIGEST_ENABLED:
+            digests = await DocumentRepo(db).digests_by_folder(tender_folder_id)
+        if total_tokens <= Config.LLM_CONTEXT_TOKEN_BUDGET:
+            full_text = "".join(block for block, _ in await self._folder_blocks(db, tender_folder_id))
+        elif digests and all(digest for _, digest in digests):
+            # Fiches calculées à l'ingestion : quelques milliers de tokens au lieu du dossier entier
+            metrics.incr("llm_mode_digest")
+            full_text = digests_to_text(digests)
+        else:
+            metrics.incr("llm_mode_map_reduce")
+            full_text = await self._map_reduce(await self._folder_blocks(db, tender_folder_id), question, org_id)
 
         messages = [
-            {"role": "system", "content": (
-                "Tu es un assistant expert en rédaction de documents administratifs et techniques pour les appels d'offres publics.\n\n"
-                "Ta mission :\n- Répondre de manière claire, utile et professionnelle aux questions de l'utilisateur.\n"
-                "- Utiliser exclusivement les informations trouvées dans les documents SI elles sont présentes.\n"
-                "- Si une information n'est pas trouvée explicitement, tu peux proposer une réponse générique structurée, en précisant que certains éléments doivent être complétés.\n"
-                "- Toujours répondre en français et rester factuel."
-                "- À la fin de chaque réponse, suggérer une question pertinente et naturelle qui prolonge la discussion, en lien direct avec la réponse donnée, sans supposer d'informations absentes ou incertaines."
-            )},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": f"Voici les documents à ta disposition :\n{full_text}\n\nQuestion posée :\n{question}\n\nRéponds maintenant de manière professionnelle, en te basant sur ces documents.\nS'ils ne suffisent pas, propose un exemple type ou un guide clair pour aider l'utilisateur à avancer."}
         ]
-        response = self.openai_client.chat.completions.create(
-            model="openai/gpt-4o-mini",
-            messages=messages,
-            temperature=0.2
+        return messages, [{"document": f} for f in filenames]
+
+    async def _cache_lookup(self, db: AsyncSession, tender_folder_id: UUID, mode: str,
+                            cache_question: Optional[str]) -> Tuple[Optional[List[float]], Optional[int], Optional[AnswerCache]]:
+        """Réponse déjà donnée à une question similaire dans ce dossier, s'il y en a une.
+
+        Renvoie aussi la génération du cache lue avant la recherche : la réponse
+        produite ensuite n'est stockée que si le dossier n'a pas changé entre-temps.
+        """
+        if not Config.ANSWER_CACHE_ENABLED or not cache_question or not cache_question.strip():
+            return None, None, None
+        vector = await self.query_batcher.embed(cache_question)
+        repo = AnswerCacheRepo(db)
+        generation = await repo.generation(tender_folder_id)
+        if generation is None:
+            return None, None, None
+        entry = await repo.find_similar(
+            tender_folder_id, mode, vector,
+            min_similarity=Config.ANSWER_CACHE_MIN_SIMILARITY,
+            max_age_hours=Config.ANSWER_CACHE_TTL_HOURS,
         )
-        return {"reponse": response.choices[0].message.content, "sources": [{"document": d.filename} for d in documents]}
-
+        if entry is None:
+            metrics.incr("answer_cache_misses")
+            return vector, generation, None
+        metrics.incr("answer_cache_hits")
+        await repo.record_hit(entry.id)
+        return vector, generation, entry
+
+    async def _cache_store(self, db: AsyncSession, tender_folder_id: UUID, mode: str, cache_question: str,
+                           vector: Optional[List[float]], generation: Optional[int],
+                           answer: str, sources: List[Dict]) -> None:
+        if vector is None or generation is None or not answer:
+            return
+        stored = await AnswerCacheRepo(db).add_if_current(AnswerCache(
+            tender_folder_id=tender_folder_id,
+            mode=mode,
+            question=cache_question.strip(),
+            question_embedding=vector,
+            answer=answer,
+            sources=sources,
+        ), generation)
+        if not stored:
+            # Dossier modifié pendant la génération : réponse non mise en cache
+            metrics.incr("answer_cache_stale_skips")
+
+    async def generate_rag_response(self, db: AsyncSession, tender_folder_id: int, question: str,
+                                    org_id: Optional[UUID] = None, cache_question: Optional[str] = None) -> Dict:
+        vector, generation, cached = await self._cache_lookup(db, tender_folder_id, "rag", cache_question)
+        if cached is not None:
+            return {"reponse": cached.answer, "sources": cached.sources or [], "cached": True}
+        messages, sources = await self._rag_messages(db, tender_folder_id, question)
+        if messages is None:
+            return {"reponse": NO_CONTEXT_RAG, "sources": []}
+        answer = await self.llm.complete(messages, org_id=org_id)
+        await self._cache_store(db, tender_folder_id, "rag", cache_question, vector, generation, answer, sources)
+        return {"reponse": answer, "sources": sources}
+
+    async def generate_llm_response(self, db: AsyncSession, tender_folder_id: int, question: str,
+                                    org_id: Optional[UUID] = None, cache_question: Optional[str] = None) -> Dict:
+        vector, generation, cached = await self._cache_lookup(db, tender_folder_id, "llm", cache_question)
+        if cached is not None:
+            return {"reponse": cached.answer, "sources": cached.sources or [], "cached": True}
+        messages, sources = await self._llm_messages(db, tender_folder_id, question, org_id)
+        if messages is None:
+            return {"reponse": NO_CONTEXT_LLM, "sources": []}
+        answer = await self.llm.complete(messages, org_id=org_id)
+        await self._cache_store(db, tender_folder_id, "llm", cache_question, vector, generation, answer, sources)
+        return {"reponse": answer, "sources": sources}
+
+    async def stream_response(self, db: AsyncSession, tender_folder_id: int, question: str,
+                              use_rag: bool = True, org_id: Optional[UUID] = None,
+                              cache_question: Optional[str] = None) -> AsyncIterator[Dict]:
+        """Événements `token` au fil de la génération, puis un événement `sources`."""
+        mode = "rag" if use_rag else "llm"
+        vector, generation, cached = await self._cache_lookup(db, tender_folder_id, mode, cache_question)
+        if cached is not None:
+            yield {"type": "token", "content": cached.answer}
+            yield {"type": "sources", "sources": cached.sources or [], "cached": True}
+            return
+
+        if use_rag:
+            messages, sources = await self._rag_messages(db, tender_folder_id, question)
+        else:
+            messages, sources = await self._llm_messages(db, tender_folder_id, question, org_id)
+
+        if messages is None:
+            yield {"type": "token", "content": NO_CONTEXT_RAG if use_rag else NO_CONTEXT_LLM}
+        else:
+            parts: List[str] = []
+            async for token in self.llm.stream(messages, org_id=org_id):
+                parts.append(token)
+                yield {"type": "token", "content": token}
+            await self._cache_store(db, tender_folder_id, mode, cache_question, vector, generation,
+                                    "".join(parts), sources)
+        yield {"type": "sources", "sources": sources}
+
+rag_service = RAGService(model_registry, llm_gateway)
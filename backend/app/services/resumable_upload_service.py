@@ -0,0 +1,284 @@
+import asyncio
+import hashlib
+import os
+import shutil
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import Config
+from models.document import Document
+from models.ingestion_job import IngestionJob
+from models.upload_session import UploadSession, UploadStatus
+from repositories.tender_folder_repo import TenderFolderRepo
+from repositories.upload_session_repo import UploadSessionRepo
+from services.archives import is_archive
+from services.tender_folder_service import TenderFolderService
+from services.uploads import (
+    UPLOAD_CHUNK_SIZE, UploadConflictError, UploadLockedError, UploadTooLargeError,
+)
+
+# SHA-256 en cours par envoi, mis à jour à chaque PATCH : la finalisation évite
+# de relire le fichier. Perdu au redémarrage ou si un autre processus a reçu
+# un morceau ; le fichier est alors relu une fois.
+_hashers: Dict[UUID, Tuple[int, "hashlib._Hash"]] = {}
+_MAX_HASHERS = 256
+
+
+def upload_dir() -> str:
+    # Par défaut sur le disque du blob store : la finalisation n'est qu'un renommage
+    return Config.UPLOAD_DIR or os.path.join(Config.BLOB_DIR, ".uploads")
+
+
+def part_path(upload_id: UUID) -> str:
+    return os.path.join(upload_dir(), f"{upload_id}.part")
+
+
+def _create_part(path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+
+
+def _remove_part(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _staged_copy(blob_store, path: str) -> str:
+    # Lien physique (ou copie) : le fichier partiel reste en place tant que
+    # le document n'est pas commité, la finalisation peut donc être rejouée
+    fd, tmp = blob_store.staging_file()
+    os.close(fd)
+    os.remove(tmp)
+    try:
+        os.link(path, tmp)
+    except OSError:
+        shutil.copyfile(path, tmp)
+    return tmp
+
+
+def _open_at(path: str, offset: int):
+    f = open(path, "r+b")
+    # Octets écrits après le dernier commit (coupure entre écriture et mise à jour) : ignorés
+    f.truncate(offset)
+    f.seek(offset)
+    return f
+
+
+def _keep_hasher(upload_id: UUID, offset: int, hasher) -> None:
+    if len(_hashers) >= _MAX_HASHERS:
+        _hashers.pop(next(iter(_hashers)))
+    _hashers[upload_id] = (offset, hasher)
+
+
+class ResumableUploadService:
+    """Envois reprenables : création, ajout de plages d'octets (PATCH), finalisation.
+
+    Le fichier partiel reste sur disque entre deux requêtes ; à la finalisation
+    il est déplacé dans le blob store puis confié à la file d'ingestion.
+    """
+
+    def __init__(self, db: AsyncSession, folders: TenderFolderService):
+        self.db = db
+        self.repo = UploadSessionRepo(db)
+        self.folder_repo = TenderFolderRepo(db)
+        self.folders = folders
+
+    @staticmethod
+    def _expires_at(now: datetime) -> datetime:
+        return now + timedelta(hours=Config.RESUMABLE_UPLOAD_EXPIRE_HOURS)
+
+    async def _lock(self, upload_id: UUID, user_id: UUID) -> UploadSession:
+        try:
+            upload = await self.repo.lock(upload_id, user_id)
+        except DBAPIError as e:
+            await self.db.rollback()
+            if getattr(e.orig, "pgcode", None) == "55P03":
+                raise UploadLockedError("Un autre envoi est en cours pour ce fichier")
+            raise
+        if not upload:
+            raise FileNotFoundError()
+        return upload
+
+    async def purge_expired(self) -> int:
+        expired = await self.repo.expired(datetime.utcnow())
+        if not expired:
+            return 0
+        await self.repo.delete([u.id for u in expired])
+        await self.db.commit()
+        for upload in expired:
+            _hashers.pop(upload.id, None)
+            await asyncio.to_thread(_remove_part, part_path(upload.id))
+        print(f"[UPLOAD] {len(expired)} envoi(s) expiré(s) supprimé(s)")
+        return len(expired)
+
+    async def create(self, *, folder_id: UUID, org_id: UUID, user_id: UUID, filename: str,
+                     length: int, content_type: Optional[str]) -> UploadSession:
+        if not await self.folder_repo.get_in_org(folder_id, org_id):
+            raise FileNotFoundError()
+        max_bytes = Config.RESUMABLE_UPLOAD_MAX_MB * 1024 * 1024
+        if length > max_bytes:
+            raise UploadTooLargeError(
+                f"{filename} dépasse la taille maximale de {Config.RESUMABLE_UPLOAD_MAX_MB} Mo"
+            )
+        await self.purge_expired()
+
+        now = datetime.utcnow()
+        upload = UploadSession(
+            tender_folder_id=folder_id,
+            created_by=user_id,
+            filename=filename,
+            mime_type=content_type,
+            length=length,
+            offset=0,
+            status=UploadStatus.EN_COURS.value,
+            created_at=now,
+            updated_at=now,
+            expires_at=self._expires_at(now),
+        )
+        await self.repo.add(upload)
+        await self.db.flush()
+        await asyncio.to_thread(_create_part, part_path(upload.id))
+        await self.db.commit()
+        return upload
+
+    async def get(self, upload_id: UUID, user_id: UUID) -> Optional[UploadSession]:
+        return await self.repo.get(upload_id, user_id)
+
+    async def append(self, upload_id: UUID, user_id: UUID, offset: int,
+                     chunks: AsyncIterator[bytes], declared: Optional[int] = None) -> UploadSession:
+        """Ajoute le corps de la requête à partir de `offset`, qui doit être le décalage courant.
+
+        Les octets reçus avant une coupure sont conservés : le client reprend
+        au décalage renvoyé par HEAD.
+        """
+        upload = await self._lock(upload_id, user_id)
+        if upload.status != UploadStatus.EN_COURS.value:
+            await self.db.rollback()
+            raise UploadConflictError("Envoi déjà finalisé", upload.offset)
+        if offset != upload.offset:
+            await self.db.rollback()
+            raise UploadConflictError(f"Décalage attendu : {upload.offset}", upload.offset)
+        if declared is not None and upload.offset + declared > upload.length:
+            await self.db.rollback()
+            raise UploadTooLargeError(f"Le morceau dépasse la taille annoncée ({upload.length} octets)")
+
+        entry = _hashers.pop(upload.id, None)
+        hasher = entry[1] if entry and entry[0] == upload.offset else None
+        if hasher is None and upload.offset == 0:
+            hasher = hashlib.sha256()
+
+        f = await asyncio.to_thread(_open_at, part_path(upload.id), upload.offset)
+        received = upload.offset
+        buffer = bytearray()
+        try:
+            async for chunk in chunks:
+                if received + len(buffer) + len(chunk) > upload.length:
+                    raise UploadTooLargeError(f"Le morceau dépasse la taille annoncée ({upload.length} octets)")
+                buffer += chunk
+                if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                    await asyncio.to_thread(f.write, buffer)
+                    if hasher:
+                        hasher.update(buffer)
+                    received += len(buffer)
+                    buffer = bytearray()
+        finally:
+            if buffer:
+                await asyncio.to_thread(f.write, buffer)
+                if hasher:
+                    hasher.update(buffer)
+                received += len(buffer)
+            await asyncio.to_thread(f.close)
+            now = datetime.utcnow()
+            upload.offset = received
+            upload.updated_at = now
+            upload.expires_at = self._expires_at(now)
+            await self.db.commit()
+            if hasher:
+                _keep_hasher(upload.id, received, hasher)
+        return upload
+
+    async def finalize(self, upload_id: UUID,
+                       user_id: UUID) -> Tuple[UploadSession, List[Tuple[Document, IngestionJob]], List[dict]]:
+        """Crée le(s) document(s) et job(s) d'ingestion ; une archive ZIP est remplacée par son contenu.
+
+        Renvoie (envoi, [(document, job)], entrées d'archive ignorées).
+        """
+        upload = await self._lock(upload_id, user_id)
+        if upload.status == UploadStatus.TERMINE.value:
+            # Réponse perdue côté client : la finalisation est idempotente
+            await self.db.rollback()
+            return upload, [], []
+        if upload.offset != upload.length:
+            await self.db.rollback()
+            raise UploadConflictError(f"Envoi incomplet : {upload.offset}/{upload.length} octets", upload.offset)
+
+        path = part_path(upload.id)
+        if is_archive(upload.filename):
+            _hashers.pop(upload.id, None)
+            created, ignored = await self.folders.attach_archive(
+                folder_id=upload.tender_folder_id, uploader_id=upload.created_by, path=path,
+            )
+            upload.status = UploadStatus.TERMINE.value
+            upload.updated_at = datetime.utcnow()
+            try:
+                await self.db.commit()
+            except BaseException:
+                await self.db.rollback()
+                await self.folders.purge_blobs([doc.blob_key for doc, _ in created])
+                raise
+            await asyncio.to_thread(_remove_part, path)
+        else:
+            entry = _hashers.pop(upload.id, None)
+            if entry and entry[0] == upload.length:
+                key = entry[1].hexdigest()
+            else:
+                key = await asyncio.to_thread(_file_sha256, path)
+
+            staged = await asyncio.to_thread(_staged_copy, self.folders.blob_store, path)
+            try:
+                await self.folders.store_blob(staged, key)
+                doc, job = await self.folders.attach_blob(
+                    folder_id=upload.tender_folder_id,
+                    uploader_id=upload.created_by,
+                    filename=upload.filename,
+                    key=key,
+                    size=upload.length,
+                    content_type=upload.mime_type,
+                )
+                upload.status = UploadStatus.TERMINE.value
+                upload.document_id = doc.id
+                upload.updated_at = datetime.utcnow()
+                await self.db.commit()
+            except BaseException:
+                # L'envoi reste complet et en cours : le client peut relancer la finalisation
+                await self.db.rollback()
+                if entry:
+                    _keep_hasher(upload.id, *entry)
+                await asyncio.to_thread(_remove_part, staged)
+                await self.folders.purge_blobs([key])
+                raise
+            await asyncio.to_thread(_remove_part, path)
+            created, ignored = [(doc, job)], []
+        if created:
+            self.folders.ingestion_workers.notify()
+        print(f"[UPLOAD] {upload.filename} finalisé ({upload.length} octets) -> {len(created)} document(s)")
+        return upload, created, ignored
+
+    async def cancel(self, upload_id: UUID, user_id: UUID) -> None:
+        upload = await self._lock(upload_id, user_id)
+        await self.repo.delete([upload.id])
+        await self.db.commit()
+        _hashers.pop(upload.id, None)
+        await asyncio.to_thread(_remove_part, part_path(upload.id))
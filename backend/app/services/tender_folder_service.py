@@ -1,20 +1,160 @@
-from typing import List
+import asyncio
+import os
+from typing import List, Optional, Set, Tuple
 from uuid import UUID
 
 from fastapi import UploadFile
+from core.config import Config
 from schemas.tender_folder import TenderFolderCreate
 from repositories.tender_folder_repo import TenderFolderRepo
 from repositories.document_repo import DocumentRepo
+from repositories.ingestion_job_repo import IngestionJobRepo
+from repositories.answer_cache_repo import AnswerCacheRepo
+from services.archives import discard_entries, expand_archive, is_archive
+from services.blob_gc import purge_unreferenced
+from services.blob_store import get_blob_store, guess_mime_type
+from services.digest_service import remove_from_folder_digest
+from services.uploads import UploadBudget, stage_upload
 from models.tender_folder import TenderFolder
 from models.document import Document
+from models.ingestion_job import IngestionJob
 from sqlalchemy.ext.asyncio import AsyncSession
 
 class TenderFolderService:
-    def __init__(self, db: AsyncSession, rag_service):
+    def __init__(self, db: AsyncSession, ingestion_workers):
         self.db = db
         self.repo = TenderFolderRepo(db)
         self.doc_repo = DocumentRepo(db)
-        self.rag_service = rag_service
+        self.job_repo = IngestionJobRepo(db)
+        self.answer_cache_repo = AnswerCacheRepo(db)
+        self.ingestion_workers = ingestion_workers
+        self.blob_store = get_blob_store()
+
+    async def _new_documents(self, folder_id: UUID, uploader_id: UUID,
+                             files: List[UploadFile]) -> Tuple[List[Document], List[dict]]:
+        """Documents créés (les archives ZIP sont remplacées par leur contenu) et entrées d'archive ignorées."""
+        budget = UploadBudget()
+        stored: List[str] = []
+        docs: List[Document] = []
+        ignored: List[dict] = []
+        # Empreintes déjà présentes : une entrée d'archive en double n'est pas réindexée
+        seen: Set[str] = set()
+        if any(is_archive(f.filename) for f in files):
+            seen.update(await self.doc_repo.blob_keys_by_folder(folder_id))
+        try:
+            for f in files:
+                if not f.filename or f.size == 0:
+                    continue
+                if is_archive(f.filename):
+                    staged = await stage_upload(self.blob_store, f, budget)
+                    if staged is None:
+                        continue
+                    try:
+                        archive_docs, archive_ignored = await self._archive_documents(
+                            folder_id, uploader_id, staged[0], seen, stored
+                        )
+                    finally:
+                        await asyncio.to_thread(os.remove, staged[0])
+                    docs += archive_docs
+                    ignored += [{**i, "archive": f.filename} for i in archive_ignored]
+                    continue
+                staged = await stage_upload(self.blob_store, f, budget)
+                if staged is None:
+                    continue
+                tmp, key, size = staged
+                await self.store_blob(tmp, key)
+                stored.append(key)
+                seen.add(key)
+                doc = self._document(folder_id, uploader_id, f.filename, key, size, f.content_type)
+                await self.doc_repo.add(doc)
+                docs.append(doc)
+            await self.db.flush()
+        except BaseException:
+            # Envoi refusé en cours de route : rien n'est enregistré
+            await self.db.rollback()
+            await self.purge_blobs(stored)
+            raise
+        return docs, ignored
+
+    async def _archive_documents(self, folder_id: UUID, uploader_id: UUID, archive_path: str,
+                                 seen: Set[str], stored: List[str]) -> Tuple[List[Document], List[dict]]:
+        # Décompression en flux dans un thread : la boucle d'événements reste libre
+        entries, ignored = await asyncio.to_thread(
+            expand_archive, archive_path, self.blob_store.staging_file, seen
+        )
+        docs: List[Document] = []
+        try:
+            for entry in entries:
+                await self.store_blob(entry.path, entry.key)
+                stored.append(entry.key)
+                doc = self._document(folder_id, uploader_id, entry.filename, entry.key, entry.size, None)
+                await self.doc_repo.add(doc)
+                docs.append(doc)
+        except BaseException:
+            await asyncio.to_thread(discard_entries, entries)
+            raise
+        print(f"[UPLOAD] archive : {len(docs)} fichier(s) extrait(s), {len(ignored)} ignoré(s)")
+        return docs, ignored
+
+    @staticmethod
+    def _document(folder_id: UUID, uploader_id: UUID, filename: str, key: str, size: int,
+                  content_type: Optional[str]) -> Document:
+        return Document(
+            tender_folder_id=folder_id,
+            filename=filename,
+            file_type=filename.split(".")[-1].lower(),
+            uploaded_by=uploader_id,
+            blob_key=key,
+            sha256=key,
+            size=size,
+            mime_type=guess_mime_type(filename, content_type),
+        )
+
+    async def attach_blob(self, *, folder_id: UUID, uploader_id: UUID, filename: str, key: str,
+                          size: int, content_type: Optional[str]) -> Tuple[Document, IngestionJob]:
+        """Document et job d'ingestion pour un blob déjà stocké ; l'appelant commit puis notifie les workers."""
+        doc = self._document(folder_id, uploader_id, filename, key, size, content_type)
+        await self.doc_repo.add(doc)
+        await self.db.flush()
+        job = await self._enqueue(doc)
+        await self.answer_cache_repo.invalidate_folder(folder_id)
+        return doc, job
+
+    async def attach_archive(self, *, folder_id: UUID, uploader_id: UUID,
+                             path: str) -> Tuple[List[Tuple[Document, IngestionJob]], List[dict]]:
+        """Comme attach_blob pour chaque fichier de l'archive `path` ; l'appelant commit puis notifie les workers."""
+        seen = set(await self.doc_repo.blob_keys_by_folder(folder_id))
+        stored: List[str] = []
+        try:
+            docs, ignored = await self._archive_documents(folder_id, uploader_id, path, seen, stored)
+            await self.db.flush()
+            created = [(doc, await self._enqueue(doc)) for doc in docs]
+        except BaseException:
+            await self.db.rollback()
+            await self.purge_blobs(stored)
+            raise
+        if created:
+            await self.answer_cache_repo.invalidate_folder(folder_id)
+        return created, ignored
+
+    async def store_blob(self, path: str, key: str) -> None:
+        """Déplace `path` dans le blob store ; la clé reste verrouillée (partagé) jusqu'au
+        commit du document qui la référence, pour qu'une purge concurrente ne la supprime pas."""
+        await self.doc_repo.lock_blob_keys([key])
+        await self.blob_store.put_file(path, key)
+
+    async def purge_blobs(self, keys: List[str]) -> None:
+        # Après commit : un blob n'est supprimé que s'il n'est plus référencé
+        await purge_unreferenced(self.db, keys)
+
+    async def _enqueue(self, doc: Document) -> IngestionJob:
+        job = IngestionJob(
+            document_id=doc.id,
+            tender_folder_id=doc.tender_folder_id,
+            max_attempts=Config.INGESTION_MAX_ATTEMPTS,
+        )
+        await self.job_repo.add(job)
+        return job
 
     async def create_folder(
         self,
@@ -22,7 +162,7 @@ class TenderFolderService:
         data: TenderFolderCreate,                  
         creator_id: UUID,
         files: List[UploadFile] | None,
-    ) -> TenderFolder:
+    ) -> Tuple[TenderFolder, List[IngestionJob], List[dict]]:
 
         folder = TenderFolder(
             name=data.name,
@@ -35,36 +175,23 @@ class TenderFolderService:
         await self.repo.add(folder)
         await self.db.flush()      
 
-        if files:
-            for f in files:
-                if not f.filename or f.size == 0:
-                    continue
-                content = await f.read()
-                doc = Document(
-                    tender_folder_id=folder.id,
-                    filename=f.filename,
-                    file_type=f.filename.split(".")[-1].lower(),
-                    uploaded_by=creator_id,
-                    file_content=content,
-                )
-                await self.doc_repo.add(doc)
-                await self.db.flush() 
-
-                await self.rag_service.process_document(
-                    db=self.db,
-                    tender_folder_id=folder.id,
-                    document_id=doc.id,
-                    file_content=content,
-                    file_type=doc.file_type,
-                )
+        docs, ignored = await self._new_documents(folder.id, creator_id, files or [])
+        jobs: List[IngestionJob] = []
+        for doc in docs:
+            jobs.append(await self._enqueue(doc))
 
         await self.db.commit()
         await self.db.refresh(folder)
-        return folder
+        if jobs:
+            self.ingestion_workers.notify()
+        return folder, jobs, ignored
 
     async def delete(self, folder_id: UUID, org_id: UUID) -> bool:
+        keys = await self.doc_repo.stored_keys_by_folder(folder_id)
         affected = await self.repo.delete(folder_id, org_id)
         await self.db.commit()
+        if affected:
+            await self.purge_blobs(keys)
         return affected > 0
 
     async def list_folders_with_stats(self, org_id):
@@ -99,38 +226,43 @@ class TenderFolderService:
         org_id: UUID,
         uploader_id: UUID,
         files: List[UploadFile],
-    ) -> list[Document]:
+    ) -> Tuple[list[Tuple[Document, IngestionJob]], List[dict]]:
         folder = await self.repo.get_with_docs(folder_id, org_id)
         if not folder:
             raise FileNotFoundError()
 
-        created_docs: list[Document] = []
-
-        for f in files:
-            if not f.filename:
-                continue
-            content = await f.read()
-            if not content:
-                continue
-
-            doc = Document(
-                tender_folder_id=folder.id,
-                filename=f.filename,
-                file_type=f.filename.split(".")[-1].lower(),
-                uploaded_by=uploader_id,
-                file_content=content,
-            )
-            await self.doc_repo.add(doc)
-            await self.db.flush()
-            created_docs.append(doc)
+        docs, ignored = await self._new_documents(folder.id, uploader_id, files)
+        created: list[Tuple[Document, IngestionJob]] = []
+        for doc in docs:
+            created.append((doc, await self._enqueue(doc)))
 
-            await self.rag_service.process_document(
-                db=self.db,
-                tender_folder_id=folder.id,
-                document_id=doc.id,
-                file_content=content,
-                file_type=doc.file_type,
-            )
+        if created:
+            await self.answer_cache_repo.invalidate_folder(folder.id)
+        await self.db.commit()
+        if created:
+            self.ingestion_workers.notify()
+        return created, ignored
 
+    async def remove_document(self, *, folder_id: UUID, org_id: UUID, document_id: UUID) -> bool:
+        folder = await self.repo.get_in_org(folder_id, org_id)
+        if not folder:
+            raise FileNotFoundError()
+        if not await self.doc_repo.exists_in_folder(document_id, folder_id):
+            return False
+        info = await self.doc_repo.get_blob_info(document_id)
+        # Embeddings et jobs suivent par ON DELETE CASCADE
+        await self.doc_repo.delete(document_id)
+        await self.answer_cache_repo.invalidate_folder(folder_id)
+        folder_digest = await self.repo.lock_digest(folder_id)
+        if folder_digest:
+            await self.repo.set_digest(folder_id, remove_from_folder_digest(folder_digest, document_id))
         await self.db.commit()
-        return created_docs
\ No newline at end of file
+        if info:
+            await self.purge_blobs([key for key in (info.blob_key, info.text_key) if key])
+        return True
+
+    async def ingestion_status(self, folder_id: UUID, org_id: UUID):
+        folder = await self.repo.get_in_org(folder_id, org_id)
+        if not folder:
+            return None
+        return await self.job_repo.list_by_folder(folder_id)
\ No newline at end of file
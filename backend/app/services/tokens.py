@@ -0,0 +1,57 @@
+from typing import List, Tuple
+
+import tiktoken
+
+_ENCODING = None
+
+
+def encoding():
+    global _ENCODING
+    if _ENCODING is None:
+        _ENCODING = tiktoken.get_encoding("cl100k_base")
+    return _ENCODING
+
+
+_TOKEN_BYTE_LENGTHS = None
+
+
+def token_byte_lengths() -> List[int]:
+    """Longueur en octets de chaque token du vocabulaire, calculée une fois par processus."""
+    global _TOKEN_BYTE_LENGTHS
+    if _TOKEN_BYTE_LENGTHS is None:
+        enc = encoding()
+        lengths = []
+        for token in range(enc.n_vocab):
+            try:
+                lengths.append(len(enc.decode_single_token_bytes(token)))
+            except KeyError:
+                lengths.append(0)
+        _TOKEN_BYTE_LENGTHS = lengths
+    return _TOKEN_BYTE_LENGTHS
+
+
+def token_len(text: str) -> int:
+    return len(encoding().encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    tokens = encoding().encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding().decode(tokens[:max_tokens])
+
+
+def group_by_tokens(blocks: List[Tuple[str, int]], max_tokens: int) -> List[str]:
+    """Regroupe des blocs (texte, nb de tokens) consécutifs en lots d'au plus `max_tokens`."""
+    groups: List[str] = []
+    current: List[str] = []
+    size = 0
+    for block, tokens in blocks:
+        if current and size + tokens > max_tokens:
+            groups.append("".join(current))
+            current, size = [], 0
+        current.append(block)
+        size += tokens
+    if current:
+        groups.append("".join(current))
+    return groups
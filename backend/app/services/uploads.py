@@ -0,0 +1,78 @@
+import asyncio
+import hashlib
+import os
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+
+from core.config import Config
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(Exception):
+    pass
+
+
+class UploadConflictError(Exception):
+    """Envoi reprenable dans un état incompatible (décalage inattendu, envoi incomplet ou terminé)."""
+
+    def __init__(self, message: str, offset: int):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadLockedError(Exception):
+    pass
+
+
+class UploadBudget:
+    """Limites d'un envoi : taille par fichier et taille cumulée de la requête."""
+
+    def __init__(self, max_file_bytes: Optional[int] = None, max_request_bytes: Optional[int] = None):
+        self.max_file_bytes = max_file_bytes or Config.UPLOAD_MAX_FILE_MB * 1024 * 1024
+        self.max_request_bytes = max_request_bytes or Config.UPLOAD_MAX_REQUEST_MB * 1024 * 1024
+        self.remaining = self.max_request_bytes
+
+    def check(self, filename: str, size: int) -> None:
+        if size > self.max_file_bytes:
+            raise UploadTooLargeError(
+                f"{filename} dépasse la taille maximale de {self.max_file_bytes // (1024 * 1024)} Mo"
+            )
+        if size > self.remaining:
+            raise UploadTooLargeError(
+                f"L'envoi dépasse la taille maximale de {self.max_request_bytes // (1024 * 1024)} Mo par requête"
+            )
+
+    def consume(self, size: int) -> None:
+        self.remaining -= size
+
+
+async def stage_upload(blob_store, f: UploadFile, budget: UploadBudget) -> Optional[Tuple[str, str, int]]:
+    """Copie `f` dans un fichier temporaire du blob store par blocs de 1 Mo, en
+    calculant SHA-256 et taille au fil de l'eau.
+
+    Les limites sont vérifiées avant la copie quand la taille est connue, puis
+    à chaque bloc. Renvoie (chemin temporaire, clé, taille), ou None pour un fichier vide.
+    """
+    if f.size is not None:
+        budget.check(f.filename, f.size)
+    fd, tmp = blob_store.staging_file()
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await f.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                budget.check(f.filename, size)
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        if size == 0:
+            os.remove(tmp)
+            return None
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    budget.consume(size)
+    return tmp, digest.hexdigest(), size
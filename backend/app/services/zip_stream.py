@@ -0,0 +1,94 @@
+import struct
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional
+
+# Entrées STORED (les PDF scannés ne se compressent pas) : la taille de l'archive
+# est connue d'avance. Le CRC, calculé pendant l'envoi, part dans le descripteur
+# de données qui suit chaque entrée (bit 3) : un seul passage sur les blobs.
+_FLAGS = 0x0008 | 0x0800  # descripteur de données, noms en UTF-8
+_VERSION = 20
+_VERSION_MADE_BY = (3 << 8) | _VERSION  # Unix : permissions dans les attributs externes
+_FILE_ATTRS = 0o100644 << 16
+_LOCAL_HEADER = struct.Struct("<IHHHHHIIIHH")
+_DESCRIPTOR = struct.Struct("<IIII")
+_CENTRAL_HEADER = struct.Struct("<IHHHHHHIIIHHHHHII")
+_END_RECORD = struct.Struct("<IHHHHIIH")
+_ZIP32_MAX = 0xFFFFFFFF
+_ZIP32_MAX_ENTRIES = 0xFFFF
+
+
+class ExportTooLargeError(Exception):
+    pass
+
+
+class ZipEntry(NamedTuple):
+    name: str
+    size: Optional[int]
+    modified: Optional[datetime]
+    chunks: Callable[[], AsyncIterator[bytes]]
+
+
+def _dos_datetime(value: Optional[datetime]):
+    value = value or datetime.utcnow()
+    if value.year < 1980:
+        return 0, (1 << 5) | 1
+    return (
+        (value.hour << 11) | (value.minute << 5) | (value.second // 2),
+        ((value.year - 1980) << 9) | (value.month << 5) | value.day,
+    )
+
+
+def zip_size(entries: List[ZipEntry]) -> Optional[int]:
+    """Taille exacte de l'archive produite par stream_zip, ou None si une taille d'entrée est inconnue."""
+    if any(e.size is None for e in entries):
+        return None
+    total = _END_RECORD.size
+    for e in entries:
+        name = len(e.name.encode("utf-8"))
+        total += _LOCAL_HEADER.size + name + e.size + _DESCRIPTOR.size + _CENTRAL_HEADER.size + name
+    return total
+
+
+def check_zip32(entries: List[ZipEntry]) -> None:
+    """Pas de ZIP64 : au-delà de 65 535 entrées ou 4 Go, l'export est refusé."""
+    size = zip_size(entries)
+    if len(entries) > _ZIP32_MAX_ENTRIES or (size is not None and size > _ZIP32_MAX):
+        raise ExportTooLargeError("Export trop volumineux (limite de 4 Go ou 65 535 fichiers)")
+
+
+async def stream_zip(entries: List[ZipEntry]) -> AsyncIterator[bytes]:
+    """Archive ZIP produite à la volée : mémoire constante, sans fichier temporaire."""
+    offset = 0
+    central: List[bytes] = []
+    for e in entries:
+        name = e.name.encode("utf-8")
+        time, date = _dos_datetime(e.modified)
+        # Bit 3 : CRC et tailles à zéro ici, donnés par le descripteur
+        header = _LOCAL_HEADER.pack(0x04034B50, _VERSION, _FLAGS, 0, time, date, 0, 0, 0, len(name), 0) + name
+        yield header
+
+        crc = size = 0
+        async for chunk in e.chunks():
+            if chunk:
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                yield chunk
+        if e.size is not None and size != e.size:
+            # Content-Length déjà annoncé : mieux vaut couper que livrer une archive fausse
+            raise RuntimeError(f"{e.name} : {size} octets lus, {e.size} attendus")
+        if size > _ZIP32_MAX or offset > _ZIP32_MAX:
+            raise ExportTooLargeError("Export trop volumineux (limite de 4 Go)")
+        yield _DESCRIPTOR.pack(0x08074B50, crc, size, size)
+
+        central.append(_CENTRAL_HEADER.pack(
+            0x02014B50, _VERSION_MADE_BY, _VERSION, _FLAGS, 0, time, date,
+            crc, size, size, len(name), 0, 0, 0, 0, _FILE_ATTRS, offset,
+        ) + name)
+        offset += len(header) + size + _DESCRIPTOR.size
+
+    directory = b"".join(central)
+    if offset > _ZIP32_MAX:
+        raise ExportTooLargeError("Export trop volumineux (limite de 4 Go)")
+    yield directory
+    yield _END_RECORD.pack(0x06054B50, 0, 0, len(central), len(central), len(directory), offset, 0)
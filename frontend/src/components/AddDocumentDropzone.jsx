@@ -8,11 +8,13 @@ import {
   Check,
   FileText,
 } from "lucide-react";
+import { RESUMABLE_THRESHOLD, uploadResumable } from "../utils/resumableUpload";
 
 function AddDocumentDropzone({ dossierId, api, onUploaded, className = "" }) {
   const [uploading, setUploading] = useState(false);
   const [error, setError] = useState("");
   const [selectedFiles, setSelectedFiles] = useState([]);
+  const [progress, setProgress] = useState(null);
 
   const onDrop = (acceptedFiles) => {
     setError("");
@@ -41,16 +43,27 @@ function AddDocumentDropzone({ dossierId, api, onUploaded, className = "" }) {
   const confirmUpload = async () => {
     if (!selectedFiles.length) return;
 
-    const formData = new FormData();
-    selectedFiles.forEach(({ file }) => formData.append("files", file));
+    const small = selectedFiles.filter(({ file }) => file.size < RESUMABLE_THRESHOLD);
+    const large = selectedFiles.filter(({ file }) => file.size >= RESUMABLE_THRESHOLD);
 
     try {
       setUploading(true);
       setError("");
 
-      await api.post(`/tender-folders/${dossierId}/documents`, formData, {
-        headers: { "Content-Type": "multipart/form-data" },
-      });
+      if (small.length) {
+        const formData = new FormData();
+        small.forEach(({ file }) => formData.append("files", file));
+        await api.post(`/tender-folders/${dossierId}/documents`, formData, {
+          headers: { "Content-Type": "multipart/form-data" },
+        });
+      }
+
+      // Gros fichiers : envoi par morceaux, repris là où il s'est arrêté en cas de coupure
+      for (const { file } of large) {
+        await uploadResumable(api, dossierId, file, {
+          onProgress: (ratio) => setProgress(`${file.name} ${Math.round(ratio * 100)}%`),
+        });
+      }
 
       setSelectedFiles([]);
       onUploaded?.();
@@ -62,6 +75,7 @@ function AddDocumentDropzone({ dossierId, api, onUploaded, className = "" }) {
       );
     } finally {
       setUploading(false);
+      setProgress(null);
     }
   };
 
@@ -216,7 +230,7 @@ function AddDocumentDropzone({ dossierId, api, onUploaded, className = "" }) {
               {uploading ? (
                 <span className="flex items-center space-x-2">
                   <Upload className="w-4 h-4 animate-pulse" />
-                  <span>Upload en cours...</span>
+                  <span>{progress ? `Upload ${progress}` : "Upload en cours..."}</span>
                 </span>
               ) : (
                 <span className="flex items-center space-x-2">
@@ -239,7 +253,7 @@ function AddDocumentDropzone({ dossierId, api, onUploaded, className = "" }) {
       )}
 
       <p className="text-xs text-gray-500 dark:text-gray-400 mt-2">
-        Formats acceptés : PDF, Word, CSV et TXT.
+        Formats acceptés : PDF, Word, CSV, TXT et archives ZIP (décompressées automatiquement).
       </p>
     </div>
   );
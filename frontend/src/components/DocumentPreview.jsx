@@ -1,17 +1,33 @@
-import { X, Download, FileText } from "lucide-react";
+import { X, Download, FileText, Loader2 } from "lucide-react";
 
-const DocumentPreview = ({ doc, onClose }) => {
+const DocumentPreview = ({ doc, content, loading, error, onClose }) => {
   if (!doc) return null;
 
   const extension = doc.filename.split(".").pop().toLowerCase();
-  const base64 = doc.file_content;
+  const url = content?.url;
 
   const renderContent = () => {
+    if (loading) {
+      return (
+        <div className="flex-1 flex items-center justify-center">
+          <Loader2 className="w-8 h-8 animate-spin text-blue-600" />
+        </div>
+      );
+    }
+
+    if (error || !url) {
+      return (
+        <div className="flex-1 flex items-center justify-center p-6 text-red-600">
+          {error || "Impossible de charger le document"}
+        </div>
+      );
+    }
+
     if (extension === "pdf") {
       return (
         <div className="flex-1 p-4">
           <iframe
-            src={`data:application/pdf;base64,${base64}`}
+            src={url}
             width="100%"
             height="100%"
             title="Aperçu PDF"
@@ -22,11 +38,10 @@ const DocumentPreview = ({ doc, onClose }) => {
     }
 
     if (["txt", "md", "csv", "log"].includes(extension)) {
-      const decoded = atob(base64);
       return (
         <div className="flex-1 p-4 overflow-auto">
           <pre className="whitespace-pre-wrap text-sm text-gray-800 dark:text-gray-100 font-mono bg-gray-50 dark:bg-gray-900 p-4 rounded-lg">
-            {decoded}
+            {content.text}
           </pre>
         </div>
       );
@@ -36,7 +51,7 @@ const DocumentPreview = ({ doc, onClose }) => {
       return (
         <div className="flex-1 p-4 overflow-auto flex items-center justify-center">
           <img
-            src={`data:image/${extension};base64,${base64}`}
+            src={url}
             alt={doc.filename}
             className="max-w-full max-h-full object-contain rounded-lg shadow-lg"
           />
@@ -53,7 +68,7 @@ const DocumentPreview = ({ doc, onClose }) => {
             {extension.toUpperCase()}).
           </p>
           <a
-            href={`data:application/octet-stream;base64,${base64}`}
+            href={url}
             download={doc.filename}
             className="inline-flex items-center space-x-2 bg-blue-600 hover:bg-blue-700 text-white px-4 py-2 rounded-lg transition-colors"
           >
@@ -73,14 +88,16 @@ const DocumentPreview = ({ doc, onClose }) => {
             {doc.filename}
           </h3>
           <div className="flex items-center space-x-2">
-            <a
-              href={`data:application/octet-stream;base64,${base64}`}
-              download={doc.filename}
-              className="p-2 text-gray-500 hover:text-blue-600 hover:bg-blue-50 dark:hover:bg-blue-900/20 rounded-lg transition-colors"
-              title="Télécharger"
-            >
-              <Download className="w-5 h-5" />
-            </a>
+            {url && (
+              <a
+                href={url}
+                download={doc.filename}
+                className="p-2 text-gray-500 hover:text-blue-600 hover:bg-blue-50 dark:hover:bg-blue-900/20 rounded-lg transition-colors"
+                title="Télécharger"
+              >
+                <Download className="w-5 h-5" />
+              </a>
+            )}
             <button
               onClick={onClose}
               className="p-2 text-gray-500 hover:text-red-600 hover:bg-red-50 dark:hover:bg-red-900/20 rounded-lg transition-colors"
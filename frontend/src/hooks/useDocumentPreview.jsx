@@ -1,20 +1,41 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useEffect, useRef } from "react";
+
+const TEXT_EXTENSIONS = ["txt", "md", "csv", "log"];
 
 export const useDocumentPreview = (api) => {
   const [selectedDoc, setSelectedDoc] = useState(null);
   const [docContent, setDocContent] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const urlRef = useRef(null);
+
+  const releaseUrl = () => {
+    if (urlRef.current) {
+      URL.revokeObjectURL(urlRef.current);
+      urlRef.current = null;
+    }
+  };
 
   const openPreview = useCallback(
     async (doc) => {
+      releaseUrl();
       setSelectedDoc(doc);
       setDocContent(null);
       setLoading(true);
       setError(null);
 
       try {
-        setDocContent(doc.file_content);
+        // Le contenu n'est plus inclus dans le détail du dossier : téléchargement à la demande
+        const response = await api.get(`/documents/${doc.id}/content`, {
+          responseType: "blob",
+        });
+        const blob = response.data;
+        const extension = doc.filename.split(".").pop().toLowerCase();
+        urlRef.current = URL.createObjectURL(blob);
+        setDocContent({
+          url: urlRef.current,
+          text: TEXT_EXTENSIONS.includes(extension) ? await blob.text() : null,
+        });
       } catch (err) {
         setError("Impossible de charger le document");
       } finally {
@@ -25,11 +46,14 @@ export const useDocumentPreview = (api) => {
   );
 
   const closePreview = useCallback(() => {
+    releaseUrl();
     setSelectedDoc(null);
     setDocContent(null);
     setError(null);
   }, []);
 
+  useEffect(() => releaseUrl, []);
+
   return {
     selectedDoc,
     docContent,
@@ -5,6 +5,7 @@ import { useAuth } from "../hooks/useAuth";
 import Sidebar from "../components/Sidebar";
 import DocumentViewerPanel from "../components/DocumentViewerPanel";
 import DocumentPreview from "../components/DocumentPreview";
+import { useDocumentPreview } from "../hooks/useDocumentPreview";
 import ChatMessage from "../components/ChatMessage";
 import ChatInput from "../components/ChatInput";
 
@@ -20,7 +21,14 @@ const ChatbotPage = () => {
   const [folderInfo, setFolderInfo] = useState(null);
   const [error, setError] = useState("");
   const [mode, setMode] = useState("rag");
-  const [selectedDoc, setSelectedDoc] = useState(null);
+  const {
+    selectedDoc,
+    docContent,
+    loading: previewLoading,
+    error: previewError,
+    openPreview,
+    closePreview,
+  } = useDocumentPreview(api);
   const [isPanelVisible, setIsPanelVisible] = useState(false);
   const [isLoadingHistory, setIsLoadingHistory] = useState(true);
 
@@ -182,7 +190,7 @@ const ChatbotPage = () => {
   };
 
   const handleDocumentSelect = (doc) => {
-    setSelectedDoc(doc);
+    openPreview(doc);
   };
 
   if (error) {
@@ -321,7 +329,10 @@ const ChatbotPage = () => {
       {selectedDoc && (
         <DocumentPreview
           doc={selectedDoc}
-          onClose={() => setSelectedDoc(null)}
+          content={docContent}
+          loading={previewLoading}
+          error={previewError}
+          onClose={closePreview}
         />
       )}
     </div>
@@ -1,6 +1,6 @@
 import React, { useState } from "react";
 import { useParams, useNavigate } from "react-router-dom";
-import { FolderOpen, Trash2, AlertCircle } from "lucide-react";
+import { FolderOpen, Trash2, AlertCircle, Download } from "lucide-react";
 
 import { useAuth } from "../hooks/useAuth";
 import { useTenderFolder } from "../hooks/useTenderFolder";
@@ -21,6 +21,7 @@ function TenderFolderDetail() {
 
   const [confirmOpen, setConfirmOpen] = useState(false);
   const [deleting, setDeleting] = useState(false);
+  const [exporting, setExporting] = useState(false);
 
   const { folder, loading, error, updateStatus, deleteFolder } =
     useTenderFolder(api, dossierId);
@@ -46,6 +47,27 @@ function TenderFolderDetail() {
     }
   };
 
+  const handleExport = async () => {
+    setExporting(true);
+    try {
+      // Archive générée à la volée : fichiers, textes extraits et conversation
+      const response = await api.get(`/tender-folders/${dossierId}/export.zip`, {
+        params: { include_text: true, include_chat: true },
+        responseType: "blob",
+      });
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement("a");
+      link.href = url;
+      link.download = `${folder.name}.zip`;
+      link.click();
+      URL.revokeObjectURL(url);
+    } catch (e) {
+      console.error(e);
+    } finally {
+      setExporting(false);
+    }
+  };
+
   const handleDocumentsUploaded = () => {
     window.location.reload();
   };
@@ -111,6 +133,15 @@ function TenderFolderDetail() {
           <div className="flex items-center gap-4">
             <StatusSelector value={folder.status} onChange={updateStatus} />
 
+            <button
+              onClick={handleExport}
+              disabled={exporting}
+              className="inline-flex items-center gap-2 px-3 py-1.5 rounded-xl bg-blue-600 hover:bg-blue-700 text-white shadow-sm transition-colors disabled:opacity-50"
+            >
+              <Download className={`w-4 h-4 ${exporting ? "animate-pulse" : ""}`} />
+              <span className="hidden sm:inline">Exporter</span>
+            </button>
+
             {isOwner() && (
               <button
                 onClick={() => setConfirmOpen(true)}
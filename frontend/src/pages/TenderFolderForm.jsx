@@ -89,6 +89,7 @@ const TenderFolderForm = () => {
     "application/msword": [".doc"],
     "text/plain": [".txt"],
     "text/csv": [".csv"],
+    "application/zip": [".zip"],
   };
 
   const {
@@ -401,8 +402,8 @@ const TenderFolderForm = () => {
                     sélectionner
                   </p>
                   <p className="text-sm text-gray-500 dark:text-gray-400 mb-2">
-                    📁 Formats acceptés : tous types de fichiers (PDF, Word, CSV
-                    et TXT)
+                    📁 Formats acceptés : tous types de fichiers (PDF, Word, CSV,
+                    TXT et archives ZIP)
                   </p>
                   <p className="text-xs text-gray-400 dark:text-gray-500">
                     Maximum 10 fichiers • 10MB par fichier
@@ -0,0 +1,92 @@
+const CHUNK_SIZE = 8 * 1024 * 1024;
+const MAX_RETRIES = 5;
+
+// Au-delà, un fichier passe par l'envoi reprenable (POST /uploads puis PATCH par morceaux)
+export const RESUMABLE_THRESHOLD = 20 * 1024 * 1024;
+
+const storageKey = (folderId, file) =>
+  `upload:${folderId}:${file.name}:${file.size}:${file.lastModified}`;
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const currentOffset = async (api, uploadId) => {
+  const response = await api.head(`/uploads/${uploadId}`);
+  return Number(response.headers["upload-offset"]);
+};
+
+export const uploadResumable = async (api, folderId, file, { onProgress } = {}) => {
+  const key = storageKey(folderId, file);
+  let uploadId = localStorage.getItem(key);
+  let offset = 0;
+
+  // Reprise d'un envoi interrompu (rechargement de page, coupure réseau)
+  if (uploadId) {
+    try {
+      offset = await currentOffset(api, uploadId);
+    } catch {
+      uploadId = null;
+    }
+  }
+  if (!uploadId) {
+    const { data } = await api.post("/uploads", {
+      tender_folder_id: folderId,
+      filename: file.name,
+      size: file.size,
+      mime_type: file.type || null,
+    });
+    uploadId = data.id;
+    localStorage.setItem(key, uploadId);
+  }
+
+  let failures = 0;
+  while (offset < file.size) {
+    try {
+      const response = await api.patch(
+        `/uploads/${uploadId}`,
+        file.slice(offset, offset + CHUNK_SIZE),
+        {
+          headers: {
+            "Content-Type": "application/offset+octet-stream",
+            "Upload-Offset": String(offset),
+          },
+        }
+      );
+      offset = Number(response.headers["upload-offset"]);
+      failures = 0;
+      onProgress?.(offset / file.size);
+    } catch (e) {
+      const status = e?.response?.status;
+      if (status === 409 && e.response.headers["upload-offset"] != null) {
+        offset = Number(e.response.headers["upload-offset"]);
+        continue;
+      }
+      if ((status && status < 500 && status !== 423) || ++failures > MAX_RETRIES) {
+        throw e;
+      }
+      await sleep(1000 * 2 ** failures);
+      offset = await currentOffset(api, uploadId).catch(() => offset);
+    }
+  }
+
+  // Un échec de finalisation laisse l'envoi complet côté serveur : on la rejoue
+  failures = 0;
+  while (true) {
+    try {
+      const { data } = await api.post(`/uploads/${uploadId}/finalize`);
+      localStorage.removeItem(key);
+      return data;
+    } catch (e) {
+      const status = e?.response?.status;
+      if (status && status < 500 && status !== 423) {
+        // Refus définitif (archive invalide...) : ne pas reprendre cet envoi
+        localStorage.removeItem(key);
+        api.delete(`/uploads/${uploadId}`).catch(() => {});
+        throw e;
+      }
+      if (++failures > MAX_RETRIES) {
+        throw e;
+      }
+      await sleep(1000 * 2 ** failures);
+    }
+  }
+};